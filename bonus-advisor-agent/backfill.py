@@ -0,0 +1,164 @@
+"""Backfill de bonos para un rango de quarters con calculate_quarterly_bonuses_range.
+
+Un solo CALL calcula todos los quarters del rango en una pasada agrupada por (year, quarter) y
+reemplaza los resultados en una transacción. Al terminar reporta las filas de cada quarter y los
+bytes procesados y facturados, en total y por sentencia del script.
+
+    python backfill.py --from 2024Q1 --to 2025Q4
+    python backfill.py --from 2025Q2 --to 2025Q2 --json
+"""
+import argparse
+import json
+import re
+import sys
+import time
+
+import bigquery_guard
+
+PROJECT_ID = "jrodriguez-sandbox"
+DATASET = f"{PROJECT_ID}.hackathon_bonus_update"
+RESULTS_TABLE = f"{DATASET}.quarterly_bonus_results"
+RANGE_PROCEDURE = f"{DATASET}.calculate_quarterly_bonuses_range"
+
+_PERIOD = re.compile(r"^\s*(?:(\d{4})\s*-?\s*Q([1-4])|Q([1-4])\s*-?\s*(\d{4}))\s*$", re.I)
+
+
+def _bigquery():
+    from google.cloud import bigquery
+    return bigquery
+
+
+def parse_period(text):
+    """(year, quarter) a partir de '2025Q2', '2025-Q2' o 'Q2-2025'"""
+    match = _PERIOD.match(text)
+    if not match:
+        raise ValueError(f"Periodo inválido: {text!r} (formato esperado: 2025Q2)")
+    if match.group(1):
+        return int(match.group(1)), int(match.group(2))
+    return int(match.group(4)), int(match.group(3))
+
+
+def quarters_between(start, end):
+    """Lista de (year, quarter) de start a end, ambos incluidos"""
+    if start > end:
+        raise ValueError(f"Rango vacío: Q{start[1]} {start[0]} es posterior a Q{end[1]} {end[0]}")
+    periods = []
+    year, quarter = start
+    while (year, quarter) <= end:
+        periods.append((year, quarter))
+        year, quarter = (year + 1, 1) if quarter == 4 else (year, quarter + 1)
+    return periods
+
+
+def run_backfill(client, start, end):
+    """Ejecuta el CALL del rango y arma el reporte de filas por quarter y bytes procesados"""
+    bigquery = _bigquery()
+    periods = quarters_between(start, end)
+    (start_year, start_quarter), (end_year, end_quarter) = start, end
+
+    started = time.perf_counter()
+    # Presupuesto propio: BIGQUERY_MAX_BYTES_BILLED_BACKFILL (el rango completo se lee de una vez)
+    job = bigquery_guard.run_query(
+        client, "backfill",
+        f"CALL `{RANGE_PROCEDURE}`(@start_quarter, @start_year, @end_quarter, @end_year)",
+        bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("start_quarter", "INT64", start_quarter),
+            bigquery.ScalarQueryParameter("start_year", "INT64", start_year),
+            bigquery.ScalarQueryParameter("end_quarter", "INT64", end_quarter),
+            bigquery.ScalarQueryParameter("end_year", "INT64", end_year),
+        ])
+    )
+    elapsed = time.perf_counter() - started
+
+    # Cada sentencia del script corre como un job hijo con sus propios bytes
+    statements = [
+        {
+            "statement_type": child.statement_type,
+            "total_bytes_processed": child.total_bytes_processed or 0,
+            "total_bytes_billed": child.total_bytes_billed or 0,
+        }
+        for child in client.list_jobs(parent_job=job.job_id)
+    ]
+    statements.reverse()  # list_jobs devuelve primero el más reciente
+
+    counts = bigquery_guard.run_query(
+        client, "backfill_counts",
+        f"""
+        SELECT year, quarter, COUNT(*) AS row_count, SUM(total_bonus) AS total_bonus
+        FROM `{RESULTS_TABLE}`
+        WHERE year BETWEEN @start_year AND @end_year
+          AND year * 10 + quarter BETWEEN @start_period AND @end_period
+        GROUP BY year, quarter
+        """,
+        bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("start_year", "INT64", start_year),
+            bigquery.ScalarQueryParameter("end_year", "INT64", end_year),
+            bigquery.ScalarQueryParameter("start_period", "INT64", start_year * 10 + start_quarter),
+            bigquery.ScalarQueryParameter("end_period", "INT64", end_year * 10 + end_quarter),
+        ])
+    ).result()
+    by_period = {(row["year"], row["quarter"]): row for row in counts}
+
+    return {
+        "start": f"{start_year}Q{start_quarter}",
+        "end": f"{end_year}Q{end_quarter}",
+        "elapsed_seconds": round(elapsed, 2),
+        "total_bytes_processed": job.total_bytes_processed or 0,
+        "total_bytes_billed": job.total_bytes_billed or 0,
+        "quarters": [
+            {
+                "year": year,
+                "quarter": quarter,
+                "row_count": by_period[(year, quarter)]["row_count"] if (year, quarter) in by_period else 0,
+                "total_bonus": by_period[(year, quarter)]["total_bonus"] if (year, quarter) in by_period else 0.0,
+            }
+            for year, quarter in periods
+        ],
+        "statements": statements,
+    }
+
+
+def _megabytes(value):
+    return f"{value / 1024 ** 2:,.1f} MB"
+
+
+def format_report(report):
+    lines = [f"Backfill {report['start']} → {report['end']} en {report['elapsed_seconds']}s", ""]
+    lines.append(f"{'Quarter':<10}{'Filas':>8}{'Total bonos':>16}")
+    for entry in report["quarters"]:
+        period = f"{entry['year']}Q{entry['quarter']}"
+        lines.append(f"{period:<10}{entry['row_count']:>8}{entry['total_bonus'] or 0:>16,.2f}")
+    lines.append("")
+    lines.append(f"{'Sentencia':<24}{'Procesado':>14}{'Facturado':>14}")
+    for statement in report["statements"]:
+        lines.append(
+            f"{statement['statement_type'] or '-':<24}"
+            f"{_megabytes(statement['total_bytes_processed']):>14}{_megabytes(statement['total_bytes_billed']):>14}"
+        )
+    lines.append(
+        f"{'TOTAL':<24}{_megabytes(report['total_bytes_processed']):>14}{_megabytes(report['total_bytes_billed']):>14}"
+    )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="start", required=True, help="Primer quarter, p.ej. 2024Q1")
+    parser.add_argument("--to", dest="end", required=True, help="Último quarter (incluido), p.ej. 2025Q4")
+    parser.add_argument("--json", action="store_true", help="Imprime el reporte como JSON")
+    args = parser.parse_args(argv)
+
+    try:
+        start, end = parse_period(args.start), parse_period(args.end)
+        quarters_between(start, end)
+    except ValueError as e:
+        parser.error(str(e))
+
+    client = _bigquery().Client(project=PROJECT_ID)
+    report = run_backfill(client, start, end)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+"""main:app con BigQuery y el agente reemplazados por fakes locales.
+
+Lo carga gunicorn desde bench_load.py (benchmarks.bench_app:app). Configuración por entorno:
+
+    BENCH_BIGQUERY_LATENCY_MS  latencia por query (default 150)
+    BENCH_LLM_LATENCY_MS       latencia por llamada al modelo (default 1500)
+    BENCH_CONSULTANTS          consultores sintéticos (default 300)
+
+El resto de la configuración (réplica, caches, router) es la de main.py.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main
+from benchmarks.fakes import FakeAgent, FakeBigQueryClient, make_bonus_results
+
+BIGQUERY_LATENCY_MS = float(os.environ.get("BENCH_BIGQUERY_LATENCY_MS", 150))
+LLM_LATENCY_MS = float(os.environ.get("BENCH_LLM_LATENCY_MS", 1500))
+CONSULTANTS = int(os.environ.get("BENCH_CONSULTANTS", 300))
+
+
+def build_agent():
+    client = FakeBigQueryClient(make_bonus_results(CONSULTANTS), latency_seconds=BIGQUERY_LATENCY_MS / 1000)
+    agent = main.BonusAdvisorAgent(client=client)
+    agent.agent = FakeAgent(LLM_LATENCY_MS / 1000, tool=agent.get_consultant_bonus)
+    if main.BONUS_REPLICA_ENABLED:
+        agent.start_replica()
+    return agent
+
+
+main.bonus_agent._instance = build_agent()
+app = main.app
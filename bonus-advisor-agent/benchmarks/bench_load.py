@@ -0,0 +1,299 @@
+"""Benchmark de carga: main:app bajo gunicorn con BigQuery y el agente simulados.
+
+Levanta gunicorn con el mismo layout de workers/threads que el CMD del Dockerfile,
+ejecuta cada escenario a niveles de concurrencia fijos y reporta throughput,
+p50/p95/p99, errores y memoria (RSS) del worker.
+
+    python benchmarks/bench_load.py --save-baseline benchmarks/baselines/load.json
+    python benchmarks/bench_load.py --baseline benchmarks/baselines/load.json --tolerance 0.2
+    python benchmarks/bench_load.py --scenarios bonus chat --concurrency 1 8 32 --requests 400
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DOCKERFILE = os.path.join(APP_DIR, "Dockerfile")
+
+CHAT_MESSAGES = [
+    # Formulaicas: las resuelve el router sin llamar al modelo
+    ("¿Cuál es mi bono Q2 2025?", True),
+    ("desglose de mi bono", True),
+    ("¿Cómo mejoro mi bono?", True),
+    # Abiertas: van al modelo (y luego al cache de respuestas)
+    ("¿Cómo funciona el sistema de bonos?", False),
+    ("¿Por qué mi bono cambió respecto al trimestre anterior?", False),
+]
+
+
+def dockerfile_layout(path=DOCKERFILE):
+    """--workers/--threads/--timeout del CMD de gunicorn en el Dockerfile"""
+    with open(path, encoding="utf-8") as f:
+        cmd = next(line for line in f if line.startswith("CMD") and "gunicorn" in line)
+    layout = {}
+    for flag in ("workers", "threads", "timeout"):
+        match = re.search(rf"--{flag}[ =](\d+)", cmd)
+        if match:
+            layout[flag] = int(match.group(1))
+    return layout
+
+
+def percentile(samples, pct):
+    """Percentil por nearest-rank sobre una lista ya ordenada"""
+    if not samples:
+        return None
+    rank = max(1, -(-len(samples) * pct // 100))
+    return samples[int(rank) - 1]
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _children(pid):
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # El nombre del proceso va entre paréntesis y puede contener espacios
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return children
+
+
+def _memory_mb(pid):
+    """(VmRSS, VmHWM) en MB de un proceso"""
+    values = {}
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith(("VmRSS:", "VmHWM:")):
+                key, value = line.split(":", 1)
+                values[key] = int(value.split()[0]) / 1024
+    return values.get("VmRSS", 0.0), values.get("VmHWM", 0.0)
+
+
+class GunicornServer:
+    """Proceso de gunicorn con benchmarks.bench_app:app"""
+
+    def __init__(self, env, layout):
+        self.port = _free_port()
+        self.env = dict(os.environ, **env)
+        self.layout = layout
+        self.process = None
+
+    def __enter__(self):
+        command = [
+            sys.executable, "-m", "gunicorn",
+            "--bind", f"127.0.0.1:{self.port}",
+            "--workers", str(self.layout.get("workers", 1)),
+            "--threads", str(self.layout.get("threads", 8)),
+            "--timeout", str(self.layout.get("timeout", 0)),
+            "benchmarks.bench_app:app",
+        ]
+        self.process = subprocess.Popen(command, cwd=APP_DIR, env=self.env,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"gunicorn terminó: {self.process.stderr.read().decode()[-2000:]}")
+            try:
+                conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=1)
+                conn.request("GET", "/")
+                if conn.getresponse().status == 200:
+                    return self
+            except OSError:
+                time.sleep(0.2)
+        raise RuntimeError("gunicorn no respondió en 60s")
+
+    def __exit__(self, *exc):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+    def worker_memory_mb(self):
+        rss, peak = 0.0, 0.0
+        for pid in _children(self.process.pid):
+            worker_rss, worker_peak = _memory_mb(pid)
+            rss += worker_rss
+            peak += worker_peak
+        return rss, peak
+
+
+def scenario_requests(name, consultants):
+    """Iterador infinito de (method, path, body) para un escenario"""
+    ids = [f"CONS{i:03d}" for i in range(1, consultants + 1)]
+    plans = ("Sales", "Delivery", "Hybrid")
+    if name == "bonus":
+        return (("GET", f"/api/bonus/{c}?quarter=2&year=2025", None) for c in itertools.cycle(ids))
+    if name == "breakdown":
+        return (("GET", f"/api/breakdown/{c}", None) for c in itertools.cycle(ids))
+    if name == "recommendations":
+        return (("GET", f"/api/recommendations/{c}/{plans[int(c[4:]) % 3]}", None) for c in itertools.cycle(ids))
+    if name == "chat":
+        pairs = itertools.cycle(itertools.product(CHAT_MESSAGES, ids[:50]))
+        return (
+            ("POST", "/api/chat", json.dumps({"message": message, "consultant_id": c}).encode())
+            for (message, _), c in pairs
+        )
+    raise ValueError(f"Escenario desconocido: {name}")
+
+
+def drive(port, requests, total, concurrency):
+    """Envía `total` requests con `concurrency` conexiones keep-alive; devuelve latencias y errores"""
+    lock = threading.Lock()
+    latencies = []
+    errors = [0]
+    sent = [0]
+
+    def next_request():
+        with lock:
+            if sent[0] >= total:
+                return None
+            sent[0] += 1
+            return next(requests)
+
+    def worker():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        cookie = None
+        local = []
+        while True:
+            item = next_request()
+            if item is None:
+                break
+            method, path, body = item
+            headers = {"Content-Type": "application/json"} if body else {}
+            if cookie:
+                headers["Cookie"] = cookie
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                response.read()
+                ok = response.status < 400
+                cookie = (response.getheader("Set-Cookie") or "").split(";", 1)[0] or cookie
+            except (OSError, http.client.HTTPException):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            local.append(time.perf_counter() - start)
+            if not ok:
+                with lock:
+                    errors[0] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    elapsed = time.perf_counter() - start
+    return sorted(latencies), errors[0], elapsed
+
+
+def run(args):
+    layout = dockerfile_layout()
+    env = {
+        "BENCH_BIGQUERY_LATENCY_MS": str(args.bigquery_latency_ms),
+        "BENCH_LLM_LATENCY_MS": str(args.llm_latency_ms),
+        "BENCH_CONSULTANTS": str(args.consultants),
+        "BONUS_REPLICA_ENABLED": "true" if args.replica == "on" else "false",
+        "WARMUP_ON_START": "false",
+    }
+    report = {"layout": layout, "config": env, "runs": []}
+    with GunicornServer(env, layout) as server:
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                requests = scenario_requests(scenario, args.consultants)
+                drive(server.port, requests, min(args.requests, concurrency * 5), concurrency)  # Calentamiento
+                latencies, errors, elapsed = drive(server.port, requests, args.requests, concurrency)
+                rss, peak = server.worker_memory_mb()
+                run_report = {
+                    "scenario": scenario,
+                    "concurrency": concurrency,
+                    "requests": len(latencies),
+                    "errors": errors,
+                    "throughput_rps": round(len(latencies) / elapsed, 2),
+                    "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+                    "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+                    "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+                    "rss_mb": round(rss, 1),
+                    "peak_rss_mb": round(peak, 1),
+                }
+                report["runs"].append(run_report)
+                print(json.dumps(run_report), file=sys.stderr)
+    return report
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """Regresiones de latencia, throughput, errores o memoria respecto a un baseline guardado"""
+    previous = {(r["scenario"], r["concurrency"]): r for r in baseline["runs"]}
+    failures = []
+    for run_report in report["runs"]:
+        key = (run_report["scenario"], run_report["concurrency"])
+        base = previous.get(key)
+        if base is None:
+            continue
+        label = f"{key[0]} @ {key[1]}"
+        for metric in ("p95_ms", "p99_ms", "peak_rss_mb"):
+            if run_report[metric] > base[metric] * (1 + tolerance):
+                failures.append(f"{label}: {metric} {run_report[metric]} > {base[metric]}")
+        if run_report["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            failures.append(f"{label}: throughput_rps {run_report['throughput_rps']} < {base['throughput_rps']}")
+        if run_report["errors"] > base["errors"]:
+            failures.append(f"{label}: errors {run_report['errors']} > {base['errors']}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", default=["bonus", "breakdown", "recommendations", "chat"])
+    parser.add_argument("--concurrency", nargs="+", type=int, default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=400, help="Requests por escenario y nivel")
+    parser.add_argument("--bigquery-latency-ms", type=float, default=150)
+    parser.add_argument("--llm-latency-ms", type=float, default=1500)
+    parser.add_argument("--consultants", type=int, default=300)
+    parser.add_argument("--replica", choices=["on", "off"], default="on")
+    parser.add_argument("--baseline", help="JSON de un run anterior para detectar regresiones")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", help="Guarda el reporte como nuevo baseline")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    failures = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures = compare_to_baseline(report, json.load(f), args.tolerance)
+    for failure in failures:
+        print(f"REGRESIÓN: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
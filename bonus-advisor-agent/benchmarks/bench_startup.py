@@ -0,0 +1,79 @@
+"""Benchmark de arranque: tiempo de `import main` y del primer request a `/`.
+
+Cada corrida usa un intérprete nuevo (como un contenedor recién levantado en Cloud Run).
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --max-import-seconds 0.5 --max-first-request-seconds 1.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "numpy", "google.cloud.bigquery", "google.generativeai"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+client = main.app.test_client()
+status = client.get('/').status_code
+first_request = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - start,
+    'first_request_seconds': first_request - imported,
+    'status': status,
+    'heavy_modules_loaded': [m for m in %r if m in sys.modules]
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_probe():
+    env = dict(os.environ, BONUS_REPLICA_ENABLED="false", WARMUP_ON_START="false")
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=APP_DIR, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import-seconds", type=float, default=None)
+    parser.add_argument("--max-first-request-seconds", type=float, default=None)
+    args = parser.parse_args()
+
+    samples = [run_probe() for _ in range(args.runs)]
+    report = {
+        "runs": args.runs,
+        "import_seconds_median": statistics.median(s["import_seconds"] for s in samples),
+        "first_request_seconds_median": statistics.median(s["first_request_seconds"] for s in samples),
+        "statuses": sorted({s["status"] for s in samples}),
+        "heavy_modules_loaded": sorted({m for s in samples for m in s["heavy_modules_loaded"]})
+    }
+    print(json.dumps(report, indent=2))
+
+    failures = []
+    if report["heavy_modules_loaded"]:
+        failures.append(f"módulos pesados importados al arrancar: {report['heavy_modules_loaded']}")
+    if report["statuses"] != [200]:
+        failures.append(f"`/` respondió {report['statuses']}")
+    if args.max_import_seconds is not None and report["import_seconds_median"] > args.max_import_seconds:
+        failures.append(f"import main tomó {report['import_seconds_median']:.3f}s")
+    if args.max_first_request_seconds is not None and \
+            report["first_request_seconds_median"] > args.max_first_request_seconds:
+        failures.append(f"primer request tomó {report['first_request_seconds_median']:.3f}s")
+
+    for failure in failures:
+        print(f"REGRESIÓN: {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
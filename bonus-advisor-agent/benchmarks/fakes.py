@@ -0,0 +1,195 @@
+"""Stand-ins locales de BigQuery y del agente del ADK con latencia configurable.
+
+Implementan solo la superficie que usa main.py (client.query(...).result()/to_dataframe(),
+agent.query(...).text) para medir el camino de serving sin salir a la red.
+"""
+import functools
+import os
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+import pandas as pd
+
+NAMED_CONSULTANTS = {
+    "CONS001": ("Rodolfo Solar", "Sales"),
+    "CONS002": ("Anthony Alarcon", "Delivery"),
+    "CONS003": ("Julian Rodriguez", "Hybrid"),
+}
+PLANS = ("Sales", "Delivery", "Hybrid")
+PERIODS = ((2025, 1), (2025, 2))
+CALCULATION_DATE = pd.Timestamp("2025-07-01T10:00:00Z")
+TIER_CONFIG_SQL = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "sql", "schema", "04_bonus_tier_config.sql"
+)
+
+
+def consultant_ids(count):
+    return [f"CONS{i:03d}" for i in range(1, count + 1)]
+
+
+@functools.lru_cache(maxsize=None)
+def _tier_config():
+    from bonus_engine import load_insert_script
+    with open(TIER_CONFIG_SQL, encoding="utf-8") as f:
+        script = f.read()
+    return load_insert_script(script, script)["bonus_tier_config"]
+
+
+def tier_config():
+    """Filas de bonus_tier_config de 04_bonus_tier_config.sql"""
+    return _tier_config().copy()
+
+
+def make_bonus_results(consultants=300, calculation_date=CALCULATION_DATE):
+    """Filas sintéticas de quarterly_bonus_results con el esquema de 01_create_tables.sql"""
+    rows = []
+    for index, consultant_id in enumerate(consultant_ids(consultants)):
+        name, plan = NAMED_CONSULTANTS.get(consultant_id, (f"Consultor {index + 1}", PLANS[index % 3]))
+        for year, quarter in PERIODS:
+            sales = plan != "Delivery"
+            delivery = plan != "Sales"
+            tcv = 150000.0 + 7919.0 * ((index * 7 + quarter) % 97) if sales else 0.0
+            hours = 150.0 + float((index * 13 + quarter) % 400) if delivery else 0.0
+            utilization = (600.0 if hours > 450 else 400.0 if hours >= 225 else 0.0) if delivery else 0.0
+            commission = round(tcv * 0.015, 2) if sales else 0.0
+            mbo = 500.0 if plan == "Sales" else 250.0
+            total = 500.0 + 250.0 + commission + utilization + mbo
+            rows.append({
+                "consultant_id": consultant_id,
+                "consultant_name": name,
+                "plan_type": plan,
+                "quarter": quarter,
+                "year": year,
+                "company_booking_total": 602760.0,
+                "company_target_achievement_pct": 100.46,
+                "company_booking_bonus": 500.0,
+                "recurring_business_pct": 53.06,
+                "recurring_business_bonus": 250.0,
+                "individual_tcv": tcv,
+                "individual_commission": commission,
+                "project_hours": hours,
+                "total_quarter_hours": hours,
+                "project_hours_percentage": 100.0 if delivery else 0.0,
+                "utilization_bonus": utilization,
+                "efficiency_bonus": 0.0,
+                "timeline_adherence_percentage": 0.0,
+                "timeline_bonus": 0.0,
+                "customer_satisfaction_score": 4.0,
+                "customer_satisfaction_bonus": 0.0,
+                "mbo_completed": True,
+                "mbo_bonus": mbo,
+                "total_bonus": total,
+                "calculation_date": calculation_date,
+            })
+    return pd.DataFrame(rows)
+
+
+class FakeRow:
+    """Equivalente mínimo de google.cloud.bigquery.Row"""
+    __slots__ = ("_data",)
+
+    def __init__(self, data):
+        self._data = data
+
+    def items(self):
+        return self._data.items()
+
+
+class FakeQueryJob:
+    # Estadísticas que registra bigquery_guard (el fake no factura bytes)
+    total_bytes_processed = 0
+    total_bytes_billed = 0
+    slot_millis = 0
+    cache_hit = False
+
+    def __init__(self, client, sql, parameters):
+        self._client = client
+        self._sql = sql
+        self._parameters = parameters
+        self._frame = None
+        self._lock = threading.Lock()
+
+    def result(self, page_size=None):
+        with self._lock:
+            if self._frame is None:
+                time.sleep(self._client.latency_seconds)  # Round trip + ejecución del job
+                self._frame = self._client.execute(self._sql, self._parameters)
+        return [FakeRow(row) for row in self._frame.to_dict("records")]
+
+    def to_dataframe(self):
+        self.result()
+        return self._frame.copy()
+
+
+class FakeBigQueryClient:
+    """Responde las queries de main.py sobre un DataFrame en memoria"""
+
+    def __init__(self, results=None, latency_seconds=0.0):
+        self.results = make_bonus_results() if results is None else results
+        self.latency_seconds = latency_seconds
+        self.query_count = 0
+        self._count_lock = threading.Lock()
+
+    def query(self, sql, job_config=None):
+        with self._count_lock:
+            self.query_count += 1
+        parameters = {}
+        for parameter in getattr(job_config, "query_parameters", None) or []:
+            parameters[parameter.name] = getattr(parameter, "values", None) or parameter.value
+        return FakeQueryJob(self, sql, parameters)
+
+    def execute(self, sql, parameters):
+        frame = self.results
+        if "bonus_tier_config" in sql:
+            return tier_config()
+        if "consultant_projects_master" in sql:
+            return self._timeline_counts(parameters)
+        if "MAX(calculation_date)" in sql:
+            return pd.DataFrame([{"calculation_date": frame["calculation_date"].max()}])
+        if "consultant_id" in parameters:
+            frame = frame[frame["consultant_id"] == parameters["consultant_id"]]
+        if "consultant_ids" in parameters:
+            frame = frame[frame["consultant_id"].isin(parameters["consultant_ids"])]
+        if "quarter" in parameters and "year" in parameters:
+            frame = frame[(frame["quarter"] == parameters["quarter"]) & (frame["year"] == parameters["year"])]
+        frame = frame.sort_values(["year", "quarter"], ascending=False)
+        if "DECLARE latest" in sql:
+            if frame.empty:
+                return frame
+            latest = frame.iloc[0]
+            return frame[(frame["year"] == latest["year"]) & (frame["quarter"] == latest["quarter"])]
+        if "LIMIT 1" in sql or "ROW_NUMBER" in sql:
+            return frame.drop_duplicates("consultant_id")
+        return frame
+
+
+    def _timeline_counts(self, parameters):
+        # Cuatro proyectos completados por consultor de horas; los a tiempo salen de la adherencia guardada
+        frame = self.results[
+            (self.results["quarter"] == parameters["quarter"]) & (self.results["year"] == parameters["year"])
+            & self.results["plan_type"].isin(("Hybrid", "Delivery"))
+        ]
+        return pd.DataFrame({
+            "consultant_id": frame["consultant_id"].to_numpy(),
+            "completed_projects": 4,
+            "on_time_projects": (frame["timeline_adherence_percentage"].fillna(0) / 25).round().astype(int).to_numpy(),
+        })
+
+
+class FakeAgent:
+    """Agente con latencia de modelo; si el mensaje nombra un consultor llama a la herramienta"""
+
+    _CONSULTANT = re.compile(r"CONS\d{3}")
+
+    def __init__(self, latency_seconds=0.0, tool=None):
+        self.latency_seconds = latency_seconds
+        self.tool = tool
+
+    def query(self, message, session_id=None):
+        match = self._CONSULTANT.search(message)
+        if match and self.tool is not None:
+            self.tool(match.group(0))
+        time.sleep(self.latency_seconds)
+        return SimpleNamespace(text=f"Respuesta simulada para: {message[-80:]}")
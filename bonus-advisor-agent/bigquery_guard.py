@@ -0,0 +1,216 @@
+"""Guardia de costo para BigQuery: tope de bytes facturados y contabilidad por call site.
+
+Cada query o carga se ejecuta con un nombre lógico (el mismo que usan las métricas de latencia):
+- se etiqueta el job con call_site=<nombre>, así INFORMATION_SCHEMA.JOBS permite rankear el costo
+  histórico del servicio y de las integraciones juntos;
+- las queries llevan maximum_bytes_billed: si se pasaran del presupuesto BigQuery las rechaza
+  sin facturar. Con dry-run (BIGQUERY_DRY_RUN=true o dry_run=True) el rechazo ocurre antes de
+  enviar la query, con la estimación de bytes;
+- el proceso acumula bytes procesados/facturados, slot-ms y cache hits por nombre (LEDGER).
+
+Presupuestos: BIGQUERY_MAX_BYTES_BILLED (default 1 GiB) y BIGQUERY_MAX_BYTES_BILLED_<NOMBRE>
+para un call site puntual (p.ej. BIGQUERY_MAX_BYTES_BILLED_REPLICA).
+
+    python bigquery_guard.py report --days 7
+"""
+import argparse
+import copy
+import os
+import re
+import sys
+import threading
+
+PROJECT_ID = "jrodriguez-sandbox"
+DEFAULT_MAX_BYTES_BILLED = int(os.getenv("BIGQUERY_MAX_BYTES_BILLED", str(1024 ** 3)))
+DRY_RUN = os.getenv("BIGQUERY_DRY_RUN", "false").lower() == "true"
+
+STAT_FIELDS = ("calls", "bytes_processed", "bytes_billed", "slot_ms", "cache_hits", "rows_loaded", "rejected")
+
+
+def _bigquery():
+    from google.cloud import bigquery
+    return bigquery
+
+
+class BudgetExceeded(Exception):
+    """La query estimada supera el presupuesto de bytes facturados de su call site"""
+
+    def __init__(self, name, estimated_bytes, max_bytes):
+        super().__init__(
+            f"{name}: la query procesaría {estimated_bytes:,} bytes y el presupuesto es {max_bytes:,}"
+        )
+        self.name = name
+        self.estimated_bytes = estimated_bytes
+        self.max_bytes = max_bytes
+
+
+class CostLedger:
+    """Costo acumulado por call site en este proceso"""
+
+    def __init__(self):
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _add(self, name, **amounts):
+        with self._lock:
+            stats = self._stats.setdefault(name, dict.fromkeys(STAT_FIELDS, 0))
+            for field, amount in amounts.items():
+                stats[field] += amount
+
+    def record_query(self, name, job):
+        self._add(
+            name,
+            calls=1,
+            bytes_processed=int(job.total_bytes_processed or 0),
+            bytes_billed=int(job.total_bytes_billed or 0),
+            slot_ms=int(job.slot_millis or 0),
+            cache_hits=1 if job.cache_hit else 0,
+        )
+
+    def record_load(self, name, job):
+        self._add(name, calls=1, rows_loaded=int(job.output_rows or 0))
+
+    def record_rejected(self, name):
+        self._add(name, rejected=1)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: dict(stats) for name, stats in self._stats.items()}
+
+    def ranking(self, by="bytes_billed"):
+        """[(nombre, stats)] del call site más caro al más barato"""
+        return sorted(self.snapshot().items(), key=lambda item: item[1][by], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+LEDGER = CostLedger()
+
+
+def _label(value):
+    # Valores de labels de BigQuery: minúsculas, dígitos, '_' y '-', hasta 63 caracteres
+    return re.sub(r"[^a-z0-9_-]", "_", value.lower())[:63]
+
+
+def max_bytes_for(name):
+    """Presupuesto del call site: variable de entorno propia o el default"""
+    override = os.getenv(f"BIGQUERY_MAX_BYTES_BILLED_{re.sub(r'[^A-Z0-9]', '_', name.upper())}")
+    return int(override) if override else DEFAULT_MAX_BYTES_BILLED
+
+
+def _bytes_billed_exceeded(error):
+    """El job falló por superar maximum_bytes_billed (BigQuery lo rechaza sin facturar)"""
+    details = getattr(error, "errors", None) or []
+    return any(isinstance(detail, dict) and detail.get("reason") == "bytesBilledLimitExceeded" for detail in details)
+
+
+def _execute(client, name, query, job_config, max_bytes_billed, dry_run, ledger, page_size=None):
+    bigquery = _bigquery()
+    # Copia: el job_config del llamador puede ser compartido entre call sites con otro presupuesto
+    job_config = bigquery.QueryJobConfig() if job_config is None else copy.deepcopy(job_config)
+    max_bytes = max_bytes_billed or max_bytes_for(name)
+    labels = dict(job_config.labels or {}, call_site=_label(name))
+
+    if DRY_RUN if dry_run is None else dry_run:
+        estimate = client.query(query, job_config=bigquery.QueryJobConfig(
+            dry_run=True,
+            use_query_cache=False,
+            query_parameters=job_config.query_parameters,
+            labels=labels,
+        ))
+        if (estimate.total_bytes_processed or 0) > max_bytes:
+            ledger.record_rejected(name)
+            raise BudgetExceeded(name, estimate.total_bytes_processed, max_bytes)
+
+    job_config.labels = labels
+    job_config.maximum_bytes_billed = max_bytes
+    try:
+        job = client.query(query, job_config=job_config)
+        rows = job.result(page_size=page_size) if page_size else job.result()
+    except Exception as e:
+        if _bytes_billed_exceeded(e):
+            ledger.record_rejected(name)
+        raise
+    ledger.record_query(name, job)
+    return job, rows
+
+
+def run_query(client, name, query, job_config=None, max_bytes_billed=None, dry_run=None, ledger=LEDGER):
+    """Ejecuta una query con presupuesto y etiqueta, espera el resultado y registra su costo.
+
+    Devuelve el job terminado (job.result()/to_dataframe() no vuelven a ejecutar la query).
+    """
+    job, _ = _execute(client, name, query, job_config, max_bytes_billed, dry_run, ledger)
+    return job
+
+
+def query_rows(client, name, query, job_config=None, page_size=None, max_bytes_billed=None, dry_run=None,
+               ledger=LEDGER):
+    """Como run_query, pero devuelve el iterador de filas de la misma espera (páginas de page_size)"""
+    _, rows = _execute(client, name, query, job_config, max_bytes_billed, dry_run, ledger, page_size)
+    return rows
+
+
+def load_dataframe(client, name, dataframe, table_id, job_config=None, ledger=LEDGER):
+    """Carga un DataFrame etiquetado con su call site (las cargas no facturan bytes, se cuentan filas)"""
+    bigquery = _bigquery()
+    if job_config is None:
+        job_config = bigquery.LoadJobConfig()
+    job_config.labels = dict(job_config.labels or {}, call_site=_label(name))
+    job = client.load_table_from_dataframe(dataframe, table_id, job_config=job_config)
+    job.result()
+    ledger.record_load(name, job)
+    return job
+
+
+def format_ranking(rows):
+    """Tabla de call sites ordenada por bytes facturados"""
+    lines = [f"{'Call site':<28}{'Llamadas':>10}{'Facturado':>14}{'Procesado':>14}{'Slot-ms':>12}{'Cache':>8}"]
+    for name, stats in rows:
+        lines.append(
+            f"{name:<28}{stats['calls']:>10}{stats['bytes_billed'] / 1024 ** 2:>11,.1f} MB"
+            f"{stats['bytes_processed'] / 1024 ** 2:>11,.1f} MB{stats['slot_ms']:>12,}{stats['cache_hits']:>8}"
+        )
+    return "\n".join(lines)
+
+
+def jobs_ranking(client, days=7, region="us"):
+    """Ranking histórico por label call_site desde INFORMATION_SCHEMA.JOBS (servicio + integraciones)"""
+    bigquery = _bigquery()
+    query = f"""
+    SELECT
+      (SELECT value FROM UNNEST(labels) WHERE key = 'call_site') AS call_site,
+      COUNT(*) AS calls,
+      SUM(IFNULL(total_bytes_billed, 0)) AS bytes_billed,
+      SUM(IFNULL(total_bytes_processed, 0)) AS bytes_processed,
+      SUM(IFNULL(total_slot_ms, 0)) AS slot_ms,
+      COUNTIF(cache_hit) AS cache_hits
+    FROM `{PROJECT_ID}.region-{region}.INFORMATION_SCHEMA.JOBS_BY_PROJECT`
+    WHERE creation_time >= TIMESTAMP_SUB(CURRENT_TIMESTAMP(), INTERVAL @days DAY)
+      AND EXISTS (SELECT 1 FROM UNNEST(labels) WHERE key = 'call_site')
+    GROUP BY call_site
+    ORDER BY bytes_billed DESC
+    """
+    job = run_query(client, "cost_report", query, bigquery.QueryJobConfig(query_parameters=[
+        bigquery.ScalarQueryParameter("days", "INT64", days)
+    ]))
+    return [(row["call_site"], dict(row.items())) for row in job.result()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    report = commands.add_parser("report", help="Call sites más caros según INFORMATION_SCHEMA.JOBS")
+    report.add_argument("--days", type=int, default=7)
+    report.add_argument("--region", default="us")
+    args = parser.parse_args(argv)
+
+    client = _bigquery().Client(project=PROJECT_ID)
+    print(format_ranking(jobs_ranking(client, args.days, args.region)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,565 @@
+"""Motor local y vectorizado de calculate_quarterly_bonuses.
+
+Reproduce sql/procedures/calculate_quarterly_bonuses.sql sobre DataFrames con la forma de las
+tablas de sql/schema/01_create_tables.sql, incluyendo sus particularidades (joins sin filtro de
+quarter, ROUND con redondeo half away from zero, tiers estrictos en el nivel más alto de
+utilización). Sirve para recalcular o simular un quarter sin correr el script en BigQuery.
+
+Los tiers salen de bonus_tier_config (BonusTiers.from_config) cuando se tienen sus filas; las
+constantes de este módulo son el fallback para lo que no esté en la tabla.
+"""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+
+from dashboard import BONUS_COMPONENTS, COMPANY_BOOKING_TARGET
+
+# (umbral, monto, estricto[, tasa]): el umbral se compara con > si estricto y con >= si no; el tier
+# paga monto + tasa * métrica, igual que bonus_tier_ranges (sin tasa, solo el monto)
+COMPANY_BOOKING_TIERS = (
+    (COMPANY_BOOKING_TARGET * 0.5, 250.0, False),
+    (COMPANY_BOOKING_TARGET * 0.75, 375.0, False),
+    (COMPANY_BOOKING_TARGET, 500.0, False),
+    (COMPANY_BOOKING_TARGET * 1.25, 625.0, False),
+    (COMPANY_BOOKING_TARGET * 1.5, 750.0, False),
+)
+RECURRING_BUSINESS_MIN_RATIO = 0.20
+RECURRING_BUSINESS_BONUS = 250.0
+
+# Tasa de comisión sobre el TCV individual (solo Sales)
+COMMISSION_TIERS = (
+    (50000.0, 0.0, False, 0.01),
+    (500000.0, 0.0, False, 0.015),
+    (1000000.0, 0.0, False, 0.02),
+)
+UTILIZATION_TIERS = {
+    "Hybrid": ((100.0, 150.0, False), (175.0, 300.0, False), (225.0, 400.0, True)),
+    "Delivery": ((200.0, 250.0, False), (350.0, 500.0, False), (450.0, 600.0, True)),
+}
+EFFICIENCY_MIN_PCT = 80.0
+EFFICIENCY_BONUS = {"Hybrid": 150.0, "Delivery": 250.0}
+TIMELINE_MIN_PCT = {"Hybrid": 40.0, "Delivery": 50.0}
+TIMELINE_BONUS = {"Hybrid": 150.0, "Delivery": 250.0}
+NPS_MIN_SCORE = 4.5  # Estricto: AVG(satisfaction_stars) > 4.5
+CUSTOMER_SATISFACTION_BONUS = {"Sales": 500.0, "Hybrid": 250.0, "Delivery": 250.0}
+MBO_BONUS = {"Sales": 500.0, "Hybrid": 250.0, "Delivery": 250.0}
+MBO_COMPLETED = 1.0  # Métrica de MBO: para el POC siempre completo
+
+HOURS_PLANS = ("Hybrid", "Delivery")
+
+RESULT_COLUMNS = [
+    "consultant_id", "consultant_name", "plan_type", "quarter", "year",
+    "company_booking_total", "company_target_achievement_pct", "company_booking_bonus",
+    "recurring_business_pct", "recurring_business_bonus",
+    "individual_tcv", "individual_commission",
+    "project_hours", "total_quarter_hours", "project_hours_percentage",
+    "utilization_bonus", "efficiency_bonus",
+    "timeline_adherence_percentage", "timeline_bonus",
+    "customer_satisfaction_score", "customer_satisfaction_bonus",
+    "mbo_completed", "mbo_bonus",
+    "total_bonus", "calculation_date",
+]
+
+
+def sql_round(values, digits=2):
+    """ROUND de BigQuery: half away from zero (np.round redondea half to even)"""
+    scale = 10.0 ** digits
+    values = np.asarray(values, dtype=float)
+    return np.sign(values) * np.floor(np.abs(values) * scale + 0.5) / scale
+
+
+def tier_parts(tier):
+    """(umbral, monto, estricto, tasa) de un tier con o sin tasa"""
+    threshold, payout, strict, *rate = tier
+    return threshold, payout, strict, rate[0] if rate else 0.0
+
+
+class CompiledTiers:
+    """Tiers compilados a arrays ordenados: cada consulta es una búsqueda binaria vectorizada"""
+    __slots__ = ("thresholds", "bounds", "values", "rates", "strict")
+
+    def __init__(self, tiers):
+        ordered = sorted((tier_parts(tier) for tier in tiers), key=lambda tier: tier[0])
+        self.thresholds = np.array([tier[0] for tier in ordered], dtype=float)
+        self.values = np.array([tier[1] for tier in ordered], dtype=float)
+        self.strict = np.array([tier[2] for tier in ordered], dtype=bool)
+        self.rates = np.array([tier[3] for tier in ordered], dtype=float)
+        # "> umbral" equivale a ">= siguiente float representable"
+        self.bounds = np.where(self.strict, np.nextafter(self.thresholds, np.inf), self.thresholds)
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def level(self, values):
+        """Cantidad de tiers alcanzados por elemento (0 = ninguno; NaN no alcanza ninguno)"""
+        values = np.asarray(values, dtype=float)
+        level = np.searchsorted(self.bounds, values, side="right")
+        return np.where(np.isnan(values), 0, level)
+
+    def value_at(self, level, metric=0.0, default=0.0):
+        """Monto + tasa * métrica del tier de cada nivel devuelto por level()"""
+        level = np.asarray(level)
+        index = np.maximum(level - 1, 0)
+        return np.where(level > 0, self.values[index] + self.rates[index] * np.asarray(metric, dtype=float), default)
+
+
+@functools.lru_cache(maxsize=None)
+def compile_tiers(tiers):
+    return CompiledTiers(tiers)
+
+
+def tier_value(values, tiers, default=0.0):
+    """Valor del tier más alto alcanzado por cada elemento (NaN no alcanza ningún tier)"""
+    compiled = compile_tiers(tuple(tiers))
+    values = np.asarray(values, dtype=float)
+    return compiled.value_at(compiled.level(values), values, default)
+
+
+def tier_reached(metric, threshold, strict):
+    """metric > umbral en los tiers estrictos (lower_inclusive = FALSE), metric >= umbral en el resto"""
+    return np.where(strict, np.greater(metric, threshold), np.greater_equal(metric, threshold))
+
+
+def _safe_divide(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator == 0, np.nan, numerator / denominator)
+
+
+def _period(frame, quarter, year):
+    return frame[(frame["quarter"] == quarter) & (frame["year"] == year)]
+
+
+def company_metrics(deals_report, customer_satisfaction, quarter, year, tiers=None):
+    """Métricas de compañía del quarter (CTE company_metrics)"""
+    tiers = tiers or DEFAULT_TIERS
+    deals = _period(deals_report, quarter, year)
+    unique_deals = deals[["deal_id", "deal_amount", "is_recurring_business"]].drop_duplicates()
+    amounts = unique_deals["deal_amount"].to_numpy(dtype=float)
+    # SUM sobre cero filas es NULL en BigQuery
+    booking = np.nansum(amounts) if len(amounts) else np.nan
+    recurring = unique_deals["is_recurring_business"].fillna(False).astype(bool).to_numpy()
+    recurring_booking = np.nansum(amounts[recurring]) if len(amounts) else np.nan
+    recurring_ratio = float(_safe_divide(recurring_booking, booking))
+
+    stars = _period(customer_satisfaction, quarter, year)["satisfaction_stars"].dropna()
+    nps = float(stars.mean()) if len(stars) else np.nan
+
+    return {
+        "company_booking_total": booking,
+        "company_target_achievement_pct": float(sql_round(_safe_divide(booking, COMPANY_BOOKING_TARGET) * 100)),
+        "company_booking_bonus": float(tier_value([booking], tiers.company_booking)[0]),
+        "recurring_business_pct": float(sql_round(recurring_ratio * 100)),
+        "recurring_business_bonus": tiers.recurring_bonus
+        if tier_reached(recurring_ratio, tiers.recurring_min_ratio, tiers.recurring_strict) else 0.0,
+        "company_nps": nps,
+        "nps_bonus_achieved": bool(tier_reached(nps, tiers.nps_min_score, tiers.nps_strict)),
+    }
+
+
+def _individual_tcv(deals_report, quarter, year):
+    deals = _period(deals_report, quarter, year)
+    return deals.groupby("consultant_id", sort=False)["deal_amount"].sum().rename("tcv_total")
+
+
+def _project_utilization(consultant_report, consultant_projects_master, quarter, year):
+    report = _period(consultant_report, quarter, year)
+    # El join no filtra consultant_projects_master por quarter: filas duplicadas multiplican horas
+    joined = report.merge(
+        consultant_projects_master[["project_id", "consultant_id"]],
+        on=["project_id", "consultant_id"], how="inner"
+    )
+    project_hours = joined.groupby("consultant_id", sort=False)["logged_hours"].sum().rename("project_hours")
+    total_hours = report.groupby("consultant_id", sort=False)["logged_hours"].sum().rename("total_quarter_hours")
+    return pd.concat([project_hours, total_hours], axis=1, join="inner")
+
+
+def _timeline_metrics(consultant_projects_master, quarter, year):
+    projects = _period(consultant_projects_master, quarter, year)
+    completed = projects[projects["actual_end_date"].notna()]
+    on_time = (completed["actual_end_date"] <= completed["planned_end_date"]).astype(float)
+    grouped = on_time.groupby(completed["consultant_id"], sort=False)
+    return (grouped.sum() / grouped.count() * 100).rename("timeline_adherence_pct")
+
+
+def _by_plan(plans, mapping, default=0.0):
+    """Valor por plan; con default=np.nan reproduce un CASE plan_type sin ELSE"""
+    return plans.map(mapping).fillna(default).to_numpy(dtype=float)
+
+
+def _resolve_tiers(tables, tiers):
+    if tiers is not None:
+        return tiers
+    if "bonus_tier_config" in tables:
+        return BonusTiers.from_config(tables["bonus_tier_config"])
+    return DEFAULT_TIERS
+
+
+def calculate_quarterly_bonuses(tables, quarter, year, calculation_date=None, tiers=None):
+    """Resultados de bonos del quarter con las columnas de quarterly_bonus_results.
+
+    tables: dict con los DataFrames consultant_master, deals_report, consultant_projects_master,
+    consultant_report y customer_satisfaction (y opcionalmente bonus_tier_config).
+    tiers: BonusTiers a aplicar; por defecto los de tables["bonus_tier_config"] o DEFAULT_TIERS.
+    """
+    if calculation_date is None:
+        calculation_date = pd.Timestamp.now(tz="UTC")
+    tiers = _resolve_tiers(tables, tiers)
+    master = tables["consultant_master"]
+    eligible = master[
+        master["eligible_for_comp"].fillna(False).astype(bool) & master["active"].fillna(False).astype(bool)
+    ][["consultant_id", "consultant_name", "plan_type"]]
+
+    company = company_metrics(tables["deals_report"], tables["customer_satisfaction"], quarter, year, tiers)
+
+    frame = (
+        eligible
+        .merge(_individual_tcv(tables["deals_report"], quarter, year),
+               left_on="consultant_id", right_index=True, how="left")
+        .merge(_project_utilization(tables["consultant_report"], tables["consultant_projects_master"], quarter, year),
+               left_on="consultant_id", right_index=True, how="left")
+        .merge(_timeline_metrics(tables["consultant_projects_master"], quarter, year),
+               left_on="consultant_id", right_index=True, how="left")
+    )
+
+    plans = frame["plan_type"]
+    is_sales = (plans == "Sales").to_numpy()
+    hours_plan = plans.isin(HOURS_PLANS).to_numpy()
+
+    tcv = frame["tcv_total"].fillna(0).to_numpy(dtype=float)
+    project_hours = frame["project_hours"].fillna(0).to_numpy(dtype=float)
+    total_hours = frame["total_quarter_hours"].fillna(0).to_numpy(dtype=float)
+    hours_pct = _safe_divide(project_hours, total_hours) * 100
+    timeline_pct = frame["timeline_adherence_pct"].fillna(0).to_numpy(dtype=float)
+
+    commission = np.where(is_sales, tier_value(tcv, tiers.commission), 0.0)
+
+    utilization = np.zeros(len(frame))
+    for plan, plan_tiers in tiers.utilization.items():
+        mask = (plans == plan).to_numpy()
+        utilization[mask] = tier_value(project_hours[mask], plan_tiers)
+
+    efficiency = np.where(tier_reached(hours_pct, _by_plan(plans, tiers.efficiency_min_pct, np.inf),
+                                   _by_plan(plans, tiers.efficiency_strict).astype(bool)),
+                          _by_plan(plans, tiers.efficiency_bonus), 0.0)
+    timeline = np.where(tier_reached(timeline_pct, _by_plan(plans, tiers.timeline_min_pct, np.inf),
+                                 _by_plan(plans, tiers.timeline_strict).astype(bool)),
+                        _by_plan(plans, tiers.timeline_bonus), 0.0)
+    # CASE plan_type sin ELSE: un plan desconocido da NULL (y el total también)
+    satisfaction = _by_plan(plans, tiers.satisfaction_bonus, np.nan) if company["nps_bonus_achieved"] \
+        else np.zeros(len(frame))
+    # Sin tier alcanzado el SUM del procedimiento queda NULL, igual que un plan desconocido
+    mbo = np.where(tier_reached(MBO_COMPLETED, _by_plan(plans, tiers.mbo_min, np.inf),
+                            _by_plan(plans, tiers.mbo_strict).astype(bool)),
+                   _by_plan(plans, tiers.mbo_bonus, np.nan), np.nan)
+
+    results = pd.DataFrame({
+        "consultant_id": frame["consultant_id"].to_numpy(),
+        "consultant_name": frame["consultant_name"].to_numpy(),
+        "plan_type": plans.to_numpy(),
+        "quarter": quarter,
+        "year": year,
+        "company_booking_total": company["company_booking_total"],
+        "company_target_achievement_pct": company["company_target_achievement_pct"],
+        "company_booking_bonus": company["company_booking_bonus"],
+        "recurring_business_pct": company["recurring_business_pct"],
+        "recurring_business_bonus": company["recurring_business_bonus"],
+        "individual_tcv": tcv,
+        "individual_commission": commission,
+        "project_hours": np.where(hours_plan, project_hours, np.nan),
+        "total_quarter_hours": np.where(hours_plan, total_hours, np.nan),
+        "project_hours_percentage": np.where(hours_plan, sql_round(hours_pct), np.nan),
+        "utilization_bonus": utilization,
+        "efficiency_bonus": efficiency,
+        "timeline_adherence_percentage": np.where(hours_plan, timeline_pct, np.nan),
+        "timeline_bonus": timeline,
+        "customer_satisfaction_score": 0.0 if np.isnan(company["company_nps"]) else company["company_nps"],
+        "customer_satisfaction_bonus": satisfaction,
+        "mbo_completed": True,
+        "mbo_bonus": mbo,
+    })
+    results["total_bonus"] = results[BONUS_COMPONENTS].sum(axis=1, skipna=False)
+    results["calculation_date"] = calculation_date
+    return results.sort_values(["plan_type", "consultant_name"], kind="stable", na_position="first").reset_index(drop=True)[RESULT_COLUMNS]
+
+
+# === RECÁLCULO INCREMENTAL (calculate_quarterly_bonuses_incremental.sql) ===
+
+COMPANY_COLUMNS = [
+    "company_booking_total", "company_target_achievement_pct", "company_booking_bonus",
+    "recurring_business_pct", "recurring_business_bonus",
+]
+
+
+# Diferencia a partir de la cual un agregado guardado ya no coincide con la fuente
+AGGREGATE_TOLERANCE = 0.005
+
+
+def _changed_since(frame, since, quarter=None, year=None):
+    if quarter is not None:
+        frame = _period(frame, quarter, year)
+    return frame[frame["updated_at"] > since]
+
+
+def _differs(stored, current):
+    # Los agregados se guardan sin redondear: la tolerancia solo absorbe el orden de las sumas
+    return np.abs(np.nan_to_num(np.asarray(stored, dtype=float)) - np.nan_to_num(np.asarray(current, dtype=float))) \
+        > AGGREGATE_TOLERANCE
+
+
+def removed_source_rows(tables, previous, quarter, year):
+    """(consultores, ¿deals?, ¿encuestas?) cuyos agregados guardados ya no coinciden con la fuente.
+
+    Las syncs borran filas con el MERGE (WHEN NOT MATCHED BY SOURCE) y un borrado no deja
+    updated_at: se compara TCV, horas, booking y NPS actuales contra quarterly_bonus_results.
+    """
+    period = _period(previous, quarter, year).set_index("consultant_id")
+    tcv = _individual_tcv(tables["deals_report"], quarter, year).reindex(period.index)
+    hours = _project_utilization(tables["consultant_report"], tables["consultant_projects_master"], quarter, year)
+    total_hours = hours["total_quarter_hours"].reindex(period.index)
+    stored_hours = period["total_quarter_hours"]
+    removed = _differs(period["individual_tcv"], tcv) \
+        | (stored_hours.notna().to_numpy() & _differs(stored_hours, total_hours))
+
+    company = company_metrics(tables["deals_report"], tables["customer_satisfaction"], quarter, year)
+    deals_removed = bool(len(period)) and bool(
+        _differs(period["company_booking_total"].iloc[0], company["company_booking_total"]))
+    satisfaction_removed = bool(len(period)) and bool(
+        _differs(period["customer_satisfaction_score"].iloc[0], company["company_nps"]))
+    return set(period.index[removed]), deals_removed, satisfaction_removed
+
+
+def changed_consultants(tables, previous, quarter, year, since):
+    """(consultores con filas fuente modificadas o borradas después de since, ¿cambiaron deals?, ¿cambiaron encuestas?)"""
+    deals = _changed_since(tables["deals_report"], since, quarter, year)
+    satisfaction_changed = not _changed_since(tables["customer_satisfaction"], since, quarter, year).empty
+    ids = [
+        deals["consultant_id"],
+        _changed_since(tables["consultant_report"], since, quarter, year)["consultant_id"],
+        # project_utilization une consultant_projects_master sin filtrar por quarter
+        _changed_since(tables["consultant_projects_master"], since)["consultant_id"],
+        _changed_since(tables["consultant_master"], since)["consultant_id"],
+    ]
+    removed, deals_removed, satisfaction_removed = removed_source_rows(tables, previous, quarter, year)
+    changed = set(pd.concat(ids).dropna()) | removed
+    return changed, not deals.empty or deals_removed, satisfaction_changed or satisfaction_removed
+
+
+def calculate_quarterly_bonuses_incremental(tables, previous, quarter, year, calculation_date=None, tiers=None):
+    """quarterly_bonus_results después de un recálculo incremental del quarter (MERGE sobre previous).
+
+    Las tablas fuente necesitan updated_at (03_add_change_tracking.sql). Solo se recalculan los
+    consultores con cambios; si cambiaron deals o encuestas, el resto recibe las columnas de
+    compañía nuevas y su total se recompone con sus componentes individuales ya guardados.
+    """
+    if calculation_date is None:
+        calculation_date = pd.Timestamp.now(tz="UTC")
+    tiers = _resolve_tiers(tables, tiers)
+    period = _period(previous, quarter, year)
+    if period.empty:
+        full = calculate_quarterly_bonuses(tables, quarter, year, calculation_date, tiers)
+        return pd.concat([previous, full], ignore_index=True) if not previous.empty else full
+    since = period["calculation_date"].max()
+    changed, deals_changed, satisfaction_changed = changed_consultants(tables, previous, quarter, year, since)
+    company_changed = deals_changed or satisfaction_changed
+    if not changed and not company_changed:
+        return previous
+
+    master = tables["consultant_master"]
+    scoped = dict(tables, consultant_master=master[master["consultant_id"].isin(changed)])
+    recalculated = calculate_quarterly_bonuses(scoped, quarter, year, calculation_date, tiers)
+    if not company_changed:
+        # Mismas métricas de compañía que el cálculo anterior, sin volver a leer deals ni encuestas
+        for column in COMPANY_COLUMNS + ["customer_satisfaction_score"]:
+            recalculated[column] = period[column].iloc[0]
+        nps_achieved = tier_reached(period["customer_satisfaction_score"].iloc[0], tiers.nps_min_score, tiers.nps_strict)
+        recalculated["customer_satisfaction_bonus"] = _by_plan(recalculated["plan_type"], tiers.satisfaction_bonus, np.nan) \
+            if nps_achieved else 0.0
+        recalculated["total_bonus"] = recalculated[BONUS_COMPONENTS].sum(axis=1, skipna=False)
+
+    untouched = period[~period["consultant_id"].isin(changed)].copy()
+    if company_changed and not untouched.empty:
+        company = company_metrics(tables["deals_report"], tables["customer_satisfaction"], quarter, year, tiers)
+        for column in COMPANY_COLUMNS:
+            untouched[column] = company[column]
+        untouched["customer_satisfaction_score"] = 0.0 if np.isnan(company["company_nps"]) else company["company_nps"]
+        untouched["customer_satisfaction_bonus"] = _by_plan(untouched["plan_type"], tiers.satisfaction_bonus, np.nan) \
+            if company["nps_bonus_achieved"] else 0.0
+        untouched["total_bonus"] = untouched[BONUS_COMPONENTS].sum(axis=1, skipna=False)
+        untouched["calculation_date"] = calculation_date
+
+    other_periods = previous.drop(period.index)
+    merged = pd.concat([frame for frame in (untouched, recalculated) if not frame.empty] or [recalculated],
+                       ignore_index=True)
+    merged = merged.sort_values(["plan_type", "consultant_name"], kind="stable", na_position="first")
+    return pd.concat([other_periods, merged], ignore_index=True)[RESULT_COLUMNS]
+
+
+def tiers_from_config(config):
+    """{(plan_type, component): ((umbral, monto, estricto[, tasa]), ...)} desde filas de bonus_tier_config.
+
+    Igual que bonus_tier_ranges: payout y rate NULL valen 0 y el tier paga payout + rate * métrica
+    (la tasa solo se agrega si no es 0). plan_type None = compañía.
+    """
+    tiers = {}
+    ordered = config.sort_values("lower_bound", kind="stable")
+    for row in ordered.itertuples(index=False):
+        plan = None if pd.isna(row.plan_type) else row.plan_type
+        payout = 0.0 if pd.isna(row.payout) else float(row.payout)
+        rate = 0.0 if pd.isna(row.rate) else float(row.rate)
+        tier = (float(row.lower_bound), payout, not bool(row.lower_inclusive))
+        tiers.setdefault((plan, row.component), []).append(tier + (rate,) if rate else tier)
+    return {key: tuple(values) for key, values in tiers.items()}
+
+
+class BonusTiers:
+    """Tiers y montos de todos los componentes del bono.
+
+    Sin argumentos usa las constantes del módulo; from_config() los arma desde bonus_tier_config.
+    Los componentes de un solo tier (efficiency, timeline, NPS, MBO) se guardan por plan, con el
+    umbral, el monto y si el umbral es estricto (lower_inclusive = FALSE); sin *_strict son inclusivos.
+    """
+
+    def __init__(self, company_booking=COMPANY_BOOKING_TIERS, recurring_min_ratio=RECURRING_BUSINESS_MIN_RATIO,
+                 recurring_bonus=RECURRING_BUSINESS_BONUS, commission=COMMISSION_TIERS,
+                 utilization=UTILIZATION_TIERS, efficiency_min_pct=None, efficiency_bonus=EFFICIENCY_BONUS,
+                 timeline_min_pct=TIMELINE_MIN_PCT, timeline_bonus=TIMELINE_BONUS, nps_min_score=NPS_MIN_SCORE,
+                 satisfaction_bonus=CUSTOMER_SATISFACTION_BONUS, mbo_bonus=MBO_BONUS, recurring_strict=False,
+                 efficiency_strict=None, timeline_strict=None, nps_strict=True, mbo_min=None, mbo_strict=None):
+        self.company_booking = tuple(company_booking)
+        self.recurring_min_ratio = recurring_min_ratio
+        self.recurring_strict = recurring_strict
+        self.recurring_bonus = recurring_bonus
+        self.commission = tuple(commission)
+        self.utilization = {plan: tuple(tiers) for plan, tiers in utilization.items()}
+        if efficiency_min_pct is None:
+            efficiency_min_pct = {plan: EFFICIENCY_MIN_PCT for plan in efficiency_bonus}
+        self.efficiency_min_pct = dict(efficiency_min_pct)
+        self.efficiency_strict = dict(efficiency_strict or {plan: False for plan in efficiency_bonus})
+        self.efficiency_bonus = dict(efficiency_bonus)
+        self.timeline_min_pct = dict(timeline_min_pct)
+        self.timeline_strict = dict(timeline_strict or {plan: False for plan in timeline_bonus})
+        self.timeline_bonus = dict(timeline_bonus)
+        self.nps_min_score = nps_min_score
+        self.nps_strict = nps_strict
+        self.satisfaction_bonus = dict(satisfaction_bonus)
+        self.mbo_min = dict(mbo_min or {plan: MBO_COMPLETED for plan in mbo_bonus})
+        self.mbo_strict = dict(mbo_strict or {plan: False for plan in mbo_bonus})
+        self.mbo_bonus = dict(mbo_bonus)
+
+    @classmethod
+    def from_config(cls, config):
+        """Tiers desde las filas de bonus_tier_config; lo que falte en la tabla queda con las constantes"""
+        tiers = tiers_from_config(config)
+
+        def by_plan(component):
+            return {plan: values for (plan, name), values in tiers.items() if name == component and plan is not None}
+
+        kwargs = {}
+        if (None, "company_booking_bonus") in tiers:
+            kwargs["company_booking"] = tiers[(None, "company_booking_bonus")]
+        if (None, "recurring_business_bonus") in tiers:
+            threshold, amount, strict = tier_parts(tiers[(None, "recurring_business_bonus")][0])[:3]
+            kwargs.update(recurring_min_ratio=threshold, recurring_bonus=amount, recurring_strict=strict)
+        if ("Sales", "individual_commission") in tiers:
+            kwargs["commission"] = tiers[("Sales", "individual_commission")]
+        if by_plan("utilization_bonus"):
+            kwargs["utilization"] = by_plan("utilization_bonus")
+        # Componentes de un solo tier: (umbral, monto, estricto) del primero de cada plan
+        for component, threshold_arg, strict_arg, amount_arg in (
+            ("efficiency_bonus", "efficiency_min_pct", "efficiency_strict", "efficiency_bonus"),
+            ("timeline_bonus", "timeline_min_pct", "timeline_strict", "timeline_bonus"),
+            ("customer_satisfaction_bonus", None, None, "satisfaction_bonus"),
+            ("mbo_bonus", "mbo_min", "mbo_strict", "mbo_bonus"),
+        ):
+            plans = by_plan(component)
+            if not plans:
+                continue
+            if threshold_arg:
+                kwargs[threshold_arg] = {plan: values[0][0] for plan, values in plans.items()}
+                kwargs[strict_arg] = {plan: values[0][2] for plan, values in plans.items()}
+            kwargs[amount_arg] = {plan: values[0][1] for plan, values in plans.items()}
+            if component == "customer_satisfaction_bonus":
+                # El NPS es de la compañía: un solo umbral para todos los planes
+                threshold, _, strict = min((values[0][:3] for values in plans.values()), key=lambda tier: tier[0])
+                kwargs.update(nps_min_score=threshold, nps_strict=strict)
+        return cls(**kwargs)
+
+
+DEFAULT_TIERS = BonusTiers()
+
+
+# === CARGA DE SCRIPTS SQL (datos dummy para paridad y simulaciones) ===
+
+_CREATE_TABLE = re.compile(
+    r"CREATE\s+(?:OR\s+REPLACE\s+)?TABLE\s+`[^`]*\.(\w+)`\s*\((.*?)\)\s*(?:;|PARTITION\s+BY|CLUSTER\s+BY|OPTIONS)", re.S | re.I
+)
+_INSERT = re.compile(r"INSERT\s+INTO\s+`[^`]*\.(\w+)`\s+VALUES", re.I)
+_TOKEN = re.compile(r"'(?:[^']|'')*'|[-+]?\d+(?:\.\d+)?|TRUE|FALSE|NULL|[(),;]", re.I)
+
+_DTYPES = {"STRING": object, "INTEGER": "Int64", "INT64": "Int64", "FLOAT64": float, "BOOLEAN": "boolean"}
+
+
+def _strip_comments(sql):
+    # Quita comentarios "--" fuera de literales de texto
+    return re.sub(r"('(?:[^']|'')*')|--[^\n]*", lambda m: m.group(1) or "", sql)
+
+
+def read_table_schemas(schema_sql):
+    """{tabla: [(columna, tipo)]} a partir de los CREATE TABLE"""
+    schemas = {}
+    for table, body in _CREATE_TABLE.findall(_strip_comments(schema_sql)):
+        columns = []
+        for line in body.split(","):
+            parts = line.split()
+            if len(parts) >= 2:
+                columns.append((parts[0], parts[1].upper()))
+        schemas[table] = columns
+    return schemas
+
+
+def _literal(token):
+    upper = token.upper()
+    if upper == "NULL":
+        return None
+    if upper in ("TRUE", "FALSE"):
+        return upper == "TRUE"
+    if token.startswith("'"):
+        return token[1:-1].replace("''", "'")
+    return float(token) if "." in token else int(token)
+
+
+def load_insert_script(insert_sql, schema_sql):
+    """DataFrames tipados a partir de un script de INSERT ... VALUES (como 02_insert_dummy_data.sql)"""
+    schemas = read_table_schemas(schema_sql)
+    rows = {table: [] for table in schemas}
+    sql = _strip_comments(insert_sql)
+    for match in _INSERT.finditer(sql):
+        table = match.group(1)
+        row, depth = None, 0
+        for token_match in _TOKEN.finditer(sql, match.end()):
+            token = token_match.group(0)
+            if token == "(":
+                depth += 1
+                row = []
+            elif token == ")":
+                depth -= 1
+                rows.setdefault(table, []).append(row)
+            elif token == ";" and depth == 0:
+                break
+            elif token != "," and depth:
+                row.append(_literal(token))
+
+    tables = {}
+    for table, columns in schemas.items():
+        frame = pd.DataFrame(rows.get(table, []), columns=[name for name, _ in columns])
+        for name, sql_type in columns:
+            if sql_type == "DATE":
+                frame[name] = pd.to_datetime(frame[name])
+            else:
+                frame[name] = frame[name].astype(_DTYPES.get(sql_type, object))
+        tables[table] = frame
+    return tables
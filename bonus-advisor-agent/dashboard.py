@@ -0,0 +1,74 @@
+import json
+
+# Meta trimestral usada por calculate_quarterly_bonuses
+COMPANY_BOOKING_TARGET = 600000.00
+
+BONUS_COMPONENTS = [
+    "company_booking_bonus",
+    "recurring_business_bonus",
+    "individual_commission",
+    "utilization_bonus",
+    "efficiency_bonus",
+    "timeline_bonus",
+    "customer_satisfaction_bonus",
+    "mbo_bonus"
+]
+
+
+def _float(value):
+    """Convierte escalares de pandas/NumPy a float nativo (None si es nulo)"""
+    if value is None or value != value:
+        return None
+    return round(float(value), 2)
+
+
+def build_dashboard_snapshot(results):
+    """Agrega las filas de quarterly_bonus_results del último quarter en el payload de /api/dashboard"""
+    if results.empty:
+        return {"period": None, "calculation_date": None, "company": None, "plans": []}
+
+    first = results.iloc[0]
+    booking_total = _float(first["company_booking_total"]) or 0.0
+    achievement_pct = _float(first["company_target_achievement_pct"])
+    calculation_date = results["calculation_date"].max()
+
+    company = {
+        "booking_total": booking_total,
+        "booking_target": COMPANY_BOOKING_TARGET,
+        "target_achievement_pct": achievement_pct,
+        "booking_bonus": _float(first["company_booking_bonus"]),
+        "recurring_business_pct": _float(first["recurring_business_pct"]),
+        "recurring_business_bonus": _float(first["recurring_business_bonus"]),
+        "nps": _float(first["customer_satisfaction_score"])
+    }
+
+    plans = []
+    for plan_type, group in results.groupby("plan_type", sort=True):
+        bonus = group["total_bonus"].astype(float)
+        plans.append({
+            "plan_type": plan_type,
+            "consultant_count": int(len(group)),
+            "total_bonus": _float(bonus.sum()),
+            "avg_bonus": _float(bonus.mean()),
+            "min_bonus": _float(bonus.min()),
+            "p25_bonus": _float(bonus.quantile(0.25)),
+            "median_bonus": _float(bonus.median()),
+            "p75_bonus": _float(bonus.quantile(0.75)),
+            "max_bonus": _float(bonus.max()),
+            "components": {
+                component: _float(group[component].astype(float).sum())
+                for component in BONUS_COMPONENTS if component in group
+            }
+        })
+
+    return {
+        "period": {"quarter": int(first["quarter"]), "year": int(first["year"])},
+        "calculation_date": calculation_date.isoformat() if hasattr(calculation_date, "isoformat") else calculation_date,
+        "company": company,
+        "plans": plans
+    }
+
+
+def encode_snapshot(snapshot):
+    """Serializa el snapshot una sola vez; cada page view devuelve los mismos bytes"""
+    return json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
@@ -0,0 +1,178 @@
+import re
+import unicodedata
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+BONUS = "bonus"
+BREAKDOWN = "breakdown"
+RECOMMENDATIONS = "recommendations"
+
+_CONSULTANT_ID = re.compile(r"\bcons\s?-?(\d{3})\b")
+_QUARTER = re.compile(r"\b(?:q|t|trimestre\s*)([1-4])\b")
+_ORDINAL_QUARTER = re.compile(r"\b(primer|primero|segundo|tercer|tercero|cuarto)\s+(?:trimestre|quarter)\b")
+_YEAR = re.compile(r"\b(20\d{2})\b")
+
+_INTENTS = {
+    BREAKDOWN: re.compile(r"\b(desglose|desglosa|desglosado|detalle|detallado|breakdown|componentes?|compone)\b"),
+    RECOMMENDATIONS: re.compile(
+        r"\b(mejoro|mejorar|mejore|recomendacion|recomendaciones|recomiendas?|consejos?|"
+        r"aumento|aumentar|subir|maximizo|maximizar|incremento|incrementar)\b"
+    ),
+    BONUS: re.compile(r"\b(bono|bonos|bonus|cuanto (?:gano|gane|recibo|recibi|cobro|me toca))\b"),
+}
+
+# Preguntas abiertas, comparativas o conceptuales: las resuelve el modelo
+_DEFER = re.compile(
+    r"\b(por que|porque|compar\w*|vs|versus|explica\w*|que es|que son|como funciona|como se calcula|"
+    r"diferencia\w*|promedio|equipo|todos|kpis?|si (?:cierro|hago|vendo|trabajo|logro))\b"
+)
+
+_AMBIGUOUS = "ambiguous"
+
+_ORDINALS = {"primer": 1, "primero": 1, "segundo": 2, "tercer": 3, "tercero": 3, "cuarto": 4}
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+# Palabras que no cambian el sentido de la pregunta (para la huella del cache de respuestas)
+STOPWORDS = frozenset("""
+a al algo como con cual cuales de del el en es esta este esto favor hola la las le lo los me mi mis
+oye para pero por porfa porfavor puedes que quiero saber se sobre su sus te tu tus un una uno y ya
+""".split())
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas, sin acentos ni signos de puntuación y con espacios simples"""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c)).lower()
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text)).strip()
+
+
+def question_fingerprint(message: str) -> str:
+    """Huella de la pregunta: texto normalizado sin stopwords"""
+    return " ".join(token for token in normalize_text(message).split() if token not in STOPWORDS)
+
+
+@dataclass
+class RoutedIntent:
+    intent: str
+    consultant_id: str
+    quarter: Optional[int] = None
+    year: Optional[int] = None
+    # Intenciones adicionales del mismo mensaje (p. ej. desglose + recomendaciones)
+    extra_intents: Tuple[str, ...] = ()
+
+
+class IntentRouter:
+    """Parser determinista de intención y slots para las preguntas frecuentes del chat.
+
+    Devuelve None cuando el mensaje es ambiguo; esos mensajes siguen yendo al modelo.
+    """
+
+    def __init__(self, consultants: Dict[str, Dict]):
+        self.consultants = consultants
+        names = {}
+        for consultant_id, info in consultants.items():
+            full_name = normalize_text(info.get("name", ""))
+            if not full_name:
+                continue
+            names.setdefault(full_name, set()).add(consultant_id)
+            for token in full_name.split():
+                names.setdefault(token, set()).add(consultant_id)
+        # Nombre completo antes que nombre o apellido sueltos
+        self._names = [
+            (re.compile(rf"\b{re.escape(name)}\b"), ids)
+            for name, ids in sorted(names.items(), key=lambda item: -len(item[0]))
+        ]
+
+    def parse(self, message: str, context=None) -> Optional[RoutedIntent]:
+        text = normalize_text(message)
+        if not text or _DEFER.search(text):
+            return None
+
+        intents = [name for name, pattern in _INTENTS.items() if pattern.search(text)]
+        if not intents:
+            return None
+        if len(intents) > 1 and BONUS in intents:
+            intents.remove(BONUS)  # "desglose de mi bono", "cómo mejoro mi bono"
+
+        consultant_ids, quarter, year = self.resolve_slots(message, context)
+        if len(consultant_ids) != 1 or quarter is _AMBIGUOUS or bool(quarter) != bool(year):
+            return None
+        # El orden de _INTENTS define la intención principal
+        return RoutedIntent(intents[0], consultant_ids[0], quarter, year, tuple(intents[1:]))
+
+    def resolve_slots(self, message: str, context=None):
+        """Consultores y periodo a los que se refiere el mensaje, completados con el contexto.
+
+        Devuelve (consultant_ids, quarter, year); quarter es _AMBIGUOUS si el mensaje
+        menciona más de un periodo.
+        """
+        text = normalize_text(message)
+        consultant_ids = sorted(self._consultants_in(text))
+        if not consultant_ids and context is not None and context.consultant_id:
+            consultant_ids = [context.consultant_id]
+
+        quarters = {int(q) for q in _QUARTER.findall(text)}
+        quarters.update(_ORDINALS[o] for o in _ORDINAL_QUARTER.findall(text))
+        years = {int(y) for y in _YEAR.findall(text)}
+        if len(quarters) > 1 or len(years) > 1:
+            return consultant_ids, _AMBIGUOUS, None
+        quarter = quarters.pop() if quarters else None
+        year = years.pop() if years else None
+        if quarter and not year and context is not None:
+            year = context.last_year
+        if not quarter and not year and context is not None \
+                and consultant_ids == [context.consultant_id]:
+            quarter, year = context.last_quarter, context.last_year
+        return consultant_ids, quarter, year
+
+    def _consultants_in(self, text: str) -> set:
+        found = {f"CONS{number}" for number in _CONSULTANT_ID.findall(text)}
+        for pattern, ids in self._names:
+            match = pattern.search(text)
+            if match:
+                found.update(ids)
+                text = text[:match.start()] + " " + text[match.end():]
+        return found
+
+
+def _money(value) -> str:
+    return f"${float(value or 0):,.2f}"
+
+
+def _period(data: Dict) -> str:
+    if data.get("quarter") and data.get("year"):
+        return f"Q{int(data['quarter'])} {int(data['year'])}"
+    return data.get("period", "el último periodo")
+
+
+def render_bonus(data: Dict, name: str = None) -> str:
+    if "error" in data:
+        return f"No pude obtener el bono: {data['error']}."
+    who = name or data.get("consultant_name") or data.get("consultant_id")
+    plan = f" (plan {data['plan_type']})" if data.get("plan_type") else ""
+    return f"{who}, tu bono total de {_period(data)}{plan} es de {_money(data.get('total_bonus'))}."
+
+
+def render_breakdown(data: Dict, name: str = None) -> str:
+    if "error" in data:
+        return f"No pude obtener el desglose: {data['error']}."
+    who = name or data.get("consultant_name") or "Tu"
+    lines = [f"{who}, este es el desglose de tu bono de {_period(data)}: total {_money(data.get('total_bonus'))}."]
+    for category, components in data.get("breakdown", {}).items():
+        paid = [(label, amount) for label, amount in components.items() if float(amount or 0)]
+        if paid:
+            lines.append(f"{category}: " + ", ".join(f"{label} {_money(amount)}" for label, amount in paid))
+        else:
+            lines.append(f"{category}: sin bono en este periodo")
+    return "\n".join(lines)
+
+
+def render_recommendations(recommendations: List[str], name: str = None) -> str:
+    greeting = f"{name}, " if name else ""
+    if recommendations and recommendations[0].startswith("Error"):
+        return f"No pude generar recomendaciones: {recommendations[0]}."
+    if not recommendations:
+        return f"{greeting}ya estás en el nivel más alto de los componentes que dependen de ti. ¡Sigue así!"
+    return f"{greeting}para mejorar tu bono:\n" + "\n".join(f"- {r}" for r in recommendations)
@@ -1,47 +1,100 @@
 import os
 import json
 import re
-from datetime import datetime
-from typing import Dict, List
+import threading
+import time
+import contextvars
+import functools
+import secrets
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
 from dataclasses import dataclass
 
-from google.cloud import bigquery
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, Response, g, render_template, request, jsonify, session, stream_with_context
 
-# Nuevo import para ADK
-from google.generativeai.agents import Agent, FunctionTool
+from cache import SingleFlight, TTLCache, WatermarkCache
+from dashboard import build_dashboard_snapshot, encode_snapshot
+from sessions import ConversationContext, create_session_store
+import metrics
+from metrics import (
+    BIGQUERY_DECODE_SECONDS, BIGQUERY_QUERY_SECONDS, CHAT_ANSWERS, ERRORS,
+    HTTP_REQUEST_SECONDS, LLM_SECONDS, TOOL_SECONDS
+)
+from tool_dispatch import ToolDispatcher
+import bigquery_guard
+from intent_router import (
+    BONUS, BREAKDOWN, IntentRouter, RoutedIntent, question_fingerprint,
+    render_bonus, render_breakdown, render_recommendations
+)
+
+# google.cloud.bigquery, el ADK y pandas se importan en el primer uso (arranque rápido en Cloud Run)
 
 PROJECT_ID = "jrodriguez-sandbox"
 
-class ConversationContext:
-    """Maneja el contexto de la conversación por usuario"""
-    def __init__(self):
-        self.consultant_id = None
-        self.consultant_name = None
-        self.plan_type = None
-        self.last_quarter = None
-        self.last_year = None
-        self.conversation_history = []
-
-    def update_consultant(self, consultant_id, consultant_name=None, plan_type=None):
-        self.consultant_id = consultant_id
-        self.consultant_name = consultant_name
-        self.plan_type = plan_type
-
-    def update_time_period(self, quarter=None, year=None):
-        if quarter:
-            self.last_quarter = quarter
-        if year:
-            self.last_year = year
-
-    def add_to_history(self, user_message, agent_response):
-        self.conversation_history.append({
-            "user": user_message,
-            "agent": agent_response,
-            "timestamp": datetime.now().isoformat()
-        })
-        if len(self.conversation_history) > 5:
-            self.conversation_history = self.conversation_history[-5:]
+# Cache de resultados de bonos (se invalida cuando avanza calculation_date)
+BONUS_CACHE_MAX_ENTRIES = int(os.environ.get('BONUS_CACHE_MAX_ENTRIES', 2048))
+BONUS_CACHE_TTL_SECONDS = float(os.environ.get('BONUS_CACHE_TTL_SECONDS', 900))
+BONUS_CACHE_WATERMARK_INTERVAL = float(os.environ.get('BONUS_CACHE_WATERMARK_INTERVAL', 60))
+
+# Resultados de herramientas por sesión (reutilizados en preguntas de seguimiento)
+SESSION_RESULTS_MAX_SESSIONS = int(os.environ.get('SESSION_RESULTS_MAX_SESSIONS', 1000))
+SESSION_RESULTS_TTL_SECONDS = float(os.environ.get('SESSION_RESULTS_TTL_SECONDS', 1800))
+SESSION_RESULTS_PER_SESSION = 8
+
+# Límite de IDs por llamada a /api/bonus/batch
+BONUS_BATCH_MAX_IDS = int(os.environ.get('BONUS_BATCH_MAX_IDS', 5000))
+
+# Réplica en memoria de quarterly_bonus_results (fallback a BigQuery si está fría o vencida)
+BONUS_REPLICA_ENABLED = os.environ.get('BONUS_REPLICA_ENABLED', 'true').lower() == 'true'
+BONUS_REPLICA_REFRESH_SECONDS = float(os.environ.get('BONUS_REPLICA_REFRESH_SECONDS', 60))
+BONUS_REPLICA_MAX_STALENESS_SECONDS = float(os.environ.get('BONUS_REPLICA_MAX_STALENESS_SECONDS', 600))
+BONUS_REPLICA_WARMUP_TIMEOUT_SECONDS = float(os.environ.get('BONUS_REPLICA_WARMUP_TIMEOUT_SECONDS', 90))
+
+# Tiers de bonus_tier_config (las constantes de bonus_engine son el fallback)
+TIER_CONFIG_TTL_SECONDS = float(os.environ.get('TIER_CONFIG_TTL_SECONDS', 300))
+
+# Mapeo de consultores
+CONSULTANTS = {
+    "CONS001": {"name": "Rodolfo Solar", "plan": "Sales"},
+    "CONS002": {"name": "Anthony Alarcon", "plan": "Delivery"},
+    "CONS003": {"name": "Julian Rodriguez", "plan": "Hybrid"}
+}
+
+# Respuestas deterministas (sin LLM) para preguntas frecuentes
+INTENT_ROUTER_ENABLED = os.environ.get('INTENT_ROUTER_ENABLED', 'true').lower() == 'true'
+
+# Cache de respuestas del modelo (se vacía cuando avanza calculation_date)
+ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', 4096))
+ANSWER_CACHE_TTL_SECONDS = float(os.environ.get('ANSWER_CACHE_TTL_SECONDS', 6 * 3600))
+
+# Ejecución de herramientas del agente: pool acotado, timeout por herramienta y deadline por turno
+TOOL_POOL_MAX_WORKERS = int(os.environ.get('TOOL_POOL_MAX_WORKERS', 16))
+TOOL_TIMEOUT_SECONDS = float(os.environ.get('TOOL_TIMEOUT_SECONDS', 10))
+CHAT_TURN_TIMEOUT_SECONDS = float(os.environ.get('CHAT_TURN_TIMEOUT_SECONDS', 25))
+
+# Warmup en segundo plano al arrancar el worker (además del hook /warmup)
+WARMUP_ON_START = os.environ.get('WARMUP_ON_START', 'false').lower() == 'true'
+
+# Memo de filas consultadas durante un request HTTP o un turno de chat
+_request_memo = contextvars.ContextVar('bonus_request_memo', default=None)
+
+def _bigquery():
+    from google.cloud import bigquery
+    return bigquery
+
+def __getattr__(name):
+    # Mantiene `main.bigquery` disponible sin importarlo al cargar el módulo
+    if name == 'bigquery':
+        return _bigquery()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _timed_tool(method):
+    """Registra la duración de cada herramienta del agente en bonus_tool_seconds."""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with TOOL_SECONDS.time(tool=method.__name__):
+            return method(*args, **kwargs)
+    return wrapper
 
 @dataclass
 class BonusCalculation:
@@ -55,19 +108,83 @@ class BonusCalculation:
     recommendations: List[str]
 
 class BonusAdvisorAgent:
-    def __init__(self):
-        self.client = bigquery.Client(project=PROJECT_ID)
+    def __init__(self, client=None, agent=None):
+        # Cliente de BigQuery y agente del ADK se construyen en el primer uso
+        self._client = client
+        self._agent = agent
+        self._init_lock = threading.Lock()
         self.table_id = f"{PROJECT_ID}.hackathon_bonus_update.quarterly_bonus_results"
+        self.projects_table_id = f"{PROJECT_ID}.hackathon_bonus_update.consultant_projects_master"
+        # Última fila de cada consultor, mantenida por los procedimientos de cálculo
+        self.latest_table_id = f"{PROJECT_ID}.hackathon_bonus_update.consultant_latest_bonus"
+        self.tier_config_table_id = f"{PROJECT_ID}.hackathon_bonus_update.bonus_tier_config"
+
+        # Cache read-through por (consultant_id, quarter, year)
+        self.cache = WatermarkCache(
+            max_entries=BONUS_CACHE_MAX_ENTRIES,
+            ttl_seconds=BONUS_CACHE_TTL_SECONDS
+        )
+        self.session_results = TTLCache(
+            max_entries=SESSION_RESULTS_MAX_SESSIONS,
+            ttl_seconds=SESSION_RESULTS_TTL_SECONDS
+        )
+        self.answer_cache = TTLCache(
+            max_entries=ANSWER_CACHE_MAX_ENTRIES,
+            ttl_seconds=ANSWER_CACHE_TTL_SECONDS
+        )
+        self.tier_cache = TTLCache(max_entries=1, ttl_seconds=TIER_CONFIG_TTL_SECONDS)
+        self._inflight = SingleFlight()
+        self.tool_dispatcher = ToolDispatcher(
+            max_workers=TOOL_POOL_MAX_WORKERS,
+            tool_timeout_seconds=TOOL_TIMEOUT_SECONDS,
+            turn_timeout_seconds=CHAT_TURN_TIMEOUT_SECONDS
+        )
+        self._watermark_checked_at = time.monotonic()
+        self._watermark_lock = threading.Lock()
+
+        # Snapshot agregado del dashboard (se recalcula solo cuando avanza calculation_date)
+        self._dashboard_snapshot = None
+        self._dashboard_lock = threading.Lock()
+
+        # Réplica columnar; la carga el hilo de start_replica()
+        from replica import BonusResultsReplica
+        self.replica = BonusResultsReplica(max_staleness_seconds=BONUS_REPLICA_MAX_STALENESS_SECONDS)
+        self._replica_refresher = None
 
         # Mapeo de consultores
-        self.consultants = {
-            "CONS001": {"name": "Rodolfo Solar", "plan": "Sales"},
-            "CONS002": {"name": "Anthony Alarcon", "plan": "Delivery"},
-            "CONS003": {"name": "Julian Rodriguez", "plan": "Hybrid"}
-        }
+        self.consultants = CONSULTANTS
+        self.intent_router = IntentRouter(CONSULTANTS)
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    self._client = _bigquery().Client(project=PROJECT_ID)
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @property
+    def agent(self):
+        if self._agent is None:
+            with self._init_lock:
+                if self._agent is None:
+                    self._agent = self._build_adk_agent()
+        return self._agent
+
+    @agent.setter
+    def agent(self, value):
+        self._agent = value
+
+    def _build_adk_agent(self):
+        # Nuevo import para ADK
+        from google.generativeai.agents import Agent, FunctionTool
 
         # Construimos el agente del ADK
-        self.agent = Agent(
+        agent = Agent(
             model="models/gemini-2.5-flash",
             instructions=(
                 "Eres un asistente experto en el sistema de bonos de la empresa. "
@@ -77,37 +194,317 @@ class BonusAdvisorAgent:
             )
         )
 
-        # Registramos funciones como herramientas del agente
-        self.agent.register_tool(FunctionTool(self.get_consultant_bonus))
-        self.agent.register_tool(FunctionTool(self.get_bonus_breakdown))
-        self.agent.register_tool(FunctionTool(self.get_improvement_recommendations))
+        # Registramos funciones como herramientas del agente; corren en el pool del dispatcher
+        # con timeout por herramienta y el deadline del turno
+        tools = [self.get_consultant_bonus, self.get_bonus_breakdown, self.get_improvement_recommendations]
+        for tool in tools:
+            agent.register_tool(FunctionTool(self.tool_dispatcher.wrap(tool)))
+        return agent
+
+    def warmup(self):
+        """Inicializa cliente, agente, tiers y réplica antes del primer request real (idempotente).
+
+        Es de mejor esfuerzo: si la réplica no carga a tiempo los requests consultan BigQuery
+        y el hilo de la réplica sigue reintentando en segundo plano.
+        """
+        self.client
+        self.agent
+        self.bonus_tiers()
+        if BONUS_REPLICA_ENABLED:
+            self.start_replica()
+            # Se espera la primera carga de la réplica (el hilo la hace de inmediato)
+            deadline = time.monotonic() + BONUS_REPLICA_WARMUP_TIMEOUT_SECONDS
+            while not self.replica.is_fresh() and time.monotonic() < deadline:
+                time.sleep(0.1)
+            if not self.replica.is_fresh():
+                print("Warmup sin réplica: los requests consultan BigQuery hasta que cargue")
+
+    # === CACHE DE RESULTADOS ===
+    def refresh_watermark(self, force: bool = False) -> bool:
+        """Consulta MAX(calculation_date) como máximo una vez por intervalo e invalida el cache si avanzó.
+
+        Salvo con force=True, la consulta corre en segundo plano para no sumar la latencia
+        de BigQuery al request que la dispara.
+        """
+        if not force and self.replica.is_fresh():
+            return False  # El hilo de la réplica ya vigila calculation_date
+        now = time.monotonic()
+        with self._watermark_lock:
+            if not force and now - self._watermark_checked_at < BONUS_CACHE_WATERMARK_INTERVAL:
+                return False
+            self._watermark_checked_at = now
+        if not force:
+            threading.Thread(target=self._poll_watermark, daemon=True).start()
+            return False
+        return self._poll_watermark()
+
+    def _run_query(self, name: str, query: str, job_config=None):
+        """Ejecuta una query y la decodifica a DataFrame, midiendo ambas etapas por separado.
+
+        bigquery_guard aplica el presupuesto de bytes del call site y registra su costo.
+        """
+        with BIGQUERY_QUERY_SECONDS.time(query=name):
+            job = bigquery_guard.run_query(self.client, name, query, job_config)
+        with BIGQUERY_DECODE_SECONDS.time(query=name):
+            return job.to_dataframe()
+
+    def _fetch_watermark(self):
+        query = f"SELECT MAX(calculation_date) AS calculation_date FROM `{self.table_id}`"
+        results = self._run_query("watermark", query)
+        return None if results.empty else results.iloc[0]["calculation_date"]
+
+    def _poll_watermark(self) -> bool:
+        try:
+            return self._observe_watermark(self._fetch_watermark())
+        except Exception as e:
+            ERRORS.inc(stage="watermark")
+            print(f"Error consultando calculation_date: {e}")
+            return False
+
+    # === RÉPLICA EN MEMORIA ===
+    def _fetch_all_results(self):
+        return self._run_query("replica", f"SELECT * FROM `{self.table_id}`")
+
+    def start_replica(self):
+        """Carga quarterly_bonus_results en memoria y la mantiene al día en segundo plano."""
+        from replica import ReplicaRefresher
+        if self._replica_refresher is None or not self._replica_refresher.is_alive():
+            self._replica_refresher = ReplicaRefresher(
+                self.replica,
+                fetch_watermark=self._fetch_watermark,
+                fetch_table=self._fetch_all_results,
+                interval_seconds=BONUS_REPLICA_REFRESH_SECONDS,
+                on_refresh=self._observe_watermark
+            )
+            self._replica_refresher.start()
+        return self._replica_refresher
+
+    def _observe_watermark(self, calculation_date) -> bool:
+        advanced = self.cache.observe(calculation_date)
+        if advanced:
+            self.session_results.clear()
+            self.answer_cache.clear()
+        return advanced
+
+    def _store_bonus_row(self, key, row: Dict):
+        self._observe_watermark(row.get("calculation_date"))
+        keys = [key]
+        if key[1] is None and row.get("quarter") and row.get("year"):
+            # La consulta "último periodo" también resuelve el periodo explícito
+            keys.append((key[0], int(row["quarter"]), int(row["year"])))
+        memo = _request_memo.get()
+        for k in keys:
+            self.cache.set(k, row)
+            if memo is not None:
+                memo[k] = row
+
+    @contextmanager
+    def request_scope(self, session_id: str = None):
+        """Comparte las filas de bonos entre las herramientas de un mismo request o turno de chat."""
+        memo = _request_memo.get()
+        if memo is not None:
+            # Scope anidado: reutiliza el memo abierto y solo agrega lo guardado en la sesión
+            if session_id:
+                for k, row in (self.session_results.get(session_id) or {}).items():
+                    memo.setdefault(k, row)
+            yield memo
+            return
+
+        self.refresh_watermark()
+        memo = dict(self.session_results.get(session_id) or {}) if session_id else {}
+        token = _request_memo.set(memo)
+        try:
+            yield memo
+        finally:
+            _request_memo.reset(token)
+            if session_id and memo:
+                recent = list(memo.items())[-SESSION_RESULTS_PER_SESSION:]
+                self.session_results.set(session_id, dict(recent))
 
     # === FUNCIONES DE NEGOCIO (mantenemos igual) ===
+    @_timed_tool
     def get_consultant_bonus(self, consultant_id: str, quarter: int = None, year: int = None) -> Dict:
+        key = (consultant_id, quarter, year) if quarter and year else (consultant_id, None, None)
+        memo = _request_memo.get()
+        if memo is not None and key in memo:
+            return dict(memo[key])
+        if self.replica.is_fresh():
+            row = self.replica.lookup(consultant_id, quarter, year)
+            if row is None:
+                return {"error": "Consultor no encontrado"}
+            if memo is not None:
+                memo[key] = row
+            return dict(row)
+        self.refresh_watermark()
+        cached = self.cache.get(key)
+        if cached is not None:
+            if memo is not None:
+                memo[key] = cached
+            return dict(cached)
+
+        # Herramientas concurrentes que piden la misma fila comparten un solo job de BigQuery
+        row = self._inflight.do(key, lambda: self._query_consultant_bonus(consultant_id, quarter, year))
+        if "error" in row:
+            return dict(row)
+        self._store_bonus_row(key, row)
+        return dict(row)
+
+    def _query_consultant_bonus(self, consultant_id: str, quarter: int = None, year: int = None) -> Dict:
         try:
+            bigquery = _bigquery()
+            # Sin periodo: lectura puntual en consultant_latest_bonus (clustering por consultant_id)
+            table_id = self.table_id if quarter and year else self.latest_table_id
             query = f"""
             SELECT *
-            FROM `{self.table_id}`
+            FROM `{table_id}`
             WHERE consultant_id = @consultant_id
             """
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[bigquery.ScalarQueryParameter("consultant_id", "STRING", consultant_id)]
-            )
+            # QueryJobConfig.query_parameters devuelve una copia: se arma la lista completa antes
+            query_parameters = [bigquery.ScalarQueryParameter("consultant_id", "STRING", consultant_id)]
             if quarter and year:
                 query += " AND quarter = @quarter AND year = @year"
-                job_config.query_parameters.extend([
+                query_parameters.extend([
                     bigquery.ScalarQueryParameter("quarter", "INT64", quarter),
                     bigquery.ScalarQueryParameter("year", "INT64", year)
                 ])
-            query += " ORDER BY year DESC, quarter DESC LIMIT 1"
+            job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+            query += " LIMIT 1"
 
-            results = self.client.query(query, job_config=job_config).to_dataframe()
+            results = self._run_query("bonus", query, job_config)
             if results.empty:
                 return {"error": "Consultor no encontrado"}
             return results.iloc[0].to_dict()
         except Exception as e:
+            ERRORS.inc(stage="bigquery")
             return {"error": f"Error consultando BigQuery: {str(e)}"}
 
+    def get_consultant_bonuses(self, consultant_ids: List[str], quarter: int = None, year: int = None) -> Iterator[Dict]:
+        """Bonos de varios consultores con una sola query (UNNEST); emite las filas a medida que llegan."""
+        consultant_ids = list(dict.fromkeys(consultant_ids))
+        if self.replica.is_fresh():
+            for consultant_id in consultant_ids:
+                row = self.replica.lookup(consultant_id, quarter, year)
+                yield row if row is not None else {"consultant_id": consultant_id, "error": "Consultor no encontrado"}
+            return
+        self.refresh_watermark()
+
+        missing = []
+        for consultant_id in consultant_ids:
+            key = (consultant_id, quarter, year) if quarter and year else (consultant_id, None, None)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield dict(cached)
+            else:
+                missing.append(consultant_id)
+        if not missing:
+            return
+
+        try:
+            bigquery = _bigquery()
+            table_id = self.table_id if quarter and year else self.latest_table_id
+            query = f"""
+            SELECT *
+            FROM `{table_id}`
+            WHERE consultant_id IN UNNEST(@consultant_ids)
+            """
+            # QueryJobConfig.query_parameters devuelve una copia: se arma la lista completa antes
+            query_parameters = [bigquery.ArrayQueryParameter("consultant_ids", "STRING", missing)]
+            if quarter and year:
+                query += " AND quarter = @quarter AND year = @year"
+                query_parameters.extend([
+                    bigquery.ScalarQueryParameter("quarter", "INT64", quarter),
+                    bigquery.ScalarQueryParameter("year", "INT64", year)
+                ])
+            job_config = bigquery.QueryJobConfig(query_parameters=query_parameters)
+            # Una fila por consultor aunque el periodo tenga duplicados
+            query += " QUALIFY ROW_NUMBER() OVER (PARTITION BY consultant_id ORDER BY calculation_date DESC) = 1"
+
+            found = set()
+            with BIGQUERY_QUERY_SECONDS.time(query="bonus_batch"):
+                rows = bigquery_guard.query_rows(self.client, "bonus_batch", query, job_config, page_size=1000)
+            for bq_row in rows:
+                row = dict(bq_row.items())
+                key = (row["consultant_id"], quarter, year) if quarter and year else (row["consultant_id"], None, None)
+                self._store_bonus_row(key, row)
+                found.add(row["consultant_id"])
+                yield dict(row)
+        except Exception as e:
+            ERRORS.inc(stage="bigquery")
+            yield {"error": f"Error consultando BigQuery: {str(e)}"}
+            return
+
+        for consultant_id in missing:
+            if consultant_id not in found:
+                yield {"consultant_id": consultant_id, "error": "Consultor no encontrado"}
+
+    def _period_results(self, name: str, quarter: int = None, year: int = None):
+        """Filas de un quarter completo (el último si no se indica) desde la réplica o con una sola query."""
+        if self.replica.is_fresh():
+            if quarter and year:
+                return self.replica.period_frame(year, quarter)
+            return self.replica.latest_period_frame()
+        if quarter and year:
+            bigquery = _bigquery()
+            query = f"""
+            SELECT *
+            FROM `{self.table_id}`
+            WHERE quarter = @quarter AND year = @year
+            """
+            job_config = bigquery.QueryJobConfig(query_parameters=[
+                bigquery.ScalarQueryParameter("quarter", "INT64", quarter),
+                bigquery.ScalarQueryParameter("year", "INT64", year)
+            ])
+            return self._run_query(name, query, job_config)
+        # Script de dos pasos: con el periodo en una variable, la segunda lectura poda particiones
+        # en lugar de rankear toda la historia
+        query = f"""
+        DECLARE latest STRUCT<year INT64, quarter INT64> DEFAULT (
+          SELECT AS STRUCT year, quarter
+          FROM `{self.table_id}`
+          ORDER BY year DESC, quarter DESC
+          LIMIT 1
+        );
+        SELECT *
+        FROM `{self.table_id}`
+        WHERE year = latest.year AND quarter = latest.quarter;
+        """
+        return self._run_query(name, query)
+
+    def get_dashboard_snapshot(self) -> Dict:
+        """Snapshot del último quarter: métricas de compañía y distribución de bonos por plan.
+
+        Se construye una vez por cada ejecución de calculate_quarterly_bonuses; los page views
+        reutilizan el payload ya serializado y no escanean quarterly_bonus_results.
+        """
+        self.refresh_watermark()
+        snapshot = self._dashboard_snapshot
+        if snapshot is not None and snapshot["watermark"] == self.cache.watermark:
+            return snapshot
+
+        with self._dashboard_lock:
+            snapshot = self._dashboard_snapshot
+            if snapshot is not None and snapshot["watermark"] == self.cache.watermark:
+                return snapshot
+            try:
+                results = self._period_results("dashboard")
+                payload = build_dashboard_snapshot(results)
+            except Exception as e:
+                ERRORS.inc(stage="dashboard")
+                if snapshot is not None:
+                    return snapshot  # Mejor un snapshot anterior que un dashboard vacío
+                return {"error": f"Error consultando BigQuery: {str(e)}"}
+
+            if not results.empty:
+                self._observe_watermark(results["calculation_date"].max())
+            snapshot = {
+                "watermark": self.cache.watermark,
+                "payload": payload,
+                "body": encode_snapshot(payload)
+            }
+            self._dashboard_snapshot = snapshot
+            return snapshot
+
+    @_timed_tool
     def get_bonus_breakdown(self, consultant_id: str, quarter: int = None, year: int = None) -> Dict:
         data = self.get_consultant_bonus(consultant_id, quarter, year)
         if "error" in data:
@@ -136,55 +533,389 @@ class BonusAdvisorAgent:
             "period": f"Q{data.get('quarter', 'N/A')} {data.get('year', 'N/A')}"
         }
 
+    @_timed_tool
     def get_improvement_recommendations(self, consultant_id: str, plan_type: str) -> List[str]:
         data = self.get_consultant_bonus(consultant_id)
         if "error" in data:
             return ["Error: Consultor no encontrado"]
 
-        recommendations = []
-        if plan_type == "Sales":
-            if data.get("individual_tcv", 0) < 1000000:
-                recommendations.append("Enfócate en cerrar deals de mayor valor para alcanzar $1M TCV.")
-        elif plan_type == "Hybrid":
-            if data.get("project_hours", 0) < 225:
-                recommendations.append("Incrementa horas de proyecto para obtener utilization bonus.")
-        elif plan_type == "Delivery":
-            if data.get("project_hours", 0) < 450:
-                recommendations.append("Aumenta las horas de proyecto para maximizar el bonus.")
-        return recommendations
-
-    def chat_with_agent(self, user_message: str, session_id: str) -> str:
+        # Mismos tiers que el what-if, evaluados sobre la fila del consultor (sin timeline: no hay conteo de proyectos)
+        import pandas as pd
+        from whatif import describe_gap, next_tier_gaps
+        row = dict(data, plan_type=plan_type or data.get("plan_type"))
+        gaps = next_tier_gaps(pd.DataFrame([row]), tiers=self.bonus_tiers())
+        return [describe_gap(gap) for gap in gaps.to_dict("records")]
+
+    def bonus_tiers(self):
+        """Tiers vigentes de bonus_tier_config, cacheados TIER_CONFIG_TTL_SECONDS.
+
+        Si la tabla no responde se usan las constantes de bonus_engine (también cacheadas, para no
+        repetir la query fallida en cada recomendación).
+        """
+        tiers = self.tier_cache.get("tiers")
+        if tiers is not None:
+            return tiers
+        return self._inflight.do(("bonus_tiers",), self._load_tiers)
+
+    def _load_tiers(self):
+        from bonus_engine import DEFAULT_TIERS, BonusTiers
+        try:
+            config = self._run_query("tier_config", f"SELECT * FROM `{self.tier_config_table_id}`")
+            tiers = BonusTiers.from_config(config) if not config.empty else DEFAULT_TIERS
+        except Exception as e:
+            ERRORS.inc(stage="bigquery")
+            print(f"Error consultando bonus_tier_config; se usan los tiers por defecto: {e}")
+            tiers = DEFAULT_TIERS
+        self.tier_cache.set("tiers", tiers)
+        return tiers
+
+    def _timeline_counts(self, quarter: int, year: int):
+        """Proyectos completados y a tiempo de todos los consultores del quarter, en una sola query."""
+        bigquery = _bigquery()
+        query = f"""
+        SELECT
+          consultant_id,
+          COUNT(*) AS completed_projects,
+          COUNTIF(actual_end_date <= planned_end_date) AS on_time_projects
+        FROM `{self.projects_table_id}`
+        WHERE quarter = @quarter AND year = @year
+          AND actual_end_date IS NOT NULL
+        GROUP BY consultant_id
+        """
+        job_config = bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("quarter", "INT64", quarter),
+            bigquery.ScalarQueryParameter("year", "INT64", year)
+        ])
+        return self._run_query("timeline_counts", query, job_config).set_index("consultant_id")
+
+    def get_next_tier_gaps(self, quarter: int = None, year: int = None) -> Dict:
+        """Qué le falta a cada consultor del quarter para el siguiente tier de cada componente.
+
+        Toda la población se resuelve con las filas del periodo y un conteo agregado de proyectos;
+        el resultado queda en cache hasta que avance calculation_date.
+        """
+        self.refresh_watermark()
+        key = ("next_tier_gaps", quarter, year) if quarter and year else ("next_tier_gaps", None, None)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        from whatif import company_gaps, describe_gap, next_tier_gaps
+        try:
+            results = self._period_results("whatif", quarter, year)
+        except Exception as e:
+            ERRORS.inc(stage="bigquery")
+            return {"error": f"Error consultando BigQuery: {str(e)}"}
+        if results.empty:
+            return {"error": "Periodo sin resultados"}
+        quarter, year = int(results["quarter"].iloc[0]), int(results["year"].iloc[0])
+        try:
+            counts = self._timeline_counts(quarter, year)
+        except Exception as e:
+            ERRORS.inc(stage="bigquery")
+            print(f"Error consultando proyectos; what-if sin timeline: {e}")
+            counts = None
+
+        tiers = self.bonus_tiers()
+        consultants = {}
+        for row in results[["consultant_id", "consultant_name", "plan_type", "total_bonus"]].to_dict("records"):
+            consultants[row["consultant_id"]] = dict(row, gaps=[])
+        for gap in next_tier_gaps(results, counts, tiers).to_dict("records"):
+            gap["recommendation"] = describe_gap(gap)
+            consultant_id = gap.pop("consultant_id")
+            del gap["consultant_name"], gap["plan_type"]
+            consultants[consultant_id]["gaps"].append(gap)
+
+        payload = {
+            "quarter": quarter,
+            "year": year,
+            "period": f"Q{quarter} {year}",
+            "company": company_gaps(results, tiers),
+            "consultants": consultants
+        }
+        self._observe_watermark(results["calculation_date"].max())
+        self.cache.set(key, payload)
+        return payload
+
+    def _context_preamble(self, context: ConversationContext) -> str:
+        """Resume el contexto conocido para que el agente no vuelva a pedir el ID del consultor."""
+        if context is None or not context.consultant_id:
+            return ""
+        parts = [f"consultor {context.consultant_id}"]
+        if context.consultant_name:
+            parts.append(f"nombre {context.consultant_name}")
+        if context.plan_type:
+            parts.append(f"plan {context.plan_type}")
+        if context.last_quarter and context.last_year:
+            parts.append(f"último periodo consultado Q{context.last_quarter} {context.last_year}")
+        return f"[Contexto: {', '.join(parts)}]\n"
+
+    def _recommendations_for(self, consultant_id: str) -> List[str]:
+        plan_type = self.consultants.get(consultant_id, {}).get("plan")
+        if not plan_type:
+            plan_type = self.get_consultant_bonus(consultant_id).get("plan_type")
+        return self.get_improvement_recommendations(consultant_id, plan_type)
+
+    def _answer_routed(self, routed: RoutedIntent, context: ConversationContext = None) -> str:
+        """Responde una intención reconocida llamando directamente a las herramientas."""
+        info = self.consultants.get(routed.consultant_id, {})
+        name = info.get("name")
+        period = (routed.consultant_id, routed.quarter, routed.year)
+        intents = (routed.intent,) + routed.extra_intents
+        calls = []
+        for intent in intents:
+            if intent == BONUS:
+                calls.append((self.get_consultant_bonus, period, {}))
+            elif intent == BREAKDOWN:
+                calls.append((self.get_bonus_breakdown, period, {}))
+            else:
+                calls.append((self._recommendations_for, (routed.consultant_id,), {}))
+        # Varias herramientas independientes corren en paralelo: el turno tarda lo que la más lenta
+        if len(calls) > 1:
+            results = self.tool_dispatcher.call_many(calls)
+        else:
+            results = [fn(*args, **kwargs) for fn, args, kwargs in calls]
+
+        answers = []
+        for intent, result in zip(intents, results):
+            if intent == BONUS:
+                answers.append(render_bonus(result, name))
+            elif intent == BREAKDOWN:
+                answers.append(render_breakdown(result, name))
+            else:
+                if isinstance(result, dict):  # Timeout o error del dispatcher
+                    result = [f"Error: {result['error']}"]
+                answers.append(render_recommendations(result, name))
+
+        primary = results[0]
+        failed = "error" in primary if isinstance(primary, dict) else bool(primary) and primary[0].startswith("Error")
+        if context is not None and not failed:
+            if context.consultant_id != routed.consultant_id:
+                context.update_consultant(routed.consultant_id, name, info.get("plan"))
+            context.update_time_period(routed.quarter, routed.year)
+        return "\n\n".join(answers)
+
+    def _answer_cache_key(self, user_message: str, context: ConversationContext = None):
+        """Huella de la pregunta + consultor y periodo resueltos + calculation_date de los datos.
+
+        Sin consultor resuelto no hay clave: la respuesta depende del historial de la sesión en ADK
+        y no se puede compartir entre sesiones.
+        """
+        fingerprint = question_fingerprint(user_message)
+        watermark = self.cache.watermark
+        if not fingerprint or watermark is None:
+            return None
+        consultant_ids, quarter, year = self.intent_router.resolve_slots(user_message, context)
+        if not consultant_ids:
+            return None
+        return (fingerprint, tuple(consultant_ids), quarter, year, watermark)
+
+    def chat_with_agent(self, user_message: str, session_id: str, context: ConversationContext = None) -> str:
         """Llamada principal al agente usando ADK."""
-        response = self.agent.query(user_message, session_id=session_id)
-        return response.text or "No pude procesar tu consulta."
+        # Todas las herramientas del turno comparten la misma fila de BigQuery
+        with self.request_scope(session_id), self.tool_dispatcher.turn():
+            # Las preguntas formulaicas se responden sin pasar por el modelo
+            routed = self.intent_router.parse(user_message, context) if INTENT_ROUTER_ENABLED else None
+            if routed is not None:
+                CHAT_ANSWERS.inc(source="router")
+                return self._answer_routed(routed, context)
+
+            key = self._answer_cache_key(user_message, context)
+            cached = self.answer_cache.get(key) if key is not None else None
+            if cached is not None:
+                CHAT_ANSWERS.inc(source="answer_cache")
+                return cached
+
+            CHAT_ANSWERS.inc(source="model")
+            try:
+                with LLM_SECONDS.time():
+                    response = self.agent.query(self._context_preamble(context) + user_message, session_id=session_id)
+            except Exception:
+                ERRORS.inc(stage="llm")
+                raise
+        if not response.text:
+            return "No pude procesar tu consulta."
+        # La llamada pudo haber observado calculation_date por primera vez: se recalcula la clave
+        key = self._answer_cache_key(user_message, context)
+        if key is not None:
+            self.answer_cache.set(key, response.text)
+        return response.text
 
 # Flask App
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'dev-secret-key')
-bonus_agent = BonusAdvisorAgent()
+
+class _LazyBonusAgent:
+    """Construye BonusAdvisorAgent en el primer uso para que el worker responda de inmediato."""
+    def __init__(self, factory=None):
+        # factory permite a los tests construir el agente sin BigQuery/ADK reales
+        self._factory = factory or BonusAdvisorAgent
+        self._instance = None
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+        self._warm = threading.Event()
+
+    def get(self) -> BonusAdvisorAgent:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    instance = self._factory()
+                    if BONUS_REPLICA_ENABLED:
+                        instance.start_replica()
+                    self._instance = instance
+        return self._instance
+
+    def start_warmup(self) -> bool:
+        """Lanza el warmup en segundo plano; devuelve True solo cuando terminó bien."""
+        with self._lock:
+            if not self._warm.is_set() and (self._warmup_thread is None or not self._warmup_thread.is_alive()):
+                # Un warmup fallido se reintenta en la siguiente llamada a /warmup
+                self._warmup_thread = threading.Thread(target=self._run_warmup, name="bonus-warmup", daemon=True)
+                self._warmup_thread.start()
+        return self._warm.is_set()
+
+    def _run_warmup(self):
+        try:
+            self.get().warmup()
+        except Exception as e:
+            print(f"Error en warmup: {e}")
+            return
+        self._warm.set()
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+bonus_agent = _LazyBonusAgent()
+session_store = create_session_store()
+if WARMUP_ON_START:
+    bonus_agent.start_warmup()
+
+def _cache_metrics():
+    # Sin instanciar el agente: un scrape no debe disparar el arranque de BigQuery/ADK
+    instance = bonus_agent._instance
+    if instance is None:
+        return {}
+    return {"bonus": instance.cache, "session_results": instance.session_results, "answers": instance.answer_cache}
+
+metrics.REGISTRY.register_collector(metrics.cache_collector(_cache_metrics))
+metrics.REGISTRY.register_collector(metrics.cost_collector(bigquery_guard.LEDGER.snapshot))
+
+@app.before_request
+def _start_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _observe_request(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - started, route=route, method=request.method, status=response.status_code
+        )
+        if response.status_code >= 500:
+            ERRORS.inc(stage="http")
+    return response
+
+def with_request_scope(view):
+    """Abre un memo de bonos por request para que cada fila se consulte una sola vez."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        with bonus_agent.request_scope():
+            return view(*args, **kwargs)
+    return wrapper
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/warmup')
+def warmup():
+    # Hook de mejor esfuerzo: responde al instante y calienta en segundo plano. Siempre 200, así un
+    # problema de BigQuery no bloquea el arranque; el status solo informa si ya terminó
+    if bonus_agent.start_warmup():
+        return jsonify({'status': 'ready'})
+    return jsonify({'status': 'warming'})
+
 @app.route('/api/chat', methods=['POST'])
 def chat():
     data = request.json
     user_message = data.get('message', '')
-    session_id = session.get('session_id', 'default')
-    if 'session_id' not in session:
+    session_id = session.get('session_id')
+    if not session_id:
+        # Sesión propia por usuario (antes todos los anónimos compartían 'default')
+        session_id = secrets.token_urlsafe(16)
         session['session_id'] = session_id
-    response = bonus_agent.chat_with_agent(user_message, session_id)
+
+    context = session_store.get(session_id)
+    consultant_id = data.get('consultant_id')
+    if consultant_id and consultant_id != context.consultant_id:
+        info = CONSULTANTS.get(consultant_id, {})
+        context.update_consultant(consultant_id, info.get('name'), info.get('plan'))
+
+    response = bonus_agent.chat_with_agent(user_message, session_id, context)
+    context.add_to_history(user_message, response)
+    session_store.save(session_id, context)
     return jsonify({'response': response})
 
 @app.route('/api/bonus/<consultant_id>')
+@with_request_scope
 def get_bonus_api(consultant_id):
     quarter = request.args.get('quarter', type=int)
     year = request.args.get('year', type=int)
     result = bonus_agent.get_consultant_bonus(consultant_id, quarter, year)
     return jsonify(result)
 
+def _json_default(value):
+    """Serializa fechas y escalares de NumPy/pandas en las filas de BigQuery."""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+def _valid_period(quarter, year):
+    """quarter y year enteros en rango, o ambos ausentes (último quarter calculado)"""
+    if quarter is None and year is None:
+        return True
+    if any(isinstance(value, bool) or not isinstance(value, int) for value in (quarter, year)):
+        return False
+    return 1 <= quarter <= 4 and 2000 <= year <= 2100
+
+@app.route('/api/bonus/batch', methods=['POST'])
+def get_bonus_batch_api():
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({'error': 'El cuerpo debe ser un objeto JSON'}), 400
+    consultant_ids = data.get('consultant_ids')
+    if not isinstance(consultant_ids, list) or not all(isinstance(c, str) for c in consultant_ids):
+        return jsonify({'error': 'consultant_ids debe ser una lista de IDs'}), 400
+    if len(consultant_ids) > BONUS_BATCH_MAX_IDS:
+        return jsonify({'error': f'Máximo {BONUS_BATCH_MAX_IDS} consultores por llamada'}), 400
+    quarter = data.get('quarter')
+    year = data.get('year')
+    if not _valid_period(quarter, year):
+        return jsonify({'error': 'quarter (1-4) y year deben ser enteros y venir juntos'}), 400
+
+    # NDJSON: una fila por línea, emitida a medida que BigQuery devuelve páginas
+    def generate():
+        for row in bonus_agent.get_consultant_bonuses(consultant_ids, quarter, year):
+            yield json.dumps(row, default=_json_default) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/dashboard')
+def get_dashboard_api():
+    snapshot = bonus_agent.get_dashboard_snapshot()
+    if "error" in snapshot:
+        return jsonify(snapshot), 503
+    return Response(snapshot["body"], mimetype='application/json')
+
 @app.route('/api/breakdown/<consultant_id>')
+@with_request_scope
 def get_breakdown_api(consultant_id):
     quarter = request.args.get('quarter', type=int)
     year = request.args.get('year', type=int)
@@ -192,10 +923,26 @@ def get_breakdown_api(consultant_id):
     return jsonify(result)
 
 @app.route('/api/recommendations/<consultant_id>/<plan_type>')
+@with_request_scope
 def get_recommendations_api(consultant_id, plan_type):
     result = bonus_agent.get_improvement_recommendations(consultant_id, plan_type)
     return jsonify({'recommendations': result})
 
+@app.route('/api/what-if')
+def get_what_if_api():
+    quarter = request.args.get('quarter', type=int)
+    year = request.args.get('year', type=int)
+    consultant_id = request.args.get('consultant_id')
+    result = bonus_agent.get_next_tier_gaps(quarter, year)
+    if "error" in result:
+        return jsonify(result), 503
+    if consultant_id:
+        consultant = result["consultants"].get(consultant_id)
+        if consultant is None:
+            return jsonify({'error': 'Consultor no encontrado'}), 404
+        result = dict(result, consultants={consultant_id: consultant})
+    return Response(json.dumps(result, default=_json_default), mimetype='application/json')
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 8080))
     app.run(host='0.0.0.0', port=port, debug=True)
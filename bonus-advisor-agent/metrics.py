@@ -0,0 +1,202 @@
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Buckets en segundos: del lookup en memoria (~100µs) a una llamada lenta al modelo
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}, recibió {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            lines.extend(self._render_series(key, value) for key, value in series)
+        return "\n".join(line for line in lines if line)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._series.get(self._key(labels), 0)
+
+    def _render_series(self, key, value):
+        return f"{self.name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [conteo por bucket (no acumulado) ..., +Inf, suma]
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def _render_series(self, key, series):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, [("le", _format_value(bound))])
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self.labelnames, key)
+        lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines)
+
+
+class Registry:
+    """Métricas del proceso en formato de exposición de texto de Prometheus.
+
+    Con un solo worker de gunicorn (ver Dockerfile) el registro en memoria cubre todo el tráfico.
+    Los colectores se evalúan solo al renderizar, sin costo en el camino de los requests.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, collector):
+        """collector() devuelve una lista de Counter ya poblados al momento de renderizar"""
+        self._collectors.append(collector)
+
+    def render(self):
+        blocks = [metric.render() for metric in self._metrics]
+        for collector in self._collectors:
+            blocks.extend(metric.render() for metric in collector())
+        return "\n".join(blocks) + "\n"
+
+
+REGISTRY = Registry()
+
+BIGQUERY_QUERY_SECONDS = REGISTRY.histogram(
+    "bonus_bigquery_query_seconds", "Tiempo de ejecución de queries de BigQuery", ["query"]
+)
+BIGQUERY_DECODE_SECONDS = REGISTRY.histogram(
+    "bonus_bigquery_decode_seconds", "Tiempo de to_dataframe sobre resultados de BigQuery", ["query"]
+)
+LLM_SECONDS = REGISTRY.histogram(
+    "bonus_llm_seconds", "Tiempo de la llamada al agente/modelo por turno de chat"
+)
+TOOL_SECONDS = REGISTRY.histogram(
+    "bonus_tool_seconds", "Tiempo por herramienta del agente", ["tool"]
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "bonus_http_request_seconds", "Latencia end-to-end por ruta", ["route", "method", "status"]
+)
+CHAT_ANSWERS = REGISTRY.counter(
+    "bonus_chat_answers", "Respuestas de chat por origen (router, answer_cache, model)", ["source"]
+)
+ERRORS = REGISTRY.counter(
+    "bonus_errors", "Errores por etapa", ["stage"]
+)
+
+
+def cache_collector(caches):
+    """Colector de hits/misses a partir de los contadores que ya llevan los TTLCache.
+
+    caches() devuelve {nombre: TTLCache}; se evalúa en cada scrape.
+    """
+    def collect():
+        requests_total = Counter("bonus_cache_requests", "Lookups de cache por resultado", ["cache", "result"])
+        for name, cache in caches().items():
+            stats = cache.stats()
+            requests_total.inc(stats["hits"], cache=name, result="hit")
+            requests_total.inc(stats["misses"], cache=name, result="miss")
+        return [requests_total]
+    return collect
+
+
+def cost_collector(snapshot):
+    """Colector de costo de BigQuery por call site a partir del ledger de bigquery_guard.
+
+    snapshot() devuelve {nombre: stats}; se evalúa en cada scrape.
+    """
+    def collect():
+        counters = {
+            "bytes_processed": Counter("bonus_bigquery_bytes_processed", "Bytes procesados por BigQuery", ["query"]),
+            "bytes_billed": Counter("bonus_bigquery_bytes_billed", "Bytes facturados por BigQuery", ["query"]),
+            "slot_ms": Counter("bonus_bigquery_slot_ms", "Slot-ms consumidos por BigQuery", ["query"]),
+            "cache_hits": Counter("bonus_bigquery_cache_hits", "Queries resueltas desde el cache de BigQuery", ["query"]),
+            "rejected": Counter("bonus_bigquery_rejected", "Queries rechazadas por presupuesto de bytes", ["query"]),
+        }
+        for name, stats in snapshot().items():
+            for field, counter in counters.items():
+                counter.inc(stats[field], query=name)
+        return list(counters.values())
+    return collect
@@ -0,0 +1,153 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+
+def _native(value):
+    """Convierte escalares de NumPy a tipos nativos (pandas.Timestamp y nulos se mantienen)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+class _ReplicaState:
+    """Columnas e índices de una carga completa; se reemplaza entero en cada refresh"""
+    __slots__ = ("columns", "by_key", "latest_by_consultant", "by_period", "row_count", "calculation_date")
+
+    def __init__(self, results):
+        self.columns = {name: results[name].to_numpy() for name in results.columns}
+        self.row_count = len(results)
+
+        consultant_ids = self.columns["consultant_id"]
+        quarters = results["quarter"].to_numpy(dtype=np.int64)
+        years = results["year"].to_numpy(dtype=np.int64)
+
+        # Posiciones ordenadas por (year DESC, quarter DESC): la primera por consultor es la última
+        order = np.lexsort((-quarters, -years))
+        self.by_key = {}
+        self.latest_by_consultant = {}
+        for pos in order.tolist():
+            consultant_id = consultant_ids[pos]
+            self.latest_by_consultant.setdefault(consultant_id, pos)
+            self.by_key[(consultant_id, int(quarters[pos]), int(years[pos]))] = pos
+
+        self.by_period = {}
+        if self.row_count:
+            periods = years * 10 + quarters
+            for period in np.unique(periods).tolist():
+                self.by_period[(period // 10, period % 10)] = np.flatnonzero(periods == period)
+
+        calculation_dates = results["calculation_date"] if "calculation_date" in results else pd.Series(dtype=object)
+        self.calculation_date = calculation_dates.max() if len(calculation_dates) else None
+
+    def row(self, pos):
+        return {name: _native(column[pos]) for name, column in self.columns.items()}
+
+
+class BonusResultsReplica:
+    """Réplica columnar en memoria de quarterly_bonus_results, indexada por consultor y periodo"""
+
+    def __init__(self, max_staleness_seconds=600.0, clock=time.monotonic):
+        self.max_staleness_seconds = max_staleness_seconds
+        self._clock = clock
+        self._state = None
+        self._checked_at = None
+
+    def load(self, results):
+        """Reemplaza la réplica completa con un DataFrame de quarterly_bonus_results"""
+        state = _ReplicaState(results)
+        self._state = state  # Swap atómico: los lectores ven la carga anterior o la nueva
+        self._checked_at = self._clock()
+
+    def mark_checked(self):
+        """Registra que calculation_date no avanzó: la réplica sigue vigente"""
+        if self._state is not None:
+            self._checked_at = self._clock()
+
+    def is_fresh(self):
+        # Una carga vacía cuenta como fría: los lookups vuelven a BigQuery en vez de dar "no encontrado"
+        return (
+            self._state is not None
+            and self._state.row_count > 0
+            and self._clock() - self._checked_at <= self.max_staleness_seconds
+        )
+
+    @property
+    def calculation_date(self):
+        return self._state.calculation_date if self._state is not None else None
+
+    @property
+    def row_count(self):
+        return self._state.row_count if self._state is not None else 0
+
+    def lookup(self, consultant_id, quarter=None, year=None):
+        """Fila del consultor para el periodo (o la más reciente); None si no existe"""
+        state = self._state
+        if state is None:
+            return None
+        if quarter and year:
+            pos = state.by_key.get((consultant_id, int(quarter), int(year)))
+        else:
+            pos = state.latest_by_consultant.get(consultant_id)
+        return None if pos is None else state.row(pos)
+
+    def latest_period(self):
+        state = self._state
+        if state is None or not state.by_period:
+            return None
+        return max(state.by_period)
+
+    def latest_period_frame(self):
+        period = self.latest_period()
+        if period is None:
+            return pd.DataFrame()
+        return self.period_frame(*period)
+
+    def period_frame(self, year, quarter):
+        """Filas de un periodo como DataFrame (para agregados como el dashboard)"""
+        state = self._state
+        if state is None:
+            return pd.DataFrame()
+        positions = state.by_period.get((year, quarter))
+        if positions is None:
+            return pd.DataFrame(columns=list(state.columns))
+        return pd.DataFrame({name: column[positions] for name, column in state.columns.items()})
+
+
+class ReplicaRefresher(threading.Thread):
+    """Hilo que recarga la réplica cuando avanza MAX(calculation_date)"""
+
+    def __init__(self, replica, fetch_watermark, fetch_table, interval_seconds=60.0, on_refresh=None):
+        super().__init__(name="bonus-replica-refresher", daemon=True)
+        self.replica = replica
+        self.fetch_watermark = fetch_watermark
+        self.fetch_table = fetch_table
+        self.interval_seconds = interval_seconds
+        self.on_refresh = on_refresh
+        self._stop_event = threading.Event()
+
+    def refresh_once(self):
+        """Devuelve True si la réplica se recargó"""
+        watermark = self.fetch_watermark()
+        current = self.replica.calculation_date
+        if self.replica.row_count and watermark is not None and current is not None and watermark <= current:
+            self.replica.mark_checked()
+            return False
+        self.replica.load(self.fetch_table())
+        if self.on_refresh is not None:
+            self.on_refresh(self.replica.calculation_date)
+        return True
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.refresh_once()
+            except Exception as e:
+                # La réplica envejece y los lookups vuelven a BigQuery hasta el próximo intento
+                print(f"Error refrescando réplica de bonos: {e}")
+            self._stop_event.wait(self.interval_seconds)
+
+    def stop(self):
+        self._stop_event.set()
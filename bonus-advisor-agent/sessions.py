@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+
+HISTORY_SIZE = 5
+
+# Overhead aproximado de un ConversationContext vacío (objeto con __slots__ + deque)
+_CONTEXT_BASE_BYTES = 800
+
+
+class ConversationContext:
+    """Maneja el contexto de la conversación por usuario"""
+    __slots__ = (
+        "consultant_id", "consultant_name", "plan_type",
+        "last_quarter", "last_year", "conversation_history"
+    )
+
+    def __init__(self):
+        self.consultant_id = None
+        self.consultant_name = None
+        self.plan_type = None
+        self.last_quarter = None
+        self.last_year = None
+        # Ring buffer: (mensaje, respuesta, timestamp) de los últimos turnos
+        self.conversation_history = deque(maxlen=HISTORY_SIZE)
+
+    def update_consultant(self, consultant_id, consultant_name=None, plan_type=None):
+        self.consultant_id = consultant_id
+        self.consultant_name = consultant_name
+        self.plan_type = plan_type
+
+    def update_time_period(self, quarter=None, year=None):
+        if quarter:
+            self.last_quarter = quarter
+        if year:
+            self.last_year = year
+
+    def add_to_history(self, user_message, agent_response):
+        self.conversation_history.append(
+            (user_message, agent_response, datetime.now().isoformat(timespec="seconds"))
+        )
+
+    def approx_size(self):
+        """Tamaño aproximado en bytes, usado para el techo de memoria del store"""
+        return _CONTEXT_BASE_BYTES + sum(
+            len(user) + len(agent) + len(ts) for user, agent, ts in self.conversation_history
+        )
+
+    def to_dict(self):
+        return {
+            "consultant_id": self.consultant_id,
+            "consultant_name": self.consultant_name,
+            "plan_type": self.plan_type,
+            "last_quarter": self.last_quarter,
+            "last_year": self.last_year,
+            "conversation_history": [list(turn) for turn in self.conversation_history]
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        context = cls()
+        context.update_consultant(data.get("consultant_id"), data.get("consultant_name"), data.get("plan_type"))
+        context.update_time_period(data.get("last_quarter"), data.get("last_year"))
+        for turn in data.get("conversation_history", []):
+            context.conversation_history.append(tuple(turn))
+        return context
+
+
+class SessionStore:
+    """Store en memoria de ConversationContext con desalojo LRU, TTL y techo de memoria"""
+
+    def __init__(self, max_sessions=10000, ttl_seconds=3600.0, max_bytes=64 * 1024 * 1024, clock=time.monotonic):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._sessions = OrderedDict()  # session_id -> [last_seen, size, context]
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        """Contexto de la sesión (nuevo si no existe o expiró)"""
+        with self._lock:
+            now = self._clock()
+            self._evict_expired(now)
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                context = ConversationContext()
+                entry = [now, context.approx_size(), context]
+                self._sessions[session_id] = entry
+                self._total_bytes += entry[1]
+                self._evict_over_limits()
+            else:
+                entry[0] = now
+                self._sessions.move_to_end(session_id)
+            return entry[2]
+
+    def save(self, session_id, context):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self._total_bytes -= entry[1]
+            size = context.approx_size()
+            self._sessions[session_id] = [self._clock(), size, context]
+            self._total_bytes += size
+            self._evict_over_limits()
+
+    def delete(self, session_id):
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+            if entry is not None:
+                self._total_bytes -= entry[1]
+
+    def stats(self):
+        return {"sessions": len(self._sessions), "approx_bytes": self._total_bytes}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _evict_expired(self, now):
+        # El OrderedDict está en orden de último acceso: las expiradas están al frente
+        while self._sessions:
+            session_id, entry = next(iter(self._sessions.items()))
+            if now - entry[0] < self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self._total_bytes -= entry[1]
+
+    def _evict_over_limits(self):
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+        ):
+            _, entry = self._sessions.popitem(last=False)
+            self._total_bytes -= entry[1]
+
+
+class SQLiteSessionStore:
+    """Store de sesiones en un archivo SQLite compartido entre workers de gunicorn"""
+
+    # Cada cuántos save() se purgan sesiones expiradas / sobrantes
+    PURGE_EVERY = 100
+
+    def __init__(self, path, max_sessions=10000, ttl_seconds=3600.0, clock=time.time):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._saves = 0
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT data, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+        ).fetchone()
+        if row is None or self._clock() - row[1] >= self.ttl_seconds:
+            return ConversationContext()
+        return ConversationContext.from_dict(json.loads(row[0]))
+
+    def save(self, session_id, context):
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, data, updated_at) VALUES (?, ?, ?)",
+                (session_id, json.dumps(context.to_dict(), ensure_ascii=False), self._clock())
+            )
+        self._saves += 1
+        if self._saves % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def delete(self, session_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def purge(self):
+        """Elimina sesiones expiradas y las menos recientes por encima de max_sessions"""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (self._clock() - self.ttl_seconds,))
+            conn.execute(
+                "DELETE FROM sessions WHERE session_id IN ("
+                " SELECT session_id FROM sessions ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,)
+            )
+
+    def stats(self):
+        count = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {"sessions": count, "path": self.path}
+
+    def __len__(self):
+        return self.stats()["sessions"]
+
+
+def create_session_store():
+    """SQLite si SESSION_STORE_PATH está definido (sesiones compartidas entre workers); si no, memoria"""
+    max_sessions = int(os.environ.get("SESSION_STORE_MAX_SESSIONS", 10000))
+    ttl_seconds = float(os.environ.get("SESSION_STORE_TTL_SECONDS", 3600))
+    path = os.environ.get("SESSION_STORE_PATH")
+    if path:
+        return SQLiteSessionStore(path, max_sessions=max_sessions, ttl_seconds=ttl_seconds)
+    return SessionStore(
+        max_sessions=max_sessions,
+        ttl_seconds=ttl_seconds,
+        max_bytes=int(os.environ.get("SESSION_STORE_MAX_BYTES", 64 * 1024 * 1024))
+    )
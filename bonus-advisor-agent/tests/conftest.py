@@ -0,0 +1,32 @@
+import os
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+# Suite hermética: sin hilo de réplica ni warmup al importar main (ambos irían a BigQuery/ADC)
+os.environ.setdefault('BONUS_REPLICA_ENABLED', 'false')
+os.environ.setdefault('WARMUP_ON_START', 'false')
+
+
+@pytest.fixture(autouse=True)
+def offline_bonus_agent(monkeypatch):
+    """El agente perezoso de main se construye con cliente y modelo sin red.
+
+    Las queries fallan como fallaría BigQuery sin credenciales, pero sin tocar ADC ni el
+    servidor de metadata de GCP. Los tests que necesitan datos siguen parcheando main.bonus_agent.
+    """
+    main = sys.modules.get('main')
+    if main is None:
+        yield
+        return
+
+    def build():
+        client = MagicMock()
+        client.query.side_effect = RuntimeError('BigQuery no disponible en tests')
+        agent = MagicMock()
+        agent.run.side_effect = RuntimeError('Modelo no disponible en tests')
+        return main.BonusAdvisorAgent(client=client, agent=agent)
+
+    monkeypatch.setattr(main, 'bonus_agent', main._LazyBonusAgent(factory=build))
+    yield
@@ -4,12 +4,14 @@ from unittest.mock import patch, MagicMock
 import pandas as pd
 import json
 import sys
+import time
 import os
 
 # Add the parent directory to sys.path to import main
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from main import BonusAdvisorAgent
+from sessions import ConversationContext
 
 
 class TestBonusAdvisorAgent:
@@ -24,8 +26,7 @@ class TestBonusAdvisorAgent:
     @pytest.fixture
     def bonus_agent(self, mock_bigquery_client):
         """Instancia del agente con mocks"""
-        with patch('main.vertexai.init'), \
-             patch('main.GenerativeModel'):
+        with patch.object(BonusAdvisorAgent, '_build_adk_agent'):
             agent = BonusAdvisorAgent()
             agent.client = mock_bigquery_client
             return agent
@@ -83,6 +84,232 @@ class TestBonusAdvisorAgent:
         call_args = mock_bigquery_client.query.call_args
         assert 'consultant_id = @consultant_id' in call_args[0][0]
     
+    def test_get_consultant_bonus_latest_point_read(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test de lookup sin periodo: lectura puntual en consultant_latest_bonus, sin ordenar la historia"""
+        mock_query_job = MagicMock()
+        mock_query_job.to_dataframe.return_value = pd.DataFrame([sample_consultant_data])
+        mock_bigquery_client.query.return_value = mock_query_job
+
+        result = bonus_agent.get_consultant_bonus('CONS001')
+
+        assert result['total_bonus'] == 13305.20
+        query = mock_bigquery_client.query.call_args[0][0]
+        assert 'consultant_latest_bonus' in query
+        assert 'quarterly_bonus_results' not in query
+        assert 'ORDER BY' not in query
+
+    def test_get_consultant_bonus_uses_cache(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test de cache read-through: la segunda consulta no llama a BigQuery"""
+        mock_query_job = MagicMock()
+        mock_query_job.to_dataframe.return_value = pd.DataFrame([sample_consultant_data])
+        mock_bigquery_client.query.return_value = mock_query_job
+
+        first = bonus_agent.get_consultant_bonus('CONS001', 2, 2025)
+        second = bonus_agent.get_consultant_bonus('CONS001', 2, 2025)
+
+        assert first == second
+        mock_bigquery_client.query.assert_called_once()
+
+    def test_get_consultant_bonus_cache_invalidated_by_calculation_date(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test de invalidación del cache cuando avanza calculation_date"""
+        mock_query_job = MagicMock()
+        mock_query_job.to_dataframe.return_value = pd.DataFrame([sample_consultant_data])
+        mock_bigquery_client.query.return_value = mock_query_job
+        bonus_agent.get_consultant_bonus('CONS001', 2, 2025)
+
+        # Nueva ejecución de calculate_quarterly_bonuses
+        newer_watermark = pd.DataFrame([{'calculation_date': '2025-07-02T10:00:00Z'}])
+        mock_watermark_job = MagicMock()
+        mock_watermark_job.to_dataframe.return_value = newer_watermark
+        mock_bigquery_client.query.return_value = mock_watermark_job
+        assert bonus_agent.refresh_watermark(force=True) is True
+
+        mock_bigquery_client.query.return_value = mock_query_job
+        bonus_agent.get_consultant_bonus('CONS001', 2, 2025)
+        assert mock_bigquery_client.query.call_count == 3
+
+    def test_request_scope_fetches_row_once(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test de memo por turno: bono, desglose y recomendaciones comparten una sola query"""
+        bonus_agent.cache.ttl_seconds = 0  # Sin cache compartido, solo el memo del turno
+        bonus_agent.bonus_tiers()  # Los tiers se cargan en el warmup
+        mock_bigquery_client.query.reset_mock()
+        mock_query_job = MagicMock()
+        mock_query_job.to_dataframe.return_value = pd.DataFrame([sample_consultant_data])
+        mock_bigquery_client.query.return_value = mock_query_job
+
+        with bonus_agent.request_scope('session-1'):
+            bonus_agent.get_consultant_bonus('CONS001')
+            bonus_agent.get_bonus_breakdown('CONS001', 2, 2025)
+            bonus_agent.get_improvement_recommendations('CONS001', 'Sales')
+
+        mock_bigquery_client.query.assert_called_once()
+
+        # Pregunta de seguimiento en la misma sesión
+        with bonus_agent.request_scope('session-1'):
+            bonus_agent.get_bonus_breakdown('CONS001')
+        mock_bigquery_client.query.assert_called_once()
+
+        # Otra sesión no comparte el memo
+        with bonus_agent.request_scope('session-2'):
+            bonus_agent.get_bonus_breakdown('CONS001')
+        assert mock_bigquery_client.query.call_count == 2
+
+    def test_get_consultant_bonuses_single_query(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test de lookup batch: una sola query con parámetro array para todos los IDs"""
+        mock_row = MagicMock()
+        mock_row.items.return_value = sample_consultant_data.items()
+        mock_query_job = MagicMock()
+        mock_query_job.result.return_value = [mock_row]
+        mock_bigquery_client.query.return_value = mock_query_job
+
+        rows = list(bonus_agent.get_consultant_bonuses(['CONS001', 'CONS999', 'CONS001'], 2, 2025))
+
+        mock_bigquery_client.query.assert_called_once()
+        query = mock_bigquery_client.query.call_args[0][0]
+        assert 'IN UNNEST(@consultant_ids)' in query
+        assert 'QUALIFY' in query
+        assert rows[0]['consultant_id'] == 'CONS001'
+        assert rows[1] == {'consultant_id': 'CONS999', 'error': 'Consultor no encontrado'}
+
+        # Las filas encontradas quedan en cache para el lookup individual
+        assert bonus_agent.get_consultant_bonus('CONS001', 2, 2025)['total_bonus'] == 13305.20
+        mock_bigquery_client.query.assert_called_once()
+
+    def test_get_consultant_bonus_served_from_replica(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test de lookups desde la réplica en memoria sin llamar a BigQuery"""
+        bonus_agent.replica.load(pd.DataFrame([sample_consultant_data]))
+
+        result = bonus_agent.get_consultant_bonus('CONS001')
+        missing = bonus_agent.get_consultant_bonus('CONS999')
+
+        assert result['total_bonus'] == 13305.20
+        assert missing == {'error': 'Consultor no encontrado'}
+        mock_bigquery_client.query.assert_not_called()
+
+    def test_chat_fast_path_skips_model(self, bonus_agent, mock_bigquery_client, sample_consultant_data):
+        """Test del router determinista: preguntas frecuentes sin llamar al modelo"""
+        bonus_agent.agent = MagicMock()
+        bonus_agent.replica.load(pd.DataFrame([sample_consultant_data]))
+        context = ConversationContext()
+
+        answer = bonus_agent.chat_with_agent("¿Cuál es el bono de CONS001 en Q2 2025?", 'session-1', context)
+
+        assert '$13,305.20' in answer
+        assert context.consultant_id == 'CONS001'
+        assert (context.last_quarter, context.last_year) == (2, 2025)
+        bonus_agent.agent.query.assert_not_called()
+
+        bonus_agent.chat_with_agent("¿Cómo funciona el sistema de bonos?", 'session-1', context)
+        bonus_agent.agent.query.assert_called_once()
+
+    def test_chat_parallel_tools_share_query(self, sample_consultant_data):
+        """Test de herramientas en paralelo: desglose + recomendaciones en un solo job de BigQuery"""
+        from benchmarks.fakes import FakeBigQueryClient
+        client = FakeBigQueryClient(pd.DataFrame([sample_consultant_data]), latency_seconds=0.2)
+        agent = BonusAdvisorAgent(client=client, agent=MagicMock())
+        agent.refresh_watermark = MagicMock(return_value=False)
+        agent.bonus_tiers()  # Los tiers se cargan en el warmup
+        client.query_count = 0
+        context = ConversationContext()
+        context.update_consultant('CONS001', 'Rodolfo Solar', 'Sales')
+
+        start = time.perf_counter()
+        answer = agent.chat_with_agent("Dame el desglose y cómo mejoro mi bono", 'session-1', context)
+        elapsed = time.perf_counter() - start
+
+        assert 'desglose' in answer
+        assert 'para mejorar tu bono' in answer
+        assert client.query_count == 1
+        assert elapsed < 0.35
+        agent.agent.query.assert_not_called()
+
+    def test_next_tier_gaps_whole_quarter(self):
+        """Test del what-if: toda la población con dos queries y luego desde el cache"""
+        from benchmarks.fakes import FakeBigQueryClient, make_bonus_results
+        client = FakeBigQueryClient(make_bonus_results(30))
+        agent = BonusAdvisorAgent(client=client, agent=MagicMock())
+        agent.refresh_watermark = MagicMock(return_value=False)
+        agent.bonus_tiers()  # Los tiers se cargan en el warmup
+        client.query_count = 0
+
+        result = agent.get_next_tier_gaps(2, 2025)
+
+        assert result['period'] == 'Q2 2025'
+        assert len(result['consultants']) == 30
+        assert client.query_count == 2
+        delivery = result['consultants']['CONS002']
+        components = {gap['component']: gap for gap in delivery['gaps']}
+        assert components['timeline_bonus']['needed'] == 4
+        assert 'efficiency_bonus' not in components  # project_hours == total_quarter_hours
+        assert all(gap['recommendation'] for gap in delivery['gaps'])
+        assert agent.get_next_tier_gaps(2, 2025) is result
+        assert client.query_count == 2
+
+    def test_bonus_tiers_loaded_once_from_table(self):
+        """Test de tiers leídos de bonus_tier_config una vez por TTL y aplicados al what-if"""
+        from benchmarks.fakes import FakeBigQueryClient, make_bonus_results, tier_config
+        from bonus_engine import BonusTiers
+        client = FakeBigQueryClient(make_bonus_results(30))
+        agent = BonusAdvisorAgent(client=client, agent=MagicMock())
+        agent.refresh_watermark = MagicMock(return_value=False)
+        config = tier_config()
+        config.loc[(config['plan_type'] == 'Delivery') & (config['component'] == 'timeline_bonus'), 'payout'] = 900.0
+
+        with patch('benchmarks.fakes.tier_config', return_value=config):
+            tiers = agent.bonus_tiers()
+            assert agent.bonus_tiers() is tiers
+        assert client.query_count == 1
+        assert isinstance(tiers, BonusTiers) and tiers.timeline_bonus['Delivery'] == 900.0
+
+        result = agent.get_next_tier_gaps(2, 2025)
+        components = {gap['component']: gap for gap in result['consultants']['CONS002']['gaps']}
+        assert components['timeline_bonus']['next_bonus'] == 900.0
+
+    def test_bonus_tiers_fallback_to_constants(self, bonus_agent, mock_bigquery_client):
+        """Test de bonus_tier_config inaccesible: se usan las constantes del motor"""
+        from bonus_engine import DEFAULT_TIERS
+        mock_bigquery_client.query.side_effect = Exception("BigQuery error")
+
+        assert bonus_agent.bonus_tiers() is DEFAULT_TIERS
+        assert bonus_agent.bonus_tiers() is DEFAULT_TIERS
+        mock_bigquery_client.query.assert_called_once()
+
+    def test_chat_answer_cache(self, bonus_agent, sample_consultant_data):
+        """Test del cache de respuestas: preguntas equivalentes no vuelven a llamar al modelo"""
+        bonus_agent.agent = MagicMock()
+        bonus_agent.agent.query.return_value.text = "El bono se calcula con 7 KPIs."
+        bonus_agent.cache.observe(pd.Timestamp('2025-07-01T10:00:00Z'))
+        context = ConversationContext()
+        context.update_consultant('CONS001', 'Rodolfo Solar', 'Sales')
+
+        first = bonus_agent.chat_with_agent("¿Cómo funciona el sistema de bonos?", 'session-1', context)
+        second = bonus_agent.chat_with_agent("como funciona el sistema de bonos", 'session-2', context)
+
+        assert first == second == "El bono se calcula con 7 KPIs."
+        bonus_agent.agent.query.assert_called_once()
+        assert bonus_agent.answer_cache.stats()['hits'] == 1
+
+        # Otro consultor no comparte la respuesta
+        context.update_consultant('CONS002', 'Anthony Alarcon', 'Delivery')
+        bonus_agent.chat_with_agent("¿Cómo funciona el sistema de bonos?", 'session-3', context)
+        assert bonus_agent.agent.query.call_count == 2
+
+        # Un nuevo cálculo trimestral invalida las respuestas
+        bonus_agent._observe_watermark(pd.Timestamp('2025-10-01T10:00:00Z'))
+        assert len(bonus_agent.answer_cache) == 0
+
+    def test_chat_answer_cache_skipped_without_consultant(self, bonus_agent):
+        """Test de preguntas sin consultor resuelto: cada sesión pasa por el modelo"""
+        bonus_agent.agent = MagicMock()
+        bonus_agent.agent.query.side_effect = lambda message, session_id: MagicMock(text=f"Respuesta {session_id}")
+        bonus_agent.cache.observe(pd.Timestamp('2025-07-01T10:00:00Z'))
+
+        first = bonus_agent.chat_with_agent("¿Cómo funciona el sistema de bonos?", 'session-1', ConversationContext())
+        second = bonus_agent.chat_with_agent("¿Cómo funciona el sistema de bonos?", 'session-2', ConversationContext())
+
+        assert (first, second) == ("Respuesta session-1", "Respuesta session-2")
+        assert len(bonus_agent.answer_cache) == 0
+
     def test_get_consultant_bonus_not_found(self, bonus_agent, mock_bigquery_client):
         """Test cuando no se encuentra el consultor"""
         # Configurar mock para retornar DataFrame vacío
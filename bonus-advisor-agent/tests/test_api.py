@@ -2,6 +2,7 @@ import pytest
 import json
 import sys
 import os
+import threading
 from unittest.mock import patch, MagicMock
 import pandas as pd
 
@@ -77,13 +78,16 @@ class TestFlaskAPI:
         assert 'response' in response_data
         assert response_data['response'] == "Esta es la respuesta del agente"
         
-        # Verificar que se llamó al agente correctamente
-        mock_bonus_agent.chat_with_agent.assert_called_once_with(
-            '¿Cuál es mi bono actual?', 'CONS001'
-        )
+        # Verificar que se llamó al agente con una sesión propia y el contexto del consultor
+        message, session_id, context = mock_bonus_agent.chat_with_agent.call_args[0]
+        assert message == '¿Cuál es mi bono actual?'
+        assert session_id and session_id != 'default'
+        assert context.consultant_id == 'CONS001'
+        assert context.consultant_name == 'Rodolfo Solar'
     
     def test_chat_api_empty_message(self, client, mock_bonus_agent):
         """Test del endpoint de chat con mensaje vacío"""
+        mock_bonus_agent.chat_with_agent.return_value = "¿En qué puedo ayudarte?"
         data = {
             'message': '',
             'consultant_id': 'CONS001'
@@ -95,10 +99,13 @@ class TestFlaskAPI:
         
         assert response.status_code == 200
         # El agente debería manejar mensajes vacíos
-        mock_bonus_agent.chat_with_agent.assert_called_once_with('', 'CONS001')
+        message, _, context = mock_bonus_agent.chat_with_agent.call_args[0]
+        assert message == ''
+        assert context.consultant_id == 'CONS001'
     
     def test_chat_api_no_consultant_id(self, client, mock_bonus_agent):
         """Test del endpoint de chat sin consultant_id"""
+        mock_bonus_agent.chat_with_agent.return_value = "El sistema de bonos tiene 7 KPIs"
         data = {
             'message': '¿Cómo funciona el sistema de bonos?'
         }
@@ -108,9 +115,26 @@ class TestFlaskAPI:
                              content_type='application/json')
         
         assert response.status_code == 200
-        mock_bonus_agent.chat_with_agent.assert_called_once_with(
-            '¿Cómo funciona el sistema de bonos?', None
-        )
+        message, _, context = mock_bonus_agent.chat_with_agent.call_args[0]
+        assert message == '¿Cómo funciona el sistema de bonos?'
+        assert context.consultant_id is None
+
+    def test_chat_api_keeps_session_context(self, client, mock_bonus_agent):
+        """Test de sesión por usuario: el contexto persiste entre turnos"""
+        mock_bonus_agent.chat_with_agent.return_value = "Respuesta"
+
+        client.post('/api/chat',
+                    data=json.dumps({'message': 'Hola', 'consultant_id': 'CONS002'}),
+                    content_type='application/json')
+        client.post('/api/chat',
+                    data=json.dumps({'message': '¿Y mi desglose?'}),
+                    content_type='application/json')
+
+        first, second = mock_bonus_agent.chat_with_agent.call_args_list
+        assert first[0][1] == second[0][1]
+        context = second[0][2]
+        assert context.consultant_id == 'CONS002'
+        assert [turn[0] for turn in context.conversation_history] == ['Hola', '¿Y mi desglose?']
     
     def test_get_bonus_api_success(self, client, mock_bonus_agent, sample_consultant_data):
         """Test exitoso del endpoint de bono"""
@@ -151,6 +175,60 @@ class TestFlaskAPI:
         assert 'error' in response_data
         assert response_data['error'] == "Consultor no encontrado"
     
+    def test_get_bonus_batch_api_streams_rows(self, client, mock_bonus_agent, sample_consultant_data):
+        """Test del endpoint batch: una fila NDJSON por consultor"""
+        mock_bonus_agent.get_consultant_bonuses.return_value = iter([
+            sample_consultant_data,
+            {'consultant_id': 'CONS999', 'error': 'Consultor no encontrado'}
+        ])
+
+        response = client.post('/api/bonus/batch',
+                             data=json.dumps({'consultant_ids': ['CONS001', 'CONS999'], 'quarter': 2, 'year': 2025}),
+                             content_type='application/json')
+
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        rows = [json.loads(line) for line in response.data.decode().splitlines()]
+        assert rows[0]['consultant_id'] == 'CONS001'
+        assert rows[1]['error'] == 'Consultor no encontrado'
+        mock_bonus_agent.get_consultant_bonuses.assert_called_once_with(['CONS001', 'CONS999'], 2, 2025)
+
+    def test_get_bonus_batch_api_invalid_ids(self, client, mock_bonus_agent):
+        """Test del endpoint batch sin lista de IDs"""
+        response = client.post('/api/bonus/batch',
+                             data=json.dumps({'consultant_ids': 'CONS001'}),
+                             content_type='application/json')
+
+        assert response.status_code == 400
+        mock_bonus_agent.get_consultant_bonuses.assert_not_called()
+
+    @pytest.mark.parametrize('body', [
+        'no es json',
+        json.dumps(['CONS001']),
+        json.dumps({'consultant_ids': ['CONS001'], 'quarter': 2}),
+        json.dumps({'consultant_ids': ['CONS001'], 'quarter': '2', 'year': 2025}),
+        json.dumps({'consultant_ids': ['CONS001'], 'quarter': 5, 'year': 2025}),
+        json.dumps({'consultant_ids': ['CONS001'], 'quarter': True, 'year': 2025}),
+        json.dumps({'consultant_ids': ['CONS001'], 'quarter': 2, 'year': 25}),
+    ])
+    def test_get_bonus_batch_api_invalid_body(self, client, mock_bonus_agent, body):
+        """Test del endpoint batch con cuerpo inválido o periodo incompleto/fuera de rango: 400"""
+        response = client.post('/api/bonus/batch', data=body, content_type='application/json')
+
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
+        mock_bonus_agent.get_consultant_bonuses.assert_not_called()
+
+    def test_get_bonus_batch_api_without_period(self, client, mock_bonus_agent):
+        """Test del endpoint batch sin quarter ni year: último quarter calculado"""
+        mock_bonus_agent.get_consultant_bonuses.return_value = iter([])
+
+        response = client.post('/api/bonus/batch', data=json.dumps({'consultant_ids': ['CONS001']}),
+                               content_type='application/json')
+
+        assert response.status_code == 200
+        mock_bonus_agent.get_consultant_bonuses.assert_called_once_with(['CONS001'], None, None)
+
     def test_get_breakdown_api_success(self, client, mock_bonus_agent):
         """Test exitoso del endpoint de desglose"""
         breakdown_data = {
@@ -217,44 +295,151 @@ class TestFlaskAPI:
         response_data = json.loads(response.data)
         assert response_data['recommendations'] == []
     
-    def test_dashboard_api_success(self, client, mock_bonus_agent):
-        """Test exitoso del endpoint de dashboard"""
-        # Mock del cliente BigQuery
-        dashboard_data = [
-            {
-                'plan_type': 'Sales',
-                'consultant_count': 1,
-                'avg_bonus': 13305.20,
-                'max_bonus': 13305.20,
-                'min_bonus': 13305.20,
-                'avg_company_achievement': 100.46,
-                'avg_efficiency': 0.0
-            },
-            {
-                'plan_type': 'Hybrid',
-                'consultant_count': 1,
-                'avg_bonus': 5000.0,
-                'max_bonus': 5000.0,
-                'min_bonus': 5000.0,
-                'avg_company_achievement': 100.46,
-                'avg_efficiency': 85.5
+    def test_what_if_api_filters_consultant(self, client, mock_bonus_agent):
+        """Test del endpoint what-if filtrado por consultor"""
+        mock_bonus_agent.get_next_tier_gaps.return_value = {
+            'quarter': 2, 'year': 2025, 'period': 'Q2 2025', 'company': [],
+            'consultants': {
+                'CONS001': {'consultant_id': 'CONS001', 'gaps': [{'component': 'individual_commission', 'needed': 397240.0}]},
+                'CONS002': {'consultant_id': 'CONS002', 'gaps': []}
             }
-        ]
-        
-        # Mock del DataFrame y query
-        mock_df = pd.DataFrame(dashboard_data)
-        mock_query_job = MagicMock()
-        mock_query_job.to_dataframe.return_value = mock_df
-        mock_bonus_agent.client.query.return_value = mock_query_job
-        
+        }
+
+        response = client.get('/api/what-if?quarter=2&year=2025&consultant_id=CONS001')
+
+        assert response.status_code == 200
+        response_data = json.loads(response.data)
+        assert list(response_data['consultants']) == ['CONS001']
+        mock_bonus_agent.get_next_tier_gaps.assert_called_once_with(2, 2025)
+        assert client.get('/api/what-if?consultant_id=CONS999').status_code == 404
+
+    def test_dashboard_api_success(self, client, mock_bonus_agent):
+        """Test exitoso del endpoint de dashboard servido desde el snapshot en memoria"""
+        payload = {
+            'period': {'quarter': 2, 'year': 2025},
+            'company': {'booking_total': 602760.0, 'booking_target': 600000.0, 'nps': 4.0},
+            'plans': [
+                {'plan_type': 'Hybrid', 'consultant_count': 1, 'avg_bonus': 1700.0},
+                {'plan_type': 'Sales', 'consultant_count': 1, 'avg_bonus': 10291.4}
+            ]
+        }
+        mock_bonus_agent.get_dashboard_snapshot.return_value = {
+            'watermark': '2025-07-01T10:00:00Z',
+            'payload': payload,
+            'body': json.dumps(payload).encode('utf-8')
+        }
+
         response = client.get('/api/dashboard')
-        
+
         assert response.status_code == 200
         response_data = json.loads(response.data)
-        assert isinstance(response_data, list)
-        assert len(response_data) == 2
-        assert response_data[0]['plan_type'] == 'Sales'
-        assert response_data[1]['plan_type'] == 'Hybrid'
+        assert response_data['company']['booking_total'] == 602760.0
+        assert len(response_data['plans']) == 2
+        assert response_data['plans'][0]['plan_type'] == 'Hybrid'
+        # El endpoint no consulta BigQuery por page view
+        mock_bonus_agent.client.query.assert_not_called()
+
+    def test_dashboard_api_unavailable(self, client, mock_bonus_agent):
+        """Test del dashboard cuando aún no hay snapshot y BigQuery falla"""
+        mock_bonus_agent.get_dashboard_snapshot.return_value = {'error': 'Error consultando BigQuery: timeout'}
+
+        response = client.get('/api/dashboard')
+
+        assert response.status_code == 503
+
+
+class TestMetricsEndpoint:
+    """Test del endpoint /metrics"""
+
+    @pytest.fixture
+    def client(self):
+        main.app.config['TESTING'] = True
+        return main.app.test_client()
+
+    def test_metrics_exposition(self, client):
+        """Test de latencia por ruta en formato de texto Prometheus"""
+        client.get('/')
+        response = client.get('/metrics')
+
+        assert response.status_code == 200
+        assert response.content_type.startswith('text/plain; version=0.0.4')
+        text = response.get_data(as_text=True)
+        assert '# TYPE bonus_http_request_seconds histogram' in text
+        assert 'bonus_http_request_seconds_count{route="/",method="GET",status="200"}' in text
+        assert '# TYPE bonus_bigquery_query_seconds histogram' in text
+
+
+class TestWarmupProbe:
+    """Test de /warmup como hook de mejor esfuerzo"""
+
+    @pytest.fixture
+    def client(self):
+        main.app.config['TESTING'] = True
+        return main.app.test_client()
+
+    def test_warming_until_warmup_finishes(self, client, monkeypatch):
+        """Test de 200 con status warming mientras calienta y ready cuando terminó"""
+        release = threading.Event()
+        agent = MagicMock()
+        agent.warmup.side_effect = lambda: release.wait(5)
+        lazy = main._LazyBonusAgent(factory=lambda: agent)
+        monkeypatch.setattr(main, 'bonus_agent', lazy)
+
+        response = client.get('/warmup')
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'warming'}
+
+        release.set()
+        lazy._warmup_thread.join(5)
+        response = client.get('/warmup')
+        assert response.status_code == 200
+        assert response.get_json() == {'status': 'ready'}
+        agent.warmup.assert_called_once()
+
+    def test_failed_warmup_is_retried(self, client, monkeypatch):
+        """Test de warmup fallido: sigue en warming y la siguiente llamada lo reintenta"""
+        release = threading.Event()
+        outcomes = [RuntimeError('sin credenciales'), None]
+
+        def warmup():
+            release.wait(5)
+            outcome = outcomes.pop(0)
+            if outcome:
+                raise outcome
+
+        agent = MagicMock()
+        agent.warmup.side_effect = warmup
+        lazy = main._LazyBonusAgent(factory=lambda: agent)
+        monkeypatch.setattr(main, 'bonus_agent', lazy)
+
+        assert client.get('/warmup').get_json() == {'status': 'warming'}
+        first = lazy._warmup_thread
+        release.set()
+        first.join(5)
+        release.clear()
+
+        assert client.get('/warmup').get_json() == {'status': 'warming'}
+        assert lazy._warmup_thread is not first
+        release.set()
+        lazy._warmup_thread.join(5)
+        assert client.get('/warmup').get_json() == {'status': 'ready'}
+
+    def test_cold_replica_does_not_fail_warmup(self, client, monkeypatch):
+        """Test de réplica que no carga a tiempo: el warmup termina igual y /warmup queda ready"""
+        monkeypatch.setattr(main, 'BONUS_REPLICA_ENABLED', True)
+        monkeypatch.setattr(main, 'BONUS_REPLICA_WARMUP_TIMEOUT_SECONDS', 0.2)
+        agent = main.BonusAdvisorAgent(client=MagicMock())
+        agent._agent = MagicMock()
+        agent.bonus_tiers = MagicMock()
+        agent.start_replica = MagicMock()
+        agent.replica = MagicMock()
+        agent.replica.is_fresh.return_value = False
+        lazy = main._LazyBonusAgent(factory=lambda: agent)
+        monkeypatch.setattr(main, 'bonus_agent', lazy)
+
+        client.get('/warmup')
+        lazy._warmup_thread.join(5)
+        assert client.get('/warmup').get_json() == {'status': 'ready'}
 
 
 class TestAPIErrorHandling:
@@ -0,0 +1,79 @@
+import pytest
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+# Add the parent directory to sys.path to import backfill
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backfill import format_report, main, parse_period, quarters_between, run_backfill
+
+
+class TestPeriods:
+    """Parseo y enumeración de quarters"""
+
+    def test_parse_period(self):
+        """Test de formatos aceptados"""
+        assert parse_period('2025Q2') == (2025, 2)
+        assert parse_period('2025-q4') == (2025, 4)
+        assert parse_period('Q1-2024') == (2024, 1)
+        with pytest.raises(ValueError):
+            parse_period('2025Q5')
+
+    def test_quarters_between_crosses_years(self):
+        """Test de rango que cruza el cambio de año"""
+        assert quarters_between((2024, 3), (2025, 2)) == [(2024, 3), (2024, 4), (2025, 1), (2025, 2)]
+        assert quarters_between((2025, 2), (2025, 2)) == [(2025, 2)]
+        with pytest.raises(ValueError):
+            quarters_between((2025, 3), (2025, 2))
+
+    def test_invalid_range_exits(self):
+        """Test de CLI: un rango invertido falla antes de crear el cliente"""
+        with pytest.raises(SystemExit):
+            main(['--from', '2025Q3', '--to', '2025Q1'])
+
+
+class TestRunBackfill:
+    """Un CALL para todo el rango y el reporte de filas y bytes"""
+
+    @pytest.fixture
+    def client(self):
+        client = MagicMock()
+        call_job = MagicMock(job_id='script-1', total_bytes_processed=3 * 1024 ** 2, total_bytes_billed=20 * 1024 ** 2)
+        counts_job = MagicMock()
+        counts_job.result.return_value = [
+            {'year': 2024, 'quarter': 4, 'row_count': 3, 'total_bonus': 9000.0},
+            {'year': 2025, 'quarter': 2, 'row_count': 3, 'total_bonus': 14091.4},
+        ]
+        client.query.side_effect = [call_job, counts_job]
+        client.list_jobs.return_value = [
+            SimpleNamespace(statement_type='INSERT', total_bytes_processed=0, total_bytes_billed=0),
+            SimpleNamespace(statement_type='CREATE_TABLE_AS_SELECT', total_bytes_processed=2048, total_bytes_billed=10 * 1024 ** 2),
+        ]
+        return client
+
+    def test_single_call_for_range(self, client):
+        """Test de rango de cuatro quarters resuelto con un solo CALL"""
+        report = run_backfill(client, (2024, 3), (2025, 2))
+
+        call_sql = client.query.call_args_list[0][0][0]
+        assert 'CALL' in call_sql and 'calculate_quarterly_bonuses_range' in call_sql
+        parameters = {p.name: p.value for p in client.query.call_args_list[0][1]['job_config'].query_parameters}
+        assert parameters == {'start_quarter': 3, 'start_year': 2024, 'end_quarter': 2, 'end_year': 2025}
+        client.list_jobs.assert_called_once_with(parent_job='script-1')
+
+        # Los quarters sin filas aparecen con 0
+        assert [(q['year'], q['quarter'], q['row_count']) for q in report['quarters']] == [
+            (2024, 3, 0), (2024, 4, 3), (2025, 1, 0), (2025, 2, 3)
+        ]
+        assert report['total_bytes_billed'] == 20 * 1024 ** 2
+        # Sentencias en orden de ejecución
+        assert [s['statement_type'] for s in report['statements']] == ['CREATE_TABLE_AS_SELECT', 'INSERT']
+
+    def test_format_report(self, client):
+        """Test del reporte en texto"""
+        text = format_report(run_backfill(client, (2024, 3), (2025, 2)))
+        assert '2024Q3' in text and '2025Q2' in text
+        assert '14,091.40' in text
+        assert '20.0 MB' in text
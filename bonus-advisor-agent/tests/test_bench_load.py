@@ -0,0 +1,92 @@
+import pytest
+import sys
+import os
+import pandas as pd
+
+# Add the parent directory to sys.path to import the benchmark harness
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_load import compare_to_baseline, dockerfile_layout, percentile, scenario_requests
+from benchmarks.fakes import FakeAgent, FakeBigQueryClient, make_bonus_results
+from main import BonusAdvisorAgent
+
+
+@pytest.fixture
+def fake_agent():
+    """Agente real sobre los fakes de BigQuery y del modelo"""
+    client = FakeBigQueryClient(make_bonus_results(30))
+    agent = BonusAdvisorAgent(client=client)
+    agent.agent = FakeAgent(tool=agent.get_consultant_bonus)
+    return agent
+
+
+class TestFakes:
+    """Test de que los fakes cubren las queries de main.py"""
+
+    def test_bonus_lookups(self, fake_agent):
+        """Test de lookup por periodo, último periodo y consultor inexistente"""
+        assert fake_agent.get_consultant_bonus('CONS001', 1, 2025)['quarter'] == 1
+        latest = fake_agent.get_consultant_bonus('CONS002')
+        assert (latest['quarter'], latest['year']) == (2, 2025)
+        assert fake_agent.get_consultant_bonus('CONS999') == {'error': 'Consultor no encontrado'}
+
+    def test_batch_and_dashboard(self, fake_agent):
+        """Test del lookup batch y del snapshot del dashboard"""
+        rows = list(fake_agent.get_consultant_bonuses(['CONS001', 'CONS003'], 2, 2025))
+        assert [row['consultant_id'] for row in rows] == ['CONS001', 'CONS003']
+
+        snapshot = fake_agent.get_dashboard_snapshot()
+        assert snapshot['payload']['period'] == {'quarter': 2, 'year': 2025}
+        assert sum(plan['consultant_count'] for plan in snapshot['payload']['plans']) == 30
+
+    def test_replica_load(self, fake_agent):
+        """Test de carga de la réplica desde el fake"""
+        fake_agent.replica.load(fake_agent._fetch_all_results())
+        assert fake_agent.replica.row_count == 60
+        assert fake_agent._fetch_watermark() == pd.Timestamp('2025-07-01T10:00:00Z')
+
+    def test_fake_agent_calls_tool(self, fake_agent):
+        """Test del modelo simulado: usa la herramienta cuando hay consultor en contexto"""
+        answer = fake_agent.chat_with_agent("¿Cómo funciona el sistema de bonos para CONS001?", 'bench')
+        assert answer.startswith('Respuesta simulada')
+        assert fake_agent.client.query_count == 1
+
+
+class TestHarness:
+    """Test de utilidades del benchmark de carga"""
+
+    def test_dockerfile_layout(self):
+        """Test del layout de gunicorn tomado del Dockerfile"""
+        layout = dockerfile_layout()
+        assert layout['workers'] >= 1
+        assert layout['threads'] >= 1
+
+    def test_percentile(self):
+        """Test de percentiles nearest-rank"""
+        samples = list(range(1, 101))
+        assert percentile(samples, 50) == 50
+        assert percentile(samples, 95) == 95
+        assert percentile(samples, 99) == 99
+        assert percentile([], 50) is None
+
+    def test_scenarios(self):
+        """Test de los requests generados por escenario"""
+        method, path, body = next(scenario_requests('recommendations', 3))
+        assert (method, path, body) == ('GET', '/api/recommendations/CONS001/Delivery', None)
+        method, path, body = next(scenario_requests('chat', 3))
+        assert method == 'POST' and b'CONS001' in body
+
+    def test_compare_to_baseline(self):
+        """Test de detección de regresiones contra el baseline"""
+        base = {'scenario': 'bonus', 'concurrency': 8, 'errors': 0, 'throughput_rps': 1000.0,
+                'p95_ms': 10.0, 'p99_ms': 20.0, 'peak_rss_mb': 150.0}
+        same = dict(base, p95_ms=11.0)
+        slower = dict(base, p95_ms=15.0, throughput_rps=700.0)
+
+        assert compare_to_baseline({'runs': [same]}, {'runs': [base]}, 0.2) == []
+        failures = compare_to_baseline({'runs': [slower]}, {'runs': [base]}, 0.2)
+        assert len(failures) == 2
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,123 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock
+
+# Add the parent directory to sys.path to import bigquery_guard
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from google.cloud import bigquery
+from bigquery_guard import BudgetExceeded, CostLedger, format_ranking, load_dataframe, max_bytes_for, query_rows, run_query
+
+
+def finished_job(processed=0, billed=0, slot_ms=0, cache_hit=False):
+    return MagicMock(total_bytes_processed=processed, total_bytes_billed=billed, slot_millis=slot_ms, cache_hit=cache_hit)
+
+
+class TestRunQuery:
+    """Presupuesto, etiquetas y contabilidad por call site"""
+
+    def test_budget_and_label_on_job(self, monkeypatch):
+        """Test de maximum_bytes_billed y label call_site en el job enviado"""
+        monkeypatch.setenv('BIGQUERY_MAX_BYTES_BILLED_BONUS_BATCH', str(50 * 1024 ** 2))
+        client = MagicMock()
+        client.query.return_value = finished_job(processed=2048, billed=10 * 1024 ** 2, slot_ms=30)
+        ledger = CostLedger()
+
+        job_config = bigquery.QueryJobConfig(labels={'team': 'bonos'})
+        run_query(client, 'bonus_batch', 'SELECT 1', job_config, ledger=ledger)
+
+        sent = client.query.call_args[1]['job_config']
+        assert sent.maximum_bytes_billed == 50 * 1024 ** 2
+        assert sent.labels == {'team': 'bonos', 'call_site': 'bonus_batch'}
+        assert ledger.snapshot()['bonus_batch']['bytes_billed'] == 10 * 1024 ** 2
+        assert ledger.snapshot()['bonus_batch']['slot_ms'] == 30
+        # El job_config del llamador queda intacto
+        assert job_config.labels == {'team': 'bonos'}
+        assert job_config.maximum_bytes_billed is None
+
+    def test_bytes_billed_rejection_is_recorded(self):
+        """Test de job rechazado por maximum_bytes_billed: cuenta como rechazo y el error se propaga"""
+        from google.api_core.exceptions import BadRequest
+        client = MagicMock()
+        job = finished_job()
+        job.result.side_effect = BadRequest(
+            'Query exceeded limit for bytes billed', errors=[{'reason': 'bytesBilledLimitExceeded'}]
+        )
+        client.query.return_value = job
+        ledger = CostLedger()
+
+        with pytest.raises(BadRequest):
+            run_query(client, 'replica', 'SELECT *', ledger=ledger)
+
+        assert ledger.snapshot()['replica']['rejected'] == 1
+        assert ledger.snapshot()['replica']['calls'] == 0
+
+    def test_dry_run_rejects_before_running(self):
+        """Test de dry-run: una query sobre el presupuesto no se envía"""
+        client = MagicMock()
+        client.query.return_value = finished_job(processed=5 * 1024 ** 3)
+        ledger = CostLedger()
+
+        with pytest.raises(BudgetExceeded) as error:
+            run_query(client, 'replica', 'SELECT *', max_bytes_billed=1024 ** 3, dry_run=True, ledger=ledger)
+
+        client.query.assert_called_once()
+        assert client.query.call_args[1]['job_config'].dry_run is True
+        assert error.value.estimated_bytes == 5 * 1024 ** 3
+        assert ledger.snapshot()['replica']['rejected'] == 1
+
+    def test_dry_run_within_budget_runs(self):
+        """Test de dry-run bajo el presupuesto: estimación y luego la query real"""
+        client = MagicMock()
+        client.query.side_effect = [finished_job(processed=1024), finished_job(processed=1024, billed=10 * 1024 ** 2)]
+
+        run_query(client, 'watermark', 'SELECT 1', dry_run=True, ledger=CostLedger())
+
+        assert client.query.call_count == 2
+        assert not client.query.call_args[1]['job_config'].dry_run
+
+    def test_query_rows_waits_once_with_page_size(self):
+        """Test de query_rows: una sola espera sobre el job, con el tamaño de página pedido"""
+        client = MagicMock()
+        job = finished_job(billed=1024)
+        job.result.return_value = iter([{'consultant_id': 'CONS001'}])
+        client.query.return_value = job
+
+        rows = query_rows(client, 'bonus_batch', 'SELECT 1', page_size=1000, ledger=CostLedger())
+
+        job.result.assert_called_once_with(page_size=1000)
+        assert list(rows) == [{'consultant_id': 'CONS001'}]
+
+    def test_default_budget(self, monkeypatch):
+        """Test del presupuesto por defecto sin variable propia"""
+        monkeypatch.delenv('BIGQUERY_MAX_BYTES_BILLED_DASHBOARD', raising=False)
+        assert max_bytes_for('dashboard') == 1024 ** 3
+
+
+class TestLedger:
+    """Acumulado y ranking por call site"""
+
+    def test_ranking_by_bytes_billed(self):
+        """Test de ranking: el call site más caro primero, con cache hits contados"""
+        ledger = CostLedger()
+        ledger.record_query('bonus', finished_job(billed=10 * 1024 ** 2))
+        ledger.record_query('bonus', finished_job(cache_hit=True))
+        ledger.record_query('replica', finished_job(billed=40 * 1024 ** 2))
+
+        ranking = ledger.ranking()
+        assert [name for name, _ in ranking] == ['replica', 'bonus']
+        assert ranking[1][1]['calls'] == 2
+        assert ranking[1][1]['cache_hits'] == 1
+        assert 'replica' in format_ranking(ranking).splitlines()[1]
+
+    def test_load_counts_rows(self):
+        """Test de carga: label call_site y filas cargadas"""
+        client = MagicMock()
+        client.load_table_from_dataframe.return_value = MagicMock(output_rows=12)
+        ledger = CostLedger()
+
+        load_dataframe(client, 'clickup_upload', MagicMock(), 'dataset.table', bigquery.LoadJobConfig(), ledger=ledger)
+
+        assert client.load_table_from_dataframe.call_args[1]['job_config'].labels == {'call_site': 'clickup_upload'}
+        assert ledger.snapshot()['clickup_upload']['rows_loaded'] == 12
@@ -0,0 +1,443 @@
+import pytest
+import re
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path to import bonus_engine
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bonus_engine import (
+    BonusTiers, DEFAULT_TIERS, calculate_quarterly_bonuses, calculate_quarterly_bonuses_incremental, load_insert_script, read_table_schemas,
+    sql_round, tier_value, tiers_from_config, COMMISSION_TIERS, COMPANY_BOOKING_TIERS, CUSTOMER_SATISFACTION_BONUS,
+    EFFICIENCY_BONUS, EFFICIENCY_MIN_PCT, MBO_BONUS, NPS_MIN_SCORE, RECURRING_BUSINESS_BONUS,
+    RECURRING_BUSINESS_MIN_RATIO, TIMELINE_BONUS, TIMELINE_MIN_PCT, UTILIZATION_TIERS
+)
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'sql', 'schema')
+CALCULATION_DATE = pd.Timestamp('2025-07-01T10:00:00Z')
+
+# Salida de calculate_quarterly_bonuses(2, 2025) sobre 02_insert_dummy_data.sql
+EXPECTED_Q2_2025 = {
+    'CONS002': {
+        'consultant_name': 'Anthony Alarcon', 'plan_type': 'Delivery',
+        'individual_tcv': 0.0, 'individual_commission': 0.0,
+        'project_hours': 472.0, 'total_quarter_hours': 472.0, 'project_hours_percentage': 100.0,
+        'utilization_bonus': 600.0, 'efficiency_bonus': 250.0,
+        'timeline_adherence_percentage': 100.0, 'timeline_bonus': 250.0,
+        'customer_satisfaction_bonus': 0.0, 'mbo_bonus': 250.0, 'total_bonus': 2100.0,
+    },
+    'CONS003': {
+        'consultant_name': 'Julian Rodriguez', 'plan_type': 'Hybrid',
+        'individual_tcv': 189800.0, 'individual_commission': 0.0,
+        'project_hours': 312.0, 'total_quarter_hours': 312.0, 'project_hours_percentage': 100.0,
+        'utilization_bonus': 400.0, 'efficiency_bonus': 150.0,
+        'timeline_adherence_percentage': 100.0, 'timeline_bonus': 150.0,
+        'customer_satisfaction_bonus': 0.0, 'mbo_bonus': 250.0, 'total_bonus': 1700.0,
+    },
+    'CONS001': {
+        'consultant_name': 'Rodolfo Solar', 'plan_type': 'Sales',
+        'individual_tcv': 602760.0, 'individual_commission': 9041.4,
+        'project_hours': None, 'total_quarter_hours': None, 'project_hours_percentage': None,
+        'utilization_bonus': 0.0, 'efficiency_bonus': 0.0,
+        'timeline_adherence_percentage': None, 'timeline_bonus': 0.0,
+        'customer_satisfaction_bonus': 0.0, 'mbo_bonus': 500.0, 'total_bonus': 10291.4,
+    },
+}
+
+
+@pytest.fixture
+def tables():
+    """Tablas fuente cargadas desde los scripts de sql/schema"""
+    with open(os.path.join(SCHEMA_DIR, '01_create_tables.sql'), encoding='utf-8') as f:
+        schema_sql = f.read()
+    with open(os.path.join(SCHEMA_DIR, '02_insert_dummy_data.sql'), encoding='utf-8') as f:
+        insert_sql = f.read()
+    return load_insert_script(insert_sql, schema_sql)
+
+
+def calculate(tables, quarter=2, year=2025):
+    return calculate_quarterly_bonuses(tables, quarter, year, calculation_date=CALCULATION_DATE)
+
+
+class TestParity:
+    """Paridad con sql/procedures/calculate_quarterly_bonuses.sql"""
+
+    def test_load_insert_script(self, tables):
+        """Test de carga tipada de los datos dummy"""
+        assert len(tables['consultant_master']) == 3
+        assert len(tables['deals_report']) == 14
+        assert len(tables['consultant_report']) == 25
+        assert tables['consultant_projects_master']['actual_end_date'].isna().sum() == 2
+        assert tables['deals_report']['channel'].tolist()[3] == ''
+
+    def test_company_metrics(self, tables):
+        """Test de métricas de compañía (deals únicos, recurring y NPS global)"""
+        results = calculate(tables)
+        assert (results['company_booking_total'] == 602760.0).all()
+        assert (results['company_target_achievement_pct'] == 100.46).all()
+        assert (results['company_booking_bonus'] == 500.0).all()
+        assert (results['recurring_business_pct'] == 53.06).all()
+        assert (results['recurring_business_bonus'] == 250.0).all()
+        assert (results['customer_satisfaction_score'] == 4.0).all()
+
+    def test_consultant_results(self, tables):
+        """Test de resultados individuales y orden (plan_type, consultant_name)"""
+        results = calculate(tables)
+        assert results['consultant_id'].tolist() == ['CONS002', 'CONS003', 'CONS001']
+        for _, row in results.iterrows():
+            for column, expected in EXPECTED_Q2_2025[row['consultant_id']].items():
+                if expected is None:
+                    assert pd.isna(row[column]), column
+                else:
+                    assert row[column] == pytest.approx(expected), column
+        assert (results['calculation_date'] == CALCULATION_DATE).all()
+
+    def test_quarter_without_data(self, tables):
+        """Test de un quarter sin deals: SUM NULL y bonos de compañía en 0"""
+        results = calculate(tables, quarter=3)
+        assert results['company_booking_total'].isna().all()
+        assert (results['company_booking_bonus'] == 0.0).all()
+        assert (results['customer_satisfaction_score'] == 0.0).all()
+        assert results.set_index('consultant_id')['total_bonus'].to_dict() == {
+            'CONS001': 500.0, 'CONS002': 250.0, 'CONS003': 250.0
+        }
+
+
+class TestProcedureQuirks:
+    """Particularidades del SQL que el motor debe replicar"""
+
+    def test_duplicate_project_rows_multiply_hours(self, tables):
+        """Test del join cr -> cpm sin filtro de quarter"""
+        projects = tables['consultant_projects_master']
+        duplicate = projects[projects['project_id'] == 'PROJ004'].assign(quarter=3)
+        tables['consultant_projects_master'] = pd.concat([projects, duplicate], ignore_index=True)
+
+        row = calculate(tables).set_index('consultant_id').loc['CONS003']
+        assert row['project_hours'] == 312.0 + 88.0
+        assert row['total_quarter_hours'] == 312.0
+        assert row['project_hours_percentage'] == pytest.approx(128.21)
+
+    def test_top_utilization_tier_is_strict(self):
+        """Test de > 225 (Hybrid) y > 450 (Delivery) en el nivel más alto"""
+        assert tier_value([225.0, 225.5], UTILIZATION_TIERS['Hybrid']).tolist() == [300.0, 400.0]
+        assert tier_value([450.0, 99.9, np.nan], UTILIZATION_TIERS['Delivery']).tolist() == [500.0, 0.0, 0.0]
+
+    def test_round_half_away_from_zero(self):
+        """Test de ROUND de BigQuery"""
+        assert sql_round([0.125, 2.675, -0.125]).tolist() == [0.13, 2.68, -0.13]
+
+    def test_nps_bonus_and_unknown_plan(self, tables):
+        """Test de NPS > 4.5 y de plan desconocido (CASE sin ELSE da NULL)"""
+        satisfaction = tables['customer_satisfaction']
+        satisfaction['satisfaction_stars'] = 5
+        master = tables['consultant_master']
+        tables['consultant_master'] = pd.concat([master, pd.DataFrame([
+            {'consultant_id': 'CONS004', 'consultant_name': 'Ana Torres', 'plan_type': 'Partner',
+             'eligible_for_comp': True, 'active': True},
+            {'consultant_id': 'CONS005', 'consultant_name': 'Luis Vega', 'plan_type': 'Sales',
+             'eligible_for_comp': True, 'active': False},
+        ])], ignore_index=True)
+
+        results = calculate(tables).set_index('consultant_id')
+        assert results.loc['CONS001', 'customer_satisfaction_bonus'] == 500.0
+        assert results.loc['CONS002', 'customer_satisfaction_bonus'] == 250.0
+        assert results.loc['CONS001', 'total_bonus'] == pytest.approx(10791.4)
+        assert pd.isna(results.loc['CONS004', 'mbo_bonus'])
+        assert pd.isna(results.loc['CONS004', 'total_bonus'])
+        assert 'CONS005' not in results.index
+
+
+class TestTierConfig:
+    """bonus_tier_config (04_bonus_tier_config.sql) debe coincidir con los tiers del motor"""
+
+    @pytest.fixture
+    def rows(self):
+        with open(os.path.join(SCHEMA_DIR, '04_bonus_tier_config.sql'), encoding='utf-8') as f:
+            script = f.read()
+        return load_insert_script(script, script)['bonus_tier_config']
+
+    @pytest.fixture
+    def config(self, rows):
+        return tiers_from_config(rows)
+
+    def test_company_and_commission_tiers(self, config):
+        """Test de tiers de compañía y tasas de comisión"""
+        assert config[(None, 'company_booking_bonus')] == COMPANY_BOOKING_TIERS
+        assert config[(None, 'recurring_business_bonus')] == (
+            (RECURRING_BUSINESS_MIN_RATIO, RECURRING_BUSINESS_BONUS, False),
+        )
+        assert config[('Sales', 'individual_commission')] == COMMISSION_TIERS
+
+    def test_plan_tiers(self, config):
+        """Test de tiers por plan"""
+        for plan, tiers in UTILIZATION_TIERS.items():
+            assert config[(plan, 'utilization_bonus')] == tiers
+            assert config[(plan, 'efficiency_bonus')] == ((EFFICIENCY_MIN_PCT, EFFICIENCY_BONUS[plan], False),)
+            assert config[(plan, 'timeline_bonus')] == ((TIMELINE_MIN_PCT[plan], TIMELINE_BONUS[plan], False),)
+        for plan in ('Sales', 'Hybrid', 'Delivery'):
+            assert config[(plan, 'customer_satisfaction_bonus')] == ((NPS_MIN_SCORE, CUSTOMER_SATISFACTION_BONUS[plan], True),)
+            assert config[(plan, 'mbo_bonus')] == ((1.0, MBO_BONUS[plan], False),)
+
+    @staticmethod
+    def view_amount(rows, plan, component, metric):
+        """Monto según bonus_tier_ranges + in_tier de 04_bonus_tier_config.sql"""
+        tiers = rows[(rows['component'] == component)
+                     & (rows['plan_type'].isna() if plan is None else rows['plan_type'] == plan)]
+        tiers = tiers.sort_values('lower_bound').reset_index(drop=True)
+        amount = 0.0
+        for i, tier in tiers.iterrows():
+            upper = tiers.iloc[i + 1] if i + 1 < len(tiers) else None
+            above = metric > tier['lower_bound'] or (tier['lower_inclusive'] and metric == tier['lower_bound'])
+            below = upper is None or metric < upper['lower_bound'] or \
+                (not upper['lower_inclusive'] and metric == upper['lower_bound'])
+            if above and below:
+                payout = 0.0 if pd.isna(tier['payout']) else tier['payout']
+                rate = 0.0 if pd.isna(tier['rate']) else tier['rate']
+                amount += payout + rate * metric
+        return amount
+
+    def test_null_and_mixed_rows_match_view(self, rows):
+        """Test de payout/rate NULL y tiers con monto fijo más tasa: mismo monto que la vista"""
+        rows = rows.astype({'payout': float, 'rate': float})
+        hybrid = (rows['plan_type'] == 'Hybrid') & (rows['component'] == 'utilization_bonus')
+        rows.loc[hybrid & (rows['lower_bound'] == 100.0), 'rate'] = np.nan
+        rows.loc[hybrid & (rows['lower_bound'] == 175.0), ['payout', 'rate']] = [np.nan, 2.0]
+        commission = rows['component'] == 'individual_commission'
+        rows.loc[commission & (rows['lower_bound'] == 500000.0), 'payout'] = 1000.0
+
+        config = tiers_from_config(rows)
+
+        assert config[('Hybrid', 'utilization_bonus')][0] == (100.0, 150.0, False)
+        for plan, component, metrics in (
+            ('Hybrid', 'utilization_bonus', [99.0, 100.0, 150.0, 175.0, 200.0, 225.0, 225.5]),
+            ('Sales', 'individual_commission', [0.0, 50000.0, 499999.0, 500000.0, 750000.0, 1e6, 2e6]),
+        ):
+            amounts = tier_value(metrics, config[(plan, component)])
+            assert amounts.tolist() == pytest.approx([self.view_amount(rows, plan, component, m) for m in metrics])
+
+    def test_bonus_tiers_from_table_match_defaults(self, rows):
+        """Test de BonusTiers armado desde la tabla: mismos tiers que las constantes"""
+        assert vars(BonusTiers.from_config(rows)) == vars(DEFAULT_TIERS)
+
+    def test_table_change_applies_without_redeploy(self, rows, tables):
+        """Test de tier cambiado en la tabla: el motor lo aplica; lo que falta queda con las constantes"""
+        rows.loc[(rows['component'] == 'individual_commission') & (rows['lower_bound'] == 500000.0), 'rate'] = 0.02
+        rows = rows[rows['component'] != 'utilization_bonus']
+
+        results = calculate_quarterly_bonuses(dict(tables, bonus_tier_config=rows), 2, 2025, CALCULATION_DATE) \
+            .set_index('consultant_id')
+
+        assert results.loc['CONS001', 'individual_commission'] == pytest.approx(602760.0 * 0.02)
+        assert results.loc['CONS002', 'utilization_bonus'] == EXPECTED_Q2_2025['CONS002']['utilization_bonus']
+
+    def test_strict_single_tiers_from_table(self, rows, tables):
+        """Test de lower_inclusive = FALSE en efficiency, timeline y MBO: justo en el umbral no paga"""
+        efficiency = (rows['plan_type'] == 'Delivery') & (rows['component'] == 'efficiency_bonus')
+        timeline = (rows['plan_type'] == 'Hybrid') & (rows['component'] == 'timeline_bonus')
+        mbo = (rows['plan_type'] == 'Sales') & (rows['component'] == 'mbo_bonus')
+        rows.loc[efficiency | timeline, 'lower_bound'] = 100.0
+        rows.loc[efficiency | timeline | mbo, 'lower_inclusive'] = False
+
+        tiers = BonusTiers.from_config(rows)
+        assert tiers.efficiency_strict == {'Hybrid': False, 'Delivery': True}
+        assert tiers.nps_strict is True
+        results = calculate_quarterly_bonuses(tables, 2, 2025, CALCULATION_DATE, tiers).set_index('consultant_id')
+
+        assert results.loc['CONS002', 'efficiency_bonus'] == 0.0  # 100% no supera 100%
+        assert results.loc['CONS003', 'efficiency_bonus'] == EXPECTED_Q2_2025['CONS003']['efficiency_bonus']
+        assert results.loc['CONS003', 'timeline_bonus'] == 0.0
+        assert results.loc['CONS002', 'timeline_bonus'] == EXPECTED_Q2_2025['CONS002']['timeline_bonus']
+        assert pd.isna(results.loc['CONS001', 'mbo_bonus'])  # Sin tier alcanzado: NULL como el SUM del procedimiento
+
+        rows.loc[efficiency | timeline | mbo, 'lower_inclusive'] = True
+        inclusive = calculate_quarterly_bonuses(dict(tables, bonus_tier_config=rows), 2, 2025, CALCULATION_DATE) \
+            .set_index('consultant_id')
+        assert inclusive.loc['CONS002', 'efficiency_bonus'] == EXPECTED_Q2_2025['CONS002']['efficiency_bonus']
+        assert inclusive.loc['CONS003', 'timeline_bonus'] == EXPECTED_Q2_2025['CONS003']['timeline_bonus']
+        assert inclusive.loc['CONS001', 'mbo_bonus'] == EXPECTED_Q2_2025['CONS001']['mbo_bonus']
+
+
+class TestStorageLayout:
+    """Partición por year y clustering de 01_create_tables.sql y su migración"""
+
+    LAYOUT = re.compile(r"TABLE\s+`[^`]*\.(\w+)`[^;]*?((?:PARTITION\s+BY[^\n]*\s+)?CLUSTER\s+BY[^;\n]*)", re.I)
+
+    def layouts(self, name):
+        with open(os.path.join(SCHEMA_DIR, name), encoding='utf-8') as f:
+            sql = f.read()
+        return {table: ' '.join(spec.split()) for table, spec in self.LAYOUT.findall(sql)}
+
+    def test_tables_with_year_are_partitioned(self):
+        """Test de que toda tabla con quarter/year particiona por year y clusteriza por quarter"""
+        with open(os.path.join(SCHEMA_DIR, '01_create_tables.sql'), encoding='utf-8') as f:
+            schemas = read_table_schemas(f.read())
+        layouts = self.layouts('01_create_tables.sql')
+        for table, columns in schemas.items():
+            names = [name for name, _ in columns]
+            if 'year' in names:
+                assert layouts[table].startswith('PARTITION BY RANGE_BUCKET(year, ')
+                assert 'quarter' in layouts[table].split('CLUSTER BY ')[1]
+        assert layouts['quarterly_bonus_results'].endswith('CLUSTER BY consultant_id, quarter')
+
+    def test_migration_matches_schema(self):
+        """Test de que la migración crea el mismo layout que 01_create_tables.sql y renombra cada copia"""
+        with open(os.path.join(SCHEMA_DIR, '05_partition_and_cluster.sql'), encoding='utf-8') as f:
+            sql = f.read()
+        copies = self.layouts('05_partition_and_cluster.sql')
+        assert all(table.endswith('_new') for table in copies)
+        assert {table[:-len('_new')]: spec for table, spec in copies.items()} == self.layouts('01_create_tables.sql')
+        # CREATE OR REPLACE no puede cambiar la partición de una tabla existente
+        assert 'CREATE OR REPLACE TABLE' not in sql
+        for table in copies:
+            assert re.search(rf"`[^`]*\.{table}` RENAME TO {table[:-len('_new')]};", sql)
+
+
+class TestIncremental:
+    """Paridad de calculate_quarterly_bonuses_incremental con el recálculo completo"""
+
+    LOADED_AT = pd.Timestamp('2025-06-30T00:00:00Z')
+    FIRST_RUN = pd.Timestamp('2025-07-01T10:00:00Z')
+    CHANGED_AT = pd.Timestamp('2025-07-07T09:00:00Z')
+    SECOND_RUN = pd.Timestamp('2025-07-07T10:00:00Z')
+
+    @pytest.fixture
+    def tracked(self, tables):
+        for frame in tables.values():
+            frame['updated_at'] = self.LOADED_AT
+        return tables
+
+    def run(self, tables, previous):
+        return calculate_quarterly_bonuses_incremental(tables, previous, 2, 2025, calculation_date=self.SECOND_RUN)
+
+    def assert_matches_full(self, tables, incremental):
+        full = calculate_quarterly_bonuses(tables, 2, 2025, calculation_date=self.SECOND_RUN)
+        pd.testing.assert_frame_equal(
+            incremental.drop(columns='calculation_date').reset_index(drop=True),
+            full.drop(columns='calculation_date')
+        )
+
+    def test_only_changed_consultant_is_recalculated(self, tracked):
+        """Test de horas nuevas de un consultor: solo su fila cambia"""
+        previous = calculate_quarterly_bonuses(tracked, 2, 2025, calculation_date=self.FIRST_RUN)
+        report = tracked['consultant_report']
+        week = report.index[(report['consultant_id'] == 'CONS003')][0]
+        report.loc[week, ['logged_hours', 'updated_at']] = [report.loc[week, 'logged_hours'] - 100, self.CHANGED_AT]
+
+        incremental = self.run(tracked, previous)
+
+        self.assert_matches_full(tracked, incremental)
+        dates = incremental.set_index('consultant_id')['calculation_date']
+        assert dates.to_dict() == {'CONS002': self.FIRST_RUN, 'CONS003': self.SECOND_RUN, 'CONS001': self.FIRST_RUN}
+
+    def test_new_deal_refreshes_company_metrics(self, tracked):
+        """Test de un deal nuevo: company metrics y totales del resto se actualizan"""
+        previous = calculate_quarterly_bonuses(tracked, 2, 2025, calculation_date=self.FIRST_RUN)
+        deals = tracked['deals_report']
+        deal = deals.iloc[[0]].assign(deal_id='DEAL_NEW', consultant_id='CONS001', deal_amount=200000.0,
+                                      updated_at=self.CHANGED_AT)
+        tracked['deals_report'] = pd.concat([deals, deal], ignore_index=True)
+
+        incremental = self.run(tracked, previous)
+
+        self.assert_matches_full(tracked, incremental)
+        assert (incremental['company_booking_bonus'] == 625.0).all()
+        assert (incremental['calculation_date'] == self.SECOND_RUN).all()
+
+    def test_deleted_deal_is_detected(self, tracked):
+        """Test de deal borrado por la sync (sin updated_at): TCV y compañía se recalculan"""
+        previous = calculate_quarterly_bonuses(tracked, 2, 2025, calculation_date=self.FIRST_RUN)
+        deals = tracked['deals_report']
+        period = (deals['quarter'] == 2) & (deals['year'] == 2025) & (deals['consultant_id'] == 'CONS001')
+        tracked['deals_report'] = deals.drop(deals.index[period][0]).reset_index(drop=True)
+
+        incremental = self.run(tracked, previous)
+
+        self.assert_matches_full(tracked, incremental)
+        assert (incremental['calculation_date'] == self.SECOND_RUN).all()
+
+    def test_deleted_hours_are_detected(self, tracked):
+        """Test de semana borrada por la sync de ClickUp: solo ese consultor se recalcula"""
+        previous = calculate_quarterly_bonuses(tracked, 2, 2025, calculation_date=self.FIRST_RUN)
+        report = tracked['consultant_report']
+        week = report.index[(report['consultant_id'] == 'CONS003') & (report['quarter'] == 2)][0]
+        tracked['consultant_report'] = report.drop(week).reset_index(drop=True)
+
+        incremental = self.run(tracked, previous)
+
+        self.assert_matches_full(tracked, incremental)
+        dates = incremental.set_index('consultant_id')['calculation_date']
+        assert dates.to_dict() == {'CONS002': self.FIRST_RUN, 'CONS003': self.SECOND_RUN, 'CONS001': self.FIRST_RUN}
+
+    def test_no_changes_keeps_results(self, tracked):
+        """Test sin cambios desde el último cálculo"""
+        previous = calculate_quarterly_bonuses(tracked, 2, 2025, calculation_date=self.FIRST_RUN)
+        assert self.run(tracked, previous) is previous
+
+    def test_inactive_consultant_is_removed(self, tracked):
+        """Test de un consultor que deja de estar activo (WHEN NOT MATCHED BY SOURCE)"""
+        previous = calculate_quarterly_bonuses(tracked, 2, 2025, calculation_date=self.FIRST_RUN)
+        master = tracked['consultant_master']
+        master.loc[master['consultant_id'] == 'CONS002', ['active', 'updated_at']] = [False, self.CHANGED_AT]
+
+        incremental = self.run(tracked, previous)
+
+        self.assert_matches_full(tracked, incremental)
+        assert 'CONS002' not in incremental['consultant_id'].tolist()
+
+    def test_other_periods_untouched(self, tracked):
+        """Test de un quarter sin resultados previos: cálculo completo sin tocar otros periodos"""
+        previous = calculate_quarterly_bonuses(tracked, 1, 2025, calculation_date=self.FIRST_RUN)
+        incremental = self.run(tracked, previous)
+        assert len(incremental) == 6
+        assert (incremental[incremental['quarter'] == 1]['calculation_date'] == self.FIRST_RUN).all()
+
+
+class TestPerformance:
+    """Recalcular un quarter para miles de consultores en memoria"""
+
+    def test_thousands_of_consultants(self):
+        """Test de un quarter con 5000 consultores y 13 semanas de horas"""
+        rng = np.random.default_rng(7)
+        consultants = 5000
+        ids = np.array([f"CONS{i:05d}" for i in range(consultants)])
+        plans = np.array(['Sales', 'Hybrid', 'Delivery'])[np.arange(consultants) % 3]
+        weeks = 13
+        tables = {
+            'consultant_master': pd.DataFrame({
+                'consultant_id': ids, 'consultant_name': ids, 'plan_type': plans,
+                'eligible_for_comp': True, 'active': True
+            }),
+            'deals_report': pd.DataFrame({
+                'deal_id': [f"D{i}" for i in range(consultants * 3)],
+                'consultant_id': np.repeat(ids, 3), 'quarter': 2, 'year': 2025,
+                'deal_amount': rng.uniform(1000, 400000, consultants * 3),
+                'is_recurring_business': rng.random(consultants * 3) < 0.4
+            }),
+            'consultant_projects_master': pd.DataFrame({
+                'project_id': [f"P{i}" for i in range(consultants)], 'consultant_id': ids,
+                'planned_end_date': pd.Timestamp('2025-06-30'),
+                'actual_end_date': pd.Timestamp('2025-06-15'), 'quarter': 2, 'year': 2025
+            }),
+            'consultant_report': pd.DataFrame({
+                'consultant_id': np.repeat(ids, weeks),
+                'project_id': np.repeat([f"P{i}" for i in range(consultants)], weeks),
+                'logged_hours': rng.uniform(10, 40, consultants * weeks), 'quarter': 2, 'year': 2025
+            }),
+            'customer_satisfaction': pd.DataFrame({'satisfaction_stars': [4, 5], 'quarter': 2, 'year': 2025}),
+        }
+
+        calculate_quarterly_bonuses(tables, 2, 2025)  # Calentamiento
+        start = time.perf_counter()
+        results = calculate_quarterly_bonuses(tables, 2, 2025)
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == consultants
+        assert results['total_bonus'].notna().all()
+        assert elapsed < 1.0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,142 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import cache
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import threading
+import time
+
+from cache import SingleFlight, TTLCache, WatermarkCache
+
+
+class FakeClock:
+    """Reloj controlable para probar expiración por TTL"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTTLCache:
+    """Test suite para el cache LRU con TTL"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_get_set_and_counters(self, clock):
+        """Test de lectura/escritura y contadores de hits/misses"""
+        cache = TTLCache(max_entries=4, ttl_seconds=10, clock=clock)
+
+        assert cache.get(('CONS001', 2, 2025)) is None
+        cache.set(('CONS001', 2, 2025), {'total_bonus': 100.0})
+
+        assert cache.get(('CONS001', 2, 2025)) == {'total_bonus': 100.0}
+        assert cache.hits == 1
+        assert cache.misses == 1
+
+    def test_entries_expire_after_ttl(self, clock):
+        """Test de expiración de entradas"""
+        cache = TTLCache(max_entries=4, ttl_seconds=10, clock=clock)
+        cache.set('key', 'value')
+
+        clock.now = 9.9
+        assert cache.get('key') == 'value'
+
+        clock.now = 10.0
+        assert cache.get('key') is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self, clock):
+        """Test de desalojo LRU cuando se supera el tamaño máximo"""
+        cache = TTLCache(max_entries=2, ttl_seconds=10, clock=clock)
+        cache.set('a', 1)
+        cache.set('b', 2)
+
+        # 'a' pasa a ser la más reciente
+        assert cache.get('a') == 1
+        cache.set('c', 3)
+
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.get('c') == 3
+
+    def test_disabled_cache(self, clock):
+        """Test de cache deshabilitado con TTL 0"""
+        cache = TTLCache(max_entries=2, ttl_seconds=0, clock=clock)
+        cache.set('a', 1)
+
+        assert cache.get('a') is None
+
+
+class TestWatermarkCache:
+    """Test suite para la invalidación por calculation_date"""
+
+    def test_newer_watermark_invalidates(self):
+        """Test de invalidación cuando avanza la marca de agua"""
+        cache = WatermarkCache(max_entries=4, ttl_seconds=60)
+
+        assert cache.observe('2025-07-01T10:00:00Z') is False
+        cache.set('a', 1)
+
+        # Misma marca o anterior no invalida
+        assert cache.observe('2025-07-01T10:00:00Z') is False
+        assert cache.observe('2025-04-01T10:00:00Z') is False
+        assert cache.get('a') == 1
+
+        assert cache.observe('2025-10-01T10:00:00Z') is True
+        assert cache.get('a') is None
+        assert cache.watermark == '2025-10-01T10:00:00Z'
+
+    def test_missing_watermark_is_ignored(self):
+        """Test de marcas de agua vacías"""
+        cache = WatermarkCache(max_entries=4, ttl_seconds=60)
+        cache.set('a', 1)
+
+        assert cache.observe(None) is False
+        assert cache.observe(float('nan')) is False
+        assert cache.get('a') == 1
+
+
+
+class TestSingleFlight:
+    """Test suite para el colapso de llamadas concurrentes"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test de una sola ejecución para llamadas simultáneas con la misma clave"""
+        flight = SingleFlight()
+        calls = []
+
+        def slow_query():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'total_bonus': 2100.0}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do('CONS002', slow_query)))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert results == [{'total_bonus': 2100.0}] * 4
+        assert len(flight) == 0
+
+    def test_error_is_shared_and_not_cached(self):
+        """Test de errores: se propagan y la siguiente llamada vuelve a ejecutar"""
+        flight = SingleFlight()
+        with pytest.raises(ValueError):
+            flight.do('k', lambda: (_ for _ in ()).throw(ValueError('timeout')))
+        assert flight.do('k', lambda: 1) == 1
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,164 @@
+import pytest
+import sys
+import os
+import threading
+import time
+from datetime import datetime
+
+# La integración de ClickUp vive en src/integrations/click_up
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'src', 'integrations', 'click_up'))
+
+from clickup_api_integration import ClickUpIntegration, time_windows
+
+
+def entry(entry_id, start):
+    return {
+        'id': entry_id,
+        'time': str(2 * 3600 * 1000),
+        'start': str(int(start.timestamp() * 1000)),
+        'user': {'email': 'anthony@company.com'},
+        'task': {'name': 'Etafashion pricing'},
+    }
+
+
+class TestTimeWindows:
+    """División del rango en ventanas"""
+
+    def test_weeks_with_short_last_window(self):
+        """Test de ventanas de 7 días contiguas y sin solaparse"""
+        windows = time_windows(datetime(2025, 4, 1), datetime(2025, 4, 20))
+        assert windows == [
+            (datetime(2025, 4, 1), datetime(2025, 4, 8)),
+            (datetime(2025, 4, 8), datetime(2025, 4, 15)),
+            (datetime(2025, 4, 15), datetime(2025, 4, 20)),
+        ]
+
+
+class TestIterTimeEntries:
+    """Ventanas en paralelo entregadas como stream"""
+
+    @pytest.fixture
+    def integrator(self):
+        return ClickUpIntegration('pk_test', 'team', max_workers=4)
+
+    def test_windows_per_assignee_in_parallel(self, integrator):
+        """Test de una llamada por (ventana, assignee) con varias en vuelo a la vez"""
+        calls = []
+        in_flight = {'now': 0, 'max': 0}
+        lock = threading.Lock()
+
+        def fake_get(start_date, end_date, assignee=None):
+            with lock:
+                calls.append((start_date, end_date, assignee))
+                in_flight['now'] += 1
+                in_flight['max'] = max(in_flight['max'], in_flight['now'])
+            time.sleep(0.02)
+            with lock:
+                in_flight['now'] -= 1
+            return {'data': [entry(f'{start_date:%m%d}-{assignee}', start_date)]}
+
+        integrator.get_time_entries = fake_get
+        entries = list(integrator.iter_time_entries(
+            datetime(2025, 4, 1), datetime(2025, 4, 29), assignees=['u1', 'u2']
+        ))
+
+        assert len(calls) == 8
+        assert len(entries) == 8
+        assert in_flight['max'] > 1
+        # El borde superior de cada ventana se excluye
+        assert max(call[1] for call in calls) < datetime(2025, 4, 29)
+
+    def test_failed_window_retried_and_duplicates_dropped(self, integrator):
+        """Test de ventana fallida reintentada al final y entry repetido entregado una vez"""
+        attempts = {}
+
+        def fake_get(start_date, end_date, assignee=None):
+            attempts[start_date] = attempts.get(start_date, 0) + 1
+            if start_date == datetime(2025, 4, 8) and attempts[start_date] == 1:
+                raise ConnectionError('reset')
+            return {'data': [entry('shared', datetime(2025, 4, 7)), entry(f'{start_date:%d}', start_date)]}
+
+        integrator.get_time_entries = fake_get
+        ids = [e['id'] for e in integrator.iter_time_entries(datetime(2025, 4, 1), datetime(2025, 4, 15))]
+
+        assert attempts[datetime(2025, 4, 8)] == 2
+        assert sorted(ids) == ['01', '08', 'shared']
+
+    def test_stream_feeds_process_time_entries(self, integrator):
+        """Test de process_time_entries consumiendo el stream"""
+        integrator.get_time_entries = lambda s, e, a=None: {'data': [entry(f'{s:%d}', s)]}
+
+        processed = integrator.process_time_entries(
+            integrator.iter_time_entries(datetime(2025, 4, 1), datetime(2025, 4, 3), window_days=1)
+        )
+
+        assert len(processed) == 1
+        assert processed[0]['logged_hours'] == 4
+
+
+class TestWeeklyAggregation:
+    """Grano de consultant_report: consultor, proyecto y semana"""
+
+    def test_entries_fold_into_weekly_buckets(self):
+        """Test de horas sumadas por (consultor, proyecto, semana) con report_id determinístico"""
+        integrator = ClickUpIntegration('pk_test', 'team')
+        other_project = dict(entry('x', datetime(2025, 4, 9, 10)), task={'name': 'Atlantic City ML'})
+        entries = [
+            entry('a', datetime(2025, 4, 7, 9)),    # lunes
+            entry('b', datetime(2025, 4, 9, 15)),   # miércoles, misma semana
+            entry('c', datetime(2025, 4, 14, 9)),   # semana siguiente
+            other_project,
+        ]
+
+        rows = {row['report_id']: row for row in integrator.process_time_entries(entries)}
+
+        assert set(rows) == {
+            'CLK_CONS002_PROJ002_20250407_2025Q2',
+            'CLK_CONS002_PROJ002_20250414_2025Q2',
+            'CLK_CONS002_PROJ001_20250407_2025Q2',
+        }
+        week = rows['CLK_CONS002_PROJ002_20250407_2025Q2']
+        assert week['logged_hours'] == 4
+        assert str(week['week_end_date']) == '2025-04-11'
+        assert week['week_number'] == 15
+        # Mismos entries en otro orden: mismas filas
+        reordered = integrator.process_time_entries(list(reversed(entries)))
+        assert {row['report_id']: row['logged_hours'] for row in reordered} == {
+            report_id: row['logged_hours'] for report_id, row in rows.items()
+        }
+
+    def test_week_crossing_quarters_splits(self):
+        """Test de semana que cruza el cambio de quarter: una fila por quarter"""
+        integrator = ClickUpIntegration('pk_test', 'team')
+        rows = integrator.process_time_entries([
+            entry('a', datetime(2025, 3, 31, 9)),   # lunes, Q1
+            entry('b', datetime(2025, 4, 1, 9)),    # martes, Q2
+        ])
+
+        assert sorted((row['quarter'], row['week_start_date'].isoformat()) for row in rows) == [
+            (1, '2025-03-31'), (2, '2025-03-31')
+        ]
+
+
+class TestFetchDelta:
+    """Delta por semanas completas desde el checkpoint"""
+
+    def test_weeks_from_checkpoint_with_lookback(self):
+        """Test de rango alineado a lunes con una semana de lookback y checkpoint en la semana en curso"""
+        integrator = ClickUpIntegration('pk_test', 'team')
+        requested = []
+
+        def fake_get(start_date, end_date, assignee=None):
+            requested.append((start_date, end_date))
+            return {'data': [entry(f'{start_date:%d}', start_date)]}
+
+        integrator.get_time_entries = fake_get
+
+        batch = integrator.fetch_delta('2025-04-14', now=datetime(2025, 4, 23, 18))
+
+        assert min(start for start, _ in requested) == datetime(2025, 4, 7)
+        assert max(end for _, end in requested) < datetime(2025, 4, 28)
+        assert batch.checkpoint == '2025-04-21'
+        params = {p.name: p.value for p in batch.scope_parameters}
+        assert (str(params['scope_start']), str(params['scope_end'])) == ('2025-04-07', '2025-04-28')
+        assert len(batch.rows) == 3  # una fila por semana
@@ -0,0 +1,88 @@
+import pytest
+import json
+import sys
+import os
+import pandas as pd
+
+# Add the parent directory to sys.path to import dashboard
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dashboard import build_dashboard_snapshot, encode_snapshot
+
+
+class TestDashboardSnapshot:
+    """Test suite para el snapshot agregado del dashboard"""
+
+    @pytest.fixture
+    def quarter_results(self):
+        """Resultados de Q2 2025 como los deja calculate_quarterly_bonuses"""
+        company = {
+            'quarter': 2,
+            'year': 2025,
+            'company_booking_total': 602760.0,
+            'company_target_achievement_pct': 100.46,
+            'company_booking_bonus': 500.0,
+            'recurring_business_pct': 53.06,
+            'recurring_business_bonus': 250.0,
+            'customer_satisfaction_score': 4.0,
+            'customer_satisfaction_bonus': 0.0,
+            'calculation_date': pd.Timestamp('2025-07-01T10:00:00Z')
+        }
+        rows = [
+            {'consultant_id': 'CONS001', 'plan_type': 'Sales', 'individual_commission': 9041.4,
+             'utilization_bonus': 0.0, 'efficiency_bonus': 0.0, 'timeline_bonus': 0.0,
+             'mbo_bonus': 500.0, 'total_bonus': 10291.4},
+            {'consultant_id': 'CONS002', 'plan_type': 'Delivery', 'individual_commission': 0.0,
+             'utilization_bonus': 600.0, 'efficiency_bonus': 250.0, 'timeline_bonus': 250.0,
+             'mbo_bonus': 250.0, 'total_bonus': 2100.0},
+            {'consultant_id': 'CONS003', 'plan_type': 'Hybrid', 'individual_commission': 0.0,
+             'utilization_bonus': 400.0, 'efficiency_bonus': 150.0, 'timeline_bonus': 150.0,
+             'mbo_bonus': 250.0, 'total_bonus': 1700.0},
+            {'consultant_id': 'CONS004', 'plan_type': 'Hybrid', 'individual_commission': 0.0,
+             'utilization_bonus': 150.0, 'efficiency_bonus': 0.0, 'timeline_bonus': 0.0,
+             'mbo_bonus': 250.0, 'total_bonus': 1150.0}
+        ]
+        return pd.DataFrame([{**company, **row} for row in rows])
+
+    def test_company_metrics(self, quarter_results):
+        """Test de métricas de compañía (booking vs target, recurring, NPS)"""
+        snapshot = build_dashboard_snapshot(quarter_results)
+
+        assert snapshot['period'] == {'quarter': 2, 'year': 2025}
+        assert snapshot['company']['booking_total'] == 602760.0
+        assert snapshot['company']['booking_target'] == 600000.0
+        assert snapshot['company']['target_achievement_pct'] == 100.46
+        assert snapshot['company']['recurring_business_pct'] == 53.06
+        assert snapshot['company']['nps'] == 4.0
+
+    def test_plan_distributions(self, quarter_results):
+        """Test de totales y distribución de bonos por plan"""
+        snapshot = build_dashboard_snapshot(quarter_results)
+        plans = {p['plan_type']: p for p in snapshot['plans']}
+
+        assert [p['plan_type'] for p in snapshot['plans']] == ['Delivery', 'Hybrid', 'Sales']
+        assert plans['Hybrid']['consultant_count'] == 2
+        assert plans['Hybrid']['total_bonus'] == 2850.0
+        assert plans['Hybrid']['avg_bonus'] == 1425.0
+        assert plans['Hybrid']['min_bonus'] == 1150.0
+        assert plans['Hybrid']['max_bonus'] == 1700.0
+        assert plans['Hybrid']['components']['utilization_bonus'] == 550.0
+        assert plans['Sales']['components']['individual_commission'] == 9041.4
+
+    def test_snapshot_is_json_serializable(self, quarter_results):
+        """Test de serialización del snapshot"""
+        body = encode_snapshot(build_dashboard_snapshot(quarter_results))
+
+        decoded = json.loads(body)
+        assert decoded['calculation_date'].startswith('2025-07-01T10:00:00')
+
+    def test_empty_results(self):
+        """Test de snapshot sin resultados calculados"""
+        snapshot = build_dashboard_snapshot(pd.DataFrame())
+
+        assert snapshot['plans'] == []
+        assert snapshot['company'] is None
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
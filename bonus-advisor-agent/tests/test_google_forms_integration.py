@@ -0,0 +1,29 @@
+import sys
+import os
+
+# La integración de Google Forms vive en src/integrations/google_forms
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'src', 'integrations', 'google_forms'))
+
+from google_forms_api_integration import GoogleFormsIntegration
+from incremental_sync import build_merge
+
+
+class TestFetchDelta:
+    """Delta por lastSubmittedTime"""
+
+    def test_edited_response_across_years_is_not_pruned(self):
+        """Test de respuesta editada en otro año: el MERGE no se limita a los años del delta"""
+        integrator = GoogleFormsIntegration.__new__(GoogleFormsIntegration)
+        integrator.get_form_responses = lambda since=None: ([
+            {'responseId': 'R1', 'lastSubmittedTime': '2025-01-03T10:00:00Z', 'answers': {}},
+        ], {})
+
+        batch = integrator.fetch_delta('2024-12-30T09:00:00Z')
+
+        assert batch.rows[0]['satisfaction_id'] == 'SAT_R1' and batch.rows[0]['year'] == 2025
+        assert batch.checkpoint == '2025-01-03T10:00:00Z'
+        # La fila de 2024 (mismo satisfaction_id) se actualiza en vez de duplicarse
+        assert batch.years is None
+        sql = build_merge('proj.ds.customer_satisfaction', 'proj.ds.staging', list(batch.rows[0]),
+                          ['satisfaction_id'], batch.delete_scope, batch.years is not None)
+        assert 'UNNEST(@years)' not in sql
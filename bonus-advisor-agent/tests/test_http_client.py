@@ -0,0 +1,123 @@
+import pytest
+import sys
+import os
+from unittest.mock import MagicMock
+
+import requests
+
+# http_client vive en src/integrations (compartido por las integraciones)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'src', 'integrations'))
+
+import http_client
+from http_client import HTTPError, TokenBucket, VendorClient, retry_after_seconds
+
+
+def response(status, body=None, headers=None):
+    resp = MagicMock(status_code=status, headers=headers or {}, url='https://api.example.com/x')
+    resp.json.return_value = body or {}
+    return resp
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket:
+    """Rate limit local por vendor"""
+
+    def test_waits_when_burst_is_spent(self):
+        """Test de ráfaga y luego un token por 1/rate segundos"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_minute=60, burst=2, clock=clock, sleep=clock.sleep)
+
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == 0
+        assert bucket.acquire() == pytest.approx(1.0)
+
+    def test_pause_blocks_until_retry_after(self):
+        """Test de pausa tras un 429: nadie toma tokens hasta que pase"""
+        clock = FakeClock()
+        bucket = TokenBucket(rate_per_minute=600, burst=10, clock=clock, sleep=clock.sleep)
+
+        bucket.pause(5)
+        bucket.acquire()
+        assert clock.now >= 5
+
+
+class TestVendorClient:
+    """Reintentos, Retry-After y errores definitivos"""
+
+    @pytest.fixture
+    def client(self):
+        clock = FakeClock()
+        client = VendorClient('clickup', 'https://api.example.com', {'Authorization': 'pk'},
+                              rate_per_minute=6000, burst=100, sleep=clock.sleep)
+        client.bucket = TokenBucket(6000, 100, clock=clock, sleep=clock.sleep)
+        client.session.request = MagicMock()
+        client.clock = clock
+        return client
+
+    def test_retry_after_on_429(self, client):
+        """Test de 429 con Retry-After: espera lo indicado y reintenta"""
+        client.session.request.side_effect = [
+            response(429, headers={'Retry-After': '7'}),
+            response(200, {'data': [1]}),
+        ]
+
+        assert client.get('team/1/time_entries', endpoint='time_entries') == {'data': [1]}
+        assert client.session.request.call_count == 2
+        assert client.clock.now >= 7
+
+    def test_backoff_on_5xx_and_connection_errors(self, client, monkeypatch):
+        """Test de 503 y error de conexión reintentados con backoff"""
+        monkeypatch.setattr(http_client, 'backoff_seconds', lambda attempt: 0.25 * (attempt + 1))
+        client.session.request.side_effect = [
+            response(503),
+            requests.ConnectionError('reset'),
+            response(200, {'ok': True}),
+        ]
+
+        assert client.get('deals') == {'ok': True}
+        assert client.clock.sleeps == [0.25, 0.5]
+
+    def test_client_error_is_not_retried(self, client):
+        """Test de 404: falla sin reintentar"""
+        client.session.request.return_value = response(404)
+
+        with pytest.raises(HTTPError) as error:
+            client.get('deals/999')
+        assert error.value.status_code == 404
+        client.session.request.assert_called_once()
+
+    def test_gives_up_after_max_retries(self, client):
+        """Test de reintentos agotados"""
+        client.max_retries = 2
+        client.session.request.return_value = response(502)
+
+        with pytest.raises(HTTPError):
+            client.get('deals')
+        assert client.session.request.call_count == 3
+
+    def test_timeout_and_pooled_session(self, client):
+        """Test de timeout por defecto sobre la misma Session"""
+        client.session.request.return_value = response(200)
+        client.get('a')
+        client.get('b')
+
+        assert client.session.request.call_args[1]['timeout'] == http_client.DEFAULT_TIMEOUT
+        assert client.session.request.call_args[0][1] == 'https://api.example.com/b'
+
+
+def test_retry_after_http_date():
+    """Test de Retry-After como fecha HTTP"""
+    resp = response(429, headers={'Retry-After': 'Wed, 21 Oct 2015 07:28:30 GMT'})
+    assert retry_after_seconds(resp, now=1445412480) == pytest.approx(30)
@@ -0,0 +1,84 @@
+import pytest
+import sys
+import os
+from datetime import datetime, timezone
+
+# Integración de HubSpot y su servidor local en src/integrations/hubspot
+INTEGRATIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'src', 'integrations')
+sys.path.insert(0, INTEGRATIONS)
+sys.path.insert(0, os.path.join(INTEGRATIONS, 'hubspot'))
+
+from http_client import TokenBucket
+from hubspot_api_integration import HubSpotIntegration
+from hubspot_stub_server import HubSpotStub, generate_deals
+
+
+@pytest.fixture(scope='module')
+def deals():
+    return generate_deals(3000)
+
+
+@pytest.fixture
+def stub(deals):
+    server = HubSpotStub(deals, max_results=1000)
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def integrator(stub):
+    integrator = HubSpotIntegration('token', base_url=stub.base_url)
+    # Sin esperas del rate limit contra el servidor local
+    integrator.http.bucket = TokenBucket(10 ** 6, 10 ** 6)
+    integrator.search_http.bucket = TokenBucket(10 ** 6, 10 ** 6)
+    return integrator
+
+
+def closed_in(deal, start, end):
+    closed = datetime.fromisoformat(deal['properties']['closedate'].replace('Z', '+00:00'))
+    return deal['properties']['dealstage'] == 'closedwon' and start <= closed <= end
+
+
+class TestClosedDealsSearch:
+    """Filtro por etapa y closedate resuelto por HubSpot"""
+
+    def test_matches_client_side_filter_with_fewer_requests(self, stub, integrator, deals):
+        """Test de mismos deals que el filtro local, con menos requests y bytes que listar todo"""
+        start = datetime(2024, 4, 1, tzinfo=timezone.utc)
+        end = datetime(2024, 6, 30, 23, 59, 59, tzinfo=timezone.utc)
+
+        found = integrator.get_closed_deals(start_date=start, end_date=end)
+
+        expected = {deal['id'] for deal in deals if closed_in(deal, start, end)}
+        assert expected and {deal['id'] for deal in found} == expected
+        closedates = [deal['properties']['closedate'] for deal in found]
+        assert closedates == sorted(closedates)
+        assert stub.requests == {'deals_search': 1}
+
+        # Referencia: listar todo el portal para filtrar localmente
+        listing = integrator.http.get('objects/deals', {'limit': 100})
+        while 'paging' in listing:
+            listing = integrator.http.get('objects/deals', {'limit': 100, 'after': listing['paging']['next']['after']})
+        assert stub.requests['deals'] == 30
+        assert stub.bytes_sent['deals_search'] * 20 < stub.bytes_sent['deals']
+
+
+class TestSearchRewindow:
+    """Más resultados que el límite de paginación de la búsqueda"""
+
+    def test_rewindows_past_result_limit(self, stub, integrator, deals):
+        """Test de 3000 deals con límite de 1000 por consulta: todos, una vez, sin errores 400"""
+        found = list(integrator.search_deals([], 'hs_lastmodifieddate', max_results=1000))
+
+        assert len(found) == len(deals)
+        assert len({deal['id'] for deal in found}) == len(deals)
+        assert stub.requests['deals_search'] >= 15
+
+    def test_modified_since_filters_on_server(self, stub, integrator, deals):
+        """Test de delta por hs_lastmodifieddate"""
+        since = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+        found = integrator.get_deals_modified_since(since)
+
+        assert {deal['id'] for deal in found} == {deal['id'] for deal in deals if integrator.last_modified(deal) >= since}
@@ -0,0 +1,142 @@
+import pytest
+import sys
+import os
+import threading
+from unittest.mock import MagicMock
+
+# incremental_sync vive en src/integrations (compartido por las integraciones)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '..', 'src', 'integrations'))
+
+from google.cloud import bigquery
+from incremental_sync import SyncBatch, build_merge, merge_rows, run_sync
+
+TABLE = 'proj.ds.deals_report'
+
+
+def query_parameters(client):
+    return {p.name: getattr(p, 'value', None) or getattr(p, 'values', None)
+            for p in client.query.call_args[1]['job_config'].query_parameters}
+
+
+class TestBuildMerge:
+    """MERGE por clave natural"""
+
+    def test_updates_only_changed_rows(self):
+        """Test de ON por clave y UPDATE solo si cambió algo distinto de updated_at"""
+        sql = build_merge(TABLE, 'proj.ds.staging', ['deal_id', 'consultant_id', 'deal_amount', 'updated_at'],
+                          ['deal_id', 'consultant_id'])
+
+        assert 'ON T.deal_id = S.deal_id AND T.consultant_id = S.consultant_id' in sql
+        assert 'WHEN MATCHED AND (T.deal_amount IS DISTINCT FROM S.deal_amount) THEN' in sql
+        assert 'UPDATE SET deal_amount = S.deal_amount, updated_at = S.updated_at' in sql
+        assert 'NOT MATCHED BY SOURCE' not in sql
+
+    def test_delete_scope_and_year_pruning(self):
+        """Test de borrado acotado al alcance del delta y a los años tocados"""
+        sql = build_merge(TABLE, 'proj.ds.staging', ['report_id', 'logged_hours'], ['report_id'],
+                          delete_scope="STARTS_WITH(T.report_id, 'CLK_')", prune_years=True)
+
+        assert 'ON T.report_id = S.report_id AND T.year IN UNNEST(@years)' in sql
+        assert "WHEN NOT MATCHED BY SOURCE AND (STARTS_WITH(T.report_id, 'CLK_')) AND T.year IN UNNEST(@years) THEN" in sql
+
+
+class TestMergeRows:
+    """Staging, MERGE y checkpoint en una transacción"""
+
+    def test_staging_merge_and_checkpoint_in_one_transaction(self):
+        """Test de carga en staging, MERGE y checkpoint confirmados juntos"""
+        client = MagicMock()
+        rows = [
+            {'deal_id': 'D1', 'consultant_id': 'CONS001', 'deal_amount': 10.0},
+            {'deal_id': 'D1', 'consultant_id': 'CONS001', 'deal_amount': 12.0},
+        ]
+        batch = SyncBatch(rows, '2025-05-01T00:00:00+00:00', delete_scope='T.deal_id IN UNNEST(@ids)',
+                          scope_parameters=[bigquery.ArrayQueryParameter('ids', 'STRING', ['D1'])])
+
+        merge_rows(client, 'hubspot', rows, TABLE, ['deal_id', 'consultant_id'], batch)
+
+        staged, staging_id = client.load_table_from_dataframe.call_args[0]
+        assert staging_id.startswith(f'{TABLE}__staging_hubspot_')
+        # El staging expira solo si la corrida muere antes del DROP
+        staging, fields = client.update_table.call_args[0]
+        assert staging.expires is not None and fields == ['expires']
+        assert client.load_table_from_dataframe.call_args[1]['job_config'].write_disposition == 'WRITE_TRUNCATE'
+        # Una fila por clave, la última gana
+        assert staged['deal_amount'].tolist() == [12.0]
+        assert 'updated_at' in staged.columns
+
+        script = client.query.call_args[0][0]
+        assert script.index('BEGIN TRANSACTION') < script.index(f'MERGE `{TABLE}`') \
+            < script.index('sync_checkpoints') < script.index('COMMIT TRANSACTION') < script.index('DROP TABLE')
+        assert query_parameters(client)['checkpoint'] == '2025-05-01T00:00:00+00:00'
+        assert query_parameters(client)['ids'] == ['D1']
+
+    def test_overlapping_runs_use_their_own_staging(self):
+        """Test de dos corridas solapadas: cada una carga, mergea y borra su propio staging"""
+        client = MagicMock()
+        both_loaded = threading.Barrier(2, timeout=5)
+        loads, scripts = {}, []
+        lock = threading.Lock()
+
+        def load(df, staging_id, job_config=None):
+            with lock:
+                loads[staging_id] = df['deal_amount'].tolist()
+            # La segunda carga ocurre antes de que la primera corrida haga su MERGE
+            both_loaded.wait()
+            return MagicMock()
+
+        def query(script, job_config=None):
+            with lock:
+                scripts.append(script)
+            return MagicMock()
+
+        client.load_table_from_dataframe.side_effect = load
+        client.query.side_effect = query
+
+        runs = [
+            threading.Thread(target=merge_rows, args=(
+                client, 'hubspot', [{'deal_id': 'D1', 'deal_amount': amount}], TABLE, ['deal_id'],
+                SyncBatch([], None)
+            ))
+            for amount in (10.0, 20.0)
+        ]
+        for run in runs:
+            run.start()
+        for run in runs:
+            run.join()
+
+        assert len(loads) == 2
+        for staging_id in loads:
+            script = next(script for script in scripts if f'USING `{staging_id}`' in script)
+            assert f'DROP TABLE IF EXISTS `{staging_id}`' in script
+            assert sum(staging_id in script for script in scripts) == 1
+
+    def test_empty_delta_with_scope_deletes(self):
+        """Test de delta vacío con alcance: DELETE sin staging"""
+        client = MagicMock()
+        merge_rows(client, 'hubspot', [], TABLE, ['deal_id'], SyncBatch([], 'cp', delete_scope='T.deal_id = "D9"'))
+
+        client.load_table_from_dataframe.assert_not_called()
+        script = client.query.call_args[0][0]
+        assert f'DELETE FROM `{TABLE}` T WHERE (T.deal_id = "D9")' in script
+        assert 'DROP TABLE' not in script
+
+    def test_nothing_changed_only_moves_checkpoint(self):
+        """Test de corrida sin cambios: solo el checkpoint"""
+        client = MagicMock()
+        merge_rows(client, 'google_forms', [], TABLE, ['satisfaction_id'], SyncBatch([], 'cp'))
+
+        client.load_table_from_dataframe.assert_not_called()
+        assert f'MERGE `{TABLE}`' not in client.query.call_args[0][0]
+
+
+def test_run_sync_passes_confirmed_checkpoint():
+    """Test de run_sync: fetch recibe el checkpoint guardado"""
+    client = MagicMock()
+    client.query.return_value.result.return_value = [{'checkpoint': '2025-04-14'}]
+    fetch = MagicMock(return_value=SyncBatch([], '2025-04-21'))
+
+    run_sync(client, 'clickup', TABLE, ['report_id'], fetch)
+
+    fetch.assert_called_once_with('2025-04-14')
+    assert query_parameters(client)['checkpoint'] == '2025-04-21'
@@ -0,0 +1,105 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import intent_router
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from intent_router import (
+    BONUS, BREAKDOWN, RECOMMENDATIONS, IntentRouter, RoutedIntent,
+    normalize_text, question_fingerprint, render_breakdown, render_recommendations
+)
+from sessions import ConversationContext
+
+CONSULTANTS = {
+    "CONS001": {"name": "Rodolfo Solar", "plan": "Sales"},
+    "CONS002": {"name": "Anthony Alarcon", "plan": "Delivery"},
+    "CONS003": {"name": "Julian Rodriguez", "plan": "Hybrid"}
+}
+
+
+@pytest.fixture
+def router():
+    return IntentRouter(CONSULTANTS)
+
+
+@pytest.fixture
+def context():
+    context = ConversationContext()
+    context.update_consultant('CONS001', 'Rodolfo Solar', 'Sales')
+    return context
+
+
+class TestIntentRouter:
+    """Test suite para el router determinista de intenciones"""
+
+    def test_normalize_text(self):
+        """Test de normalización de acentos, mayúsculas y puntuación"""
+        assert normalize_text("¿Cuál es mi BONO, Julián?") == "cual es mi bono julian"
+
+    def test_question_fingerprint(self):
+        """Test de huella: variantes de la misma pregunta coinciden"""
+        assert question_fingerprint("¿Cómo funciona el sistema de bonos?") == \
+            question_fingerprint("como funciona el SISTEMA de bonos") == "funciona sistema bonos"
+
+    @pytest.mark.parametrize("message, expected", [
+        ("¿Cuál es mi bono Q2 2025?", RoutedIntent(BONUS, 'CONS001', 2, 2025)),
+        ("desglose de CONS002", RoutedIntent(BREAKDOWN, 'CONS002')),
+        ("¿Cómo mejoro mi bono?", RoutedIntent(RECOMMENDATIONS, 'CONS001')),
+        ("bono de Julián Rodríguez del segundo trimestre 2025", RoutedIntent(BONUS, 'CONS003', 2, 2025)),
+        ("¿cuánto gano este trimestre, Anthony?", RoutedIntent(BONUS, 'CONS002')),
+        ("desglose y cómo mejoro mi bono", RoutedIntent(BREAKDOWN, 'CONS001', extra_intents=(RECOMMENDATIONS,))),
+    ])
+    def test_parse_formulaic_questions(self, router, context, message, expected):
+        """Test de extracción de intención, consultor y periodo"""
+        assert router.parse(message, context) == expected
+
+    @pytest.mark.parametrize("message", [
+        "¿Cómo funciona el sistema de bonos?",
+        "¿Por qué mi bono bajó?",
+        "Compara el bono de CONS001 y CONS002",
+        "bono de CONS001 y CONS003",
+        "¿Cuál es mi bono de 2025?",
+        "Hola",
+    ])
+    def test_ambiguous_messages_go_to_model(self, router, context, message):
+        """Test de mensajes que deben resolverse con el modelo"""
+        assert router.parse(message, context) is None
+
+    def test_requires_known_consultant(self, router):
+        """Test sin consultor en el mensaje ni en el contexto"""
+        assert router.parse("¿Cuál es mi bono?") is None
+
+    def test_uses_context_period(self, router, context):
+        """Test de preguntas de seguimiento: se reutiliza el periodo del contexto"""
+        context.update_time_period(1, 2025)
+        assert router.parse("¿y el desglose?", context) == RoutedIntent(BREAKDOWN, 'CONS001', 1, 2025)
+        assert router.parse("bono del Q3", context) == RoutedIntent(BONUS, 'CONS001', 3, 2025)
+
+
+class TestRender:
+    """Test suite para las respuestas con plantilla"""
+
+    def test_render_breakdown(self):
+        """Test del desglose con componentes pagados y vacíos"""
+        answer = render_breakdown({
+            "total_bonus": 2100.0,
+            "period": "Q2 2025",
+            "breakdown": {
+                "Company Performance": {"Company Booking Bonus": 500.0},
+                "Global Performance": {"MBO Bonus": 0.0}
+            }
+        }, "Anthony Alarcon")
+        assert "Q2 2025" in answer
+        assert "$2,100.00" in answer
+        assert "Company Booking Bonus $500.00" in answer
+        assert "Global Performance: sin bono en este periodo" in answer
+
+    def test_render_recommendations(self):
+        """Test de recomendaciones vacías y con contenido"""
+        assert "nivel más alto" in render_recommendations([], "Rodolfo Solar")
+        assert "- Cierra más deals" in render_recommendations(["Cierra más deals"])
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,66 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import metrics
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache import TTLCache
+from metrics import Registry, cache_collector
+
+
+class TestRegistry:
+    """Test suite para el registro de métricas en formato Prometheus"""
+
+    def test_histogram_exposition(self):
+        """Test de buckets acumulados, suma y conteo"""
+        registry = Registry()
+        histogram = registry.histogram('stage_seconds', 'Tiempo por etapa', ['stage'], buckets=(0.1, 1.0))
+        histogram.observe(0.05, stage='bigquery')
+        histogram.observe(0.5, stage='bigquery')
+        histogram.observe(2.0, stage='bigquery')
+
+        text = registry.render()
+        assert '# TYPE stage_seconds histogram' in text
+        assert 'stage_seconds_bucket{stage="bigquery",le="0.1"} 1' in text
+        assert 'stage_seconds_bucket{stage="bigquery",le="1"} 2' in text
+        assert 'stage_seconds_bucket{stage="bigquery",le="+Inf"} 3' in text
+        assert 'stage_seconds_sum{stage="bigquery"} 2.55' in text
+        assert 'stage_seconds_count{stage="bigquery"} 3' in text
+
+    def test_counter_and_labels(self):
+        """Test de contadores y validación de etiquetas"""
+        registry = Registry()
+        errors = registry.counter('errors', 'Errores por etapa', ['stage'])
+        errors.inc(stage='llm')
+        errors.inc(2, stage='llm')
+
+        assert errors.value(stage='llm') == 3
+        assert 'errors_total{stage="llm"} 3' in registry.render()
+        with pytest.raises(ValueError):
+            errors.inc(route='/api/chat')
+
+    def test_histogram_timer(self):
+        """Test del context manager time()"""
+        registry = Registry()
+        histogram = registry.histogram('llm_seconds', 'Tiempo del modelo')
+        with histogram.time():
+            pass
+        assert histogram.count() == 1
+
+    def test_cache_collector(self):
+        """Test de hits/misses tomados de los TTLCache en cada scrape"""
+        cache = TTLCache()
+        cache.set('a', 1)
+        cache.get('a')
+        cache.get('b')
+        registry = Registry()
+        registry.register_collector(cache_collector(lambda: {'bonus': cache}))
+
+        text = registry.render()
+        assert 'bonus_cache_requests_total{cache="bonus",result="hit"} 1' in text
+        assert 'bonus_cache_requests_total{cache="bonus",result="miss"} 1' in text
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,130 @@
+import pytest
+import sys
+import os
+import pandas as pd
+
+# Add the parent directory to sys.path to import replica
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from replica import BonusResultsReplica, ReplicaRefresher
+
+
+class FakeClock:
+    """Reloj controlable para probar la vigencia de la réplica"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_results(calculation_date='2025-07-01T10:00:00Z'):
+    """Filas de quarterly_bonus_results para dos quarters"""
+    rows = [
+        ('CONS001', 'Sales', 1, 2025, 8000.0),
+        ('CONS001', 'Sales', 2, 2025, 10291.4),
+        ('CONS002', 'Delivery', 2, 2025, 2100.0),
+        ('CONS003', 'Hybrid', 4, 2024, 900.0),
+        ('CONS003', 'Hybrid', 1, 2025, 1700.0),
+    ]
+    return pd.DataFrame([
+        {
+            'consultant_id': cid,
+            'plan_type': plan,
+            'quarter': quarter,
+            'year': year,
+            'total_bonus': bonus,
+            'calculation_date': pd.Timestamp(calculation_date)
+        }
+        for cid, plan, quarter, year, bonus in rows
+    ])
+
+
+class TestBonusResultsReplica:
+    """Test suite para la réplica columnar en memoria"""
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    @pytest.fixture
+    def replica(self, clock):
+        replica = BonusResultsReplica(max_staleness_seconds=60, clock=clock)
+        replica.load(make_results())
+        return replica
+
+    def test_lookup_latest_and_explicit_period(self, replica):
+        """Test de lookup por último periodo y por periodo explícito"""
+        latest = replica.lookup('CONS001')
+        assert (latest['quarter'], latest['year']) == (2, 2025)
+        assert latest['total_bonus'] == 10291.4
+        assert isinstance(latest['quarter'], int)
+
+        assert replica.lookup('CONS001', 1, 2025)['total_bonus'] == 8000.0
+        assert replica.lookup('CONS003')['quarter'] == 1
+        assert replica.lookup('CONS003')['year'] == 2025
+
+    def test_lookup_missing(self, replica):
+        """Test de consultor o periodo inexistente"""
+        assert replica.lookup('CONS999') is None
+        assert replica.lookup('CONS002', 1, 2025) is None
+
+    def test_period_frame(self, replica):
+        """Test del índice por (year, quarter)"""
+        assert replica.latest_period() == (2025, 2)
+        frame = replica.latest_period_frame()
+        assert sorted(frame['consultant_id']) == ['CONS001', 'CONS002']
+
+    def test_freshness(self, replica, clock):
+        """Test de vigencia: fría antes de cargar y vencida tras max_staleness"""
+        assert BonusResultsReplica().is_fresh() is False
+        assert replica.is_fresh() is True
+
+        clock.now = 61
+        assert replica.is_fresh() is False
+
+        replica.mark_checked()
+        assert replica.is_fresh() is True
+
+    def test_empty_load_is_cold(self, clock):
+        """Test de carga sin filas: la réplica sigue fría"""
+        replica = BonusResultsReplica(max_staleness_seconds=60, clock=clock)
+        replica.load(make_results().iloc[0:0])
+        assert replica.row_count == 0
+        assert replica.is_fresh() is False
+
+
+class TestReplicaRefresher:
+    """Test suite para el refresco en segundo plano"""
+
+    def test_reload_only_when_calculation_date_advances(self):
+        """Test de recarga solo cuando avanza calculation_date"""
+        replica = BonusResultsReplica()
+        watermarks = [pd.Timestamp('2025-07-01T10:00:00Z')]
+        loads = []
+        refreshed = []
+
+        def fetch_table():
+            loads.append(1)
+            return make_results(watermarks[0])
+
+        refresher = ReplicaRefresher(
+            replica,
+            fetch_watermark=lambda: watermarks[0],
+            fetch_table=fetch_table,
+            on_refresh=refreshed.append
+        )
+
+        assert refresher.refresh_once() is True
+        assert refresher.refresh_once() is False
+        assert len(loads) == 1
+
+        watermarks[0] = pd.Timestamp('2025-10-01T10:00:00Z')
+        assert refresher.refresh_once() is True
+        assert len(loads) == 2
+        assert refreshed[-1] == pd.Timestamp('2025-10-01T10:00:00Z')
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
@@ -0,0 +1,124 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import sessions
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sessions import ConversationContext, SessionStore, SQLiteSessionStore, HISTORY_SIZE
+
+
+class FakeClock:
+    """Reloj controlable para probar expiración de sesiones"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestConversationContext:
+    """Test suite para el contexto de conversación"""
+
+    def test_history_is_bounded(self):
+        """Test del ring buffer: solo se guardan los últimos turnos"""
+        context = ConversationContext()
+        for i in range(HISTORY_SIZE + 3):
+            context.add_to_history(f"mensaje {i}", f"respuesta {i}")
+
+        assert len(context.conversation_history) == HISTORY_SIZE
+        assert context.conversation_history[0][0] == "mensaje 3"
+        assert context.conversation_history[-1][1] == f"respuesta {HISTORY_SIZE + 2}"
+
+    def test_round_trip(self):
+        """Test de serialización to_dict / from_dict"""
+        context = ConversationContext()
+        context.update_consultant('CONS001', 'Rodolfo Solar', 'Sales')
+        context.update_time_period(2, 2025)
+        context.add_to_history("¿Cuál es mi bono?", "Tu bono es $10,291.40")
+
+        restored = ConversationContext.from_dict(context.to_dict())
+        assert restored.consultant_id == 'CONS001'
+        assert (restored.last_quarter, restored.last_year) == (2, 2025)
+        assert list(restored.conversation_history) == list(context.conversation_history)
+
+
+class TestSessionStore:
+    """Test suite para el store de sesiones en memoria"""
+
+    def test_get_returns_same_context(self):
+        """Test de sesión existente"""
+        store = SessionStore()
+        context = store.get('a')
+        context.update_consultant('CONS002')
+        store.save('a', context)
+        assert store.get('a') is context
+
+    def test_lru_eviction(self):
+        """Test de desalojo LRU por número de sesiones"""
+        store = SessionStore(max_sessions=2)
+        store.get('a')
+        store.get('b')
+        store.get('a')  # 'b' queda como la menos reciente
+        store.get('c')
+
+        assert len(store) == 2
+        store.get('a').update_consultant('CONS001')
+        assert store.get('a').consultant_id == 'CONS001'
+        assert store.get('b').consultant_id is None
+
+    def test_ttl_expiration(self):
+        """Test de expiración por inactividad"""
+        clock = FakeClock()
+        store = SessionStore(ttl_seconds=60, clock=clock)
+        store.get('a').update_consultant('CONS001')
+
+        clock.now = 61
+        assert store.get('a').consultant_id is None
+
+    def test_memory_ceiling(self):
+        """Test del techo de memoria aproximada"""
+        store = SessionStore(max_bytes=5000)
+        for session_id in ('a', 'b', 'c'):
+            context = store.get(session_id)
+            context.add_to_history('x' * 1000, 'y' * 1000)
+            store.save(session_id, context)
+
+        assert store.stats()['approx_bytes'] <= 5000
+        assert len(store) == 1
+
+
+class TestSQLiteSessionStore:
+    """Test suite para el store de sesiones en SQLite"""
+
+    def test_round_trip_and_purge(self, tmp_path):
+        """Test de persistencia, expiración y purga"""
+        clock = FakeClock(1000.0)
+        store = SQLiteSessionStore(str(tmp_path / 'sessions.db'), max_sessions=2, ttl_seconds=60, clock=clock)
+
+        context = store.get('a')
+        context.update_consultant('CONS003', 'Ricardo Hernández', 'Hybrid')
+        context.add_to_history("Hola", "¡Hola Ricardo!")
+        store.save('a', context)
+
+        restored = store.get('a')
+        assert restored.consultant_name == 'Ricardo Hernández'
+        assert restored.conversation_history[0][:2] == ("Hola", "¡Hola Ricardo!")
+
+        clock.now += 1
+        store.save('b', ConversationContext())
+        clock.now += 1
+        store.save('c', ConversationContext())
+        store.purge()
+        assert len(store) == 2
+        assert store.get('a').consultant_id is None
+
+        clock.now += 120
+        assert store.get('c').consultant_id is None
+        store.purge()
+        assert len(store) == 0
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
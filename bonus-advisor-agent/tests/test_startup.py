@@ -0,0 +1,31 @@
+import pytest
+import sys
+import os
+
+# Add the parent directory to sys.path to import the benchmark probe
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_startup import run_probe
+
+
+@pytest.fixture(scope='module')
+def probe():
+    """Arranque de main en un intérprete nuevo"""
+    return run_probe()
+
+
+class TestColdStart:
+    """Test de arranque en frío: el worker responde sin cargar dependencias pesadas"""
+
+    def test_import_does_not_load_heavy_modules(self, probe):
+        """Test de imports diferidos de BigQuery, ADK y pandas"""
+        assert probe['heavy_modules_loaded'] == []
+
+    def test_index_answers_before_agent_is_built(self, probe):
+        """Test de `/` sin construir cliente ni agente"""
+        assert probe['status'] == 200
+        assert probe['import_seconds'] + probe['first_request_seconds'] < 5
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
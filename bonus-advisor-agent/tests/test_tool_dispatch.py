@@ -0,0 +1,88 @@
+import pytest
+import sys
+import os
+import time
+import contextvars
+
+# Add the parent directory to sys.path to import tool_dispatch
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tool_dispatch import ToolDispatcher
+
+request_id = contextvars.ContextVar('request_id', default=None)
+
+
+def get_bonus_breakdown(delay):
+    time.sleep(delay)
+    return {'tool': 'breakdown', 'request_id': request_id.get()}
+
+
+def get_improvement_recommendations(delay):
+    time.sleep(delay)
+    return ['Incrementa horas de proyecto']
+
+
+class TestToolDispatcher:
+    """Test suite para la ejecución paralela de herramientas"""
+
+    def test_calls_run_in_parallel(self):
+        """Test de turno: la latencia es la de la herramienta más lenta"""
+        dispatcher = ToolDispatcher(max_workers=4)
+        start = time.perf_counter()
+        breakdown, recommendations = dispatcher.call_many([
+            (get_bonus_breakdown, (0.2,), {}),
+            (get_improvement_recommendations, (0.2,), {}),
+        ])
+        elapsed = time.perf_counter() - start
+
+        assert breakdown['tool'] == 'breakdown'
+        assert recommendations == ['Incrementa horas de proyecto']
+        assert elapsed < 0.35
+
+    def test_context_is_propagated(self):
+        """Test de contextvars: las herramientas ven el contexto del request"""
+        dispatcher = ToolDispatcher()
+        token = request_id.set('req-1')
+        try:
+            assert dispatcher.call(get_bonus_breakdown, 0)['request_id'] == 'req-1'
+        finally:
+            request_id.reset(token)
+
+    def test_per_tool_timeout(self):
+        """Test de timeout por herramienta"""
+        dispatcher = ToolDispatcher(tool_timeout_seconds=5, timeouts={'get_bonus_breakdown': 0.05})
+        result = dispatcher.call(get_bonus_breakdown, 0.3)
+        assert result == {'error': 'Tiempo de espera agotado en get_bonus_breakdown'}
+
+    def test_turn_deadline(self):
+        """Test del deadline del turno: acota a todas las herramientas"""
+        dispatcher = ToolDispatcher(tool_timeout_seconds=5, turn_timeout_seconds=0.1)
+        start = time.perf_counter()
+        with dispatcher.turn():
+            results = dispatcher.call_many([
+                (get_bonus_breakdown, (0.3,), {}),
+                (get_improvement_recommendations, (0.01,), {}),
+            ])
+        assert 'error' in results[0]
+        assert results[1] == ['Incrementa horas de proyecto']
+        assert time.perf_counter() - start < 0.25
+
+    def test_errors_become_tool_results(self):
+        """Test de excepciones: el agente recibe un error en vez de una excepción"""
+        def failing_tool():
+            raise RuntimeError('BigQuery no disponible')
+
+        result = ToolDispatcher().call(failing_tool)
+        assert result == {'error': 'Error en failing_tool: BigQuery no disponible'}
+
+    def test_wrap_preserves_signature(self):
+        """Test de wrap: el agente ve el nombre y la firma de la herramienta"""
+        import inspect
+        wrapped = ToolDispatcher().wrap(get_bonus_breakdown)
+        assert wrapped.__name__ == 'get_bonus_breakdown'
+        assert list(inspect.signature(wrapped).parameters) == ['delay']
+        assert wrapped(0)['tool'] == 'breakdown'
+
+
+if __name__ == '__main__':
+    pytest.main([__file__, '-v', '--tb=short'])
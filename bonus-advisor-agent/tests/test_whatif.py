@@ -0,0 +1,150 @@
+import pytest
+import sys
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Add the parent directory to sys.path to import whatif
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bonus_engine import COMMISSION_TIERS, BonusTiers, UTILIZATION_TIERS, calculate_quarterly_bonuses, load_insert_script, tier_value
+from whatif import company_gaps, describe_gap, next_tier, next_tier_gaps, timeline_counts, timeline_gaps
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'sql', 'schema')
+
+
+@pytest.fixture
+def tables():
+    with open(os.path.join(SCHEMA_DIR, '01_create_tables.sql'), encoding='utf-8') as f:
+        schema_sql = f.read()
+    with open(os.path.join(SCHEMA_DIR, '02_insert_dummy_data.sql'), encoding='utf-8') as f:
+        insert_sql = f.read()
+    return load_insert_script(insert_sql, schema_sql)
+
+
+def population(count):
+    """Resultados sintéticos de un quarter con el esquema de quarterly_bonus_results"""
+    rng = np.random.default_rng(7)
+    plans = np.array(["Sales", "Hybrid", "Delivery"])[np.arange(count) % 3]
+    hours_plan = plans != "Sales"
+    project_hours = np.where(hours_plan, rng.integers(0, 600, count).astype(float), np.nan)
+    return pd.DataFrame({
+        "consultant_id": [f"CONS{i:05d}" for i in range(count)],
+        "consultant_name": [f"Consultor {i}" for i in range(count)],
+        "plan_type": plans,
+        "individual_tcv": np.where(hours_plan & (plans == "Delivery"), 0.0, rng.integers(0, 1_200_000, count).astype(float)),
+        "project_hours": project_hours,
+        "total_quarter_hours": project_hours + np.where(hours_plan, rng.integers(0, 200, count), np.nan),
+    })
+
+
+class TestNextTier:
+    """Búsqueda binaria sobre los tiers compilados"""
+
+    def test_boundaries(self):
+        """Test de umbrales inclusivos y estrictos"""
+        hours = [0.0, 99.5, 100.0, 174.0, 225.0, 225.5, np.nan]
+        level, target, next_value, strict = next_tier(hours, UTILIZATION_TIERS['Hybrid'])
+        assert level.tolist() == [0, 0, 1, 1, 2, 3, 0]
+        assert target[:5].tolist() == [100.0, 100.0, 175.0, 175.0, 225.0]
+        assert np.isnan(target[5])
+        assert next_value[4] == 400.0
+        # En el tope estricto hay que superar el umbral, no alcanzarlo
+        assert strict.tolist() == [False, False, False, False, True, False, False]
+
+    def test_tier_value_matches_linear_scan(self):
+        """Test de tier_value compilado contra la comparación tier por tier"""
+        values = np.array([0.0, 49999.99, 50000.0, 499999.0, 500000.0, 1e6, 2e6, np.nan])
+        expected = np.zeros(len(values))
+        for threshold, payout, strict, rate in COMMISSION_TIERS:
+            reached = values > threshold if strict else values >= threshold
+            expected[reached] = payout + rate * values[reached]
+        assert tier_value(values, COMMISSION_TIERS).tolist() == expected.tolist()
+
+
+class TestGaps:
+    """Distancia al siguiente tier por componente"""
+
+    def test_dummy_quarter(self, tables):
+        """Test sobre Q2 2025 de los datos dummy: solo Sales tiene un tier por delante"""
+        results = calculate_quarterly_bonuses(tables, 2, 2025)
+        counts = timeline_counts(tables['consultant_projects_master'], 2, 2025)
+        gaps = next_tier_gaps(results, counts)
+
+        assert gaps['consultant_id'].tolist() == ['CONS001']
+        gap = gaps.iloc[0]
+        assert gap['component'] == 'individual_commission'
+        assert gap['target'] == 1000000.0
+        assert gap['needed'] == 397240.0
+        assert gap['current_bonus'] == pytest.approx(9041.4)
+        assert gap['bonus_delta'] == pytest.approx(10958.6)
+        assert 'TCV' in describe_gap(gap)
+
+        company = company_gaps(results)
+        assert [g['component'] for g in company] == ['company_booking_bonus']
+        assert company[0]['needed'] == 147240.0
+        assert company[0]['bonus_delta'] == 125.0
+
+    def test_efficiency_hours(self):
+        """Test de horas de proyecto para efficiency: cada hora suma también al total"""
+        results = pd.DataFrame({
+            'consultant_id': ['A', 'B'], 'consultant_name': ['A', 'B'], 'plan_type': ['Delivery', 'Hybrid'],
+            'individual_tcv': [0.0, 0.0], 'project_hours': [60.0, 0.0], 'total_quarter_hours': [100.0, 0.0],
+        })
+        gaps = next_tier_gaps(results)
+        efficiency = gaps[gaps['component'] == 'efficiency_bonus'].set_index('consultant_id')
+        assert efficiency.loc['A', 'needed'] == 100.0  # 160 / 200 = 80%
+        assert efficiency.loc['A', 'bonus_delta'] == 250.0
+        assert efficiency.loc['B', 'needed'] == 0.01
+
+    def test_timeline_projects(self):
+        """Test de proyectos a tiempo: cada entrega suma también a los completados"""
+        results = pd.DataFrame({
+            'consultant_id': ['A', 'B', 'C', 'D'], 'consultant_name': list('ABCD'),
+            'plan_type': ['Delivery', 'Hybrid', 'Delivery', 'Delivery'],
+        })
+        counts = pd.DataFrame({'completed_projects': [4, 3, 2], 'on_time_projects': [1, 0, 1]},
+                              index=pd.Index(['A', 'B', 'C'], name='consultant_id'))
+        gaps = timeline_gaps(results, counts).set_index('consultant_id')
+        assert gaps.loc['A', 'needed'] == 2  # 3 / 6 = 50%
+        assert gaps.loc['B', 'needed'] == 2  # 2 / 5 = 40%
+        assert 'C' not in gaps.index  # 1 / 2 ya cumple el 50%
+        assert gaps.loc['D', 'needed'] == 1  # Sin proyectos completados
+
+    def test_strict_thresholds(self):
+        """Test de umbrales estrictos en efficiency y timeline: llegar justo al mínimo no alcanza"""
+        tiers = BonusTiers(efficiency_strict={'Hybrid': False, 'Delivery': True},
+                           timeline_strict={'Hybrid': False, 'Delivery': True})
+        results = pd.DataFrame({
+            'consultant_id': ['A', 'B'], 'consultant_name': ['A', 'B'], 'plan_type': ['Delivery', 'Hybrid'],
+            'individual_tcv': [0.0, 0.0], 'project_hours': [80.0, 80.0], 'total_quarter_hours': [100.0, 100.0],
+        })
+        counts = pd.DataFrame({'completed_projects': [4, 5], 'on_time_projects': [2, 2]},
+                              index=pd.Index(['A', 'B'], name='consultant_id'))
+        gaps = next_tier_gaps(results, counts, tiers)
+        efficiency = gaps[gaps['component'] == 'efficiency_bonus'].set_index('consultant_id')
+        assert efficiency.index.tolist() == ['A']  # 80% no supera 80%; B ya lo cumple
+        assert bool(efficiency.loc['A', 'strict'])
+        assert 'superar el 80%' in describe_gap(efficiency.loc['A'])
+        timeline = timeline_gaps(results, counts, tiers).set_index('consultant_id')
+        assert timeline.loc['A', 'needed'] == 1  # 2 / 4 = 50% no supera 50%: 3 / 5
+        assert 'B' not in timeline.index  # 2 / 5 = 40% cumple el mínimo inclusivo
+
+    def test_population_single_pass(self):
+        """Test de 5000 consultores: sumar lo que falta alcanza exactamente el tier siguiente"""
+        results = population(5000)
+        start = time.perf_counter()
+        gaps = next_tier_gaps(results)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 1.0
+
+        commission = gaps[gaps['component'] == 'individual_commission']
+        reached = commission['current'] + commission['needed']
+        assert (tier_value(reached, COMMISSION_TIERS) == commission['next_bonus']).all()
+
+        for plan, tiers in UTILIZATION_TIERS.items():
+            utilization = gaps[(gaps['component'] == 'utilization_bonus') & (gaps['plan_type'] == plan)]
+            reached = utilization['current'] + utilization['needed'] + np.where(utilization['strict'], 0.01, 0.0)
+            assert (tier_value(reached, tiers) == utilization['next_bonus']).all()
+            assert (utilization['bonus_delta'] > 0).all()
@@ -0,0 +1,88 @@
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+
+from metrics import ERRORS
+
+_turn_deadline = contextvars.ContextVar("tool_turn_deadline", default=None)
+
+
+class ToolDispatcher:
+    """Ejecuta herramientas del agente en un pool acotado, con timeout por herramienta y deadline por turno.
+
+    Cada herramienta corre con una copia del contexto del llamador, así que comparte el memo
+    de request_scope(). Una herramienta que excede su tiempo devuelve un error al agente;
+    el hilo no se puede interrumpir y termina en segundo plano.
+    """
+
+    def __init__(self, max_workers=16, tool_timeout_seconds=10.0, turn_timeout_seconds=25.0, timeouts=None):
+        self.max_workers = max_workers
+        self.tool_timeout_seconds = tool_timeout_seconds
+        self.turn_timeout_seconds = turn_timeout_seconds
+        self.timeouts = dict(timeouts or {})
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="bonus-tool"
+                    )
+        return self._executor
+
+    @contextmanager
+    def turn(self):
+        """Abre el deadline del turno (los turnos anidados usan el deadline exterior)."""
+        if _turn_deadline.get() is not None:
+            yield
+            return
+        token = _turn_deadline.set(time.monotonic() + self.turn_timeout_seconds)
+        try:
+            yield
+        finally:
+            _turn_deadline.reset(token)
+
+    def _deadline(self, name):
+        deadline = time.monotonic() + self.timeouts.get(name, self.tool_timeout_seconds)
+        turn_deadline = _turn_deadline.get()
+        return deadline if turn_deadline is None else min(deadline, turn_deadline)
+
+    def call_many(self, calls):
+        """Ejecuta [(fn, args, kwargs), ...] en paralelo; devuelve los resultados en el mismo orden."""
+        pending = []
+        for fn, args, kwargs in calls:
+            context = contextvars.copy_context()
+            pending.append((fn.__name__, self._deadline(fn.__name__),
+                            self.executor.submit(context.run, fn, *args, **kwargs)))
+        return [self._result(name, deadline, future) for name, deadline, future in pending]
+
+    def call(self, fn, *args, **kwargs):
+        return self.call_many([(fn, args, kwargs)])[0]
+
+    def _result(self, name, deadline, future):
+        try:
+            return future.result(timeout=max(deadline - time.monotonic(), 0.0))
+        except FutureTimeout:
+            future.cancel()
+            ERRORS.inc(stage="tool_timeout")
+            return {"error": f"Tiempo de espera agotado en {name}"}
+        except Exception as e:
+            ERRORS.inc(stage="tool")
+            return {"error": f"Error en {name}: {str(e)}"}
+
+    def wrap(self, fn):
+        """Versión de fn que pasa por el dispatcher (para registrarla como herramienta del agente)."""
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self.call(fn, *args, **kwargs)
+        return wrapper
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
@@ -0,0 +1,208 @@
+"""Simulación "qué me falta": distancia al siguiente tier de cada componente del bono.
+
+Trabaja sobre las filas de quarterly_bonus_results de un quarter (réplica o una sola query) y
+responde a toda la población en una pasada vectorizada: los tiers de bonus_engine se compilan
+a arrays ordenados y el tier de cada consultor sale de una búsqueda binaria (np.searchsorted).
+Cada componente se evalúa por separado, con el resto de las métricas fijas. Los tiers llegan como
+BonusTiers (los de bonus_tier_config en el servicio); sin ellos se usan las constantes del motor.
+"""
+import numpy as np
+import pandas as pd
+
+from bonus_engine import DEFAULT_TIERS, compile_tiers, tier_reached
+
+GAP_COLUMNS = [
+    "consultant_id", "consultant_name", "plan_type", "component", "metric",
+    "current", "target", "needed", "strict", "current_bonus", "next_bonus", "bonus_delta",
+]
+
+
+def _ceil_cents(values):
+    # Redondeo hacia arriba: lo que falta tiene que alcanzar el umbral, no quedarse a un centavo
+    return np.ceil(np.round(np.asarray(values, dtype=float) * 100, 6)) / 100
+
+
+def next_tier(values, tiers):
+    """(nivel, umbral siguiente, valor siguiente, estricto) por elemento; NaN si ya está en el tope.
+
+    El valor siguiente es el que paga el tier siguiente con la métrica en su umbral (monto + tasa * umbral).
+    """
+    compiled = compile_tiers(tuple(tiers))
+    values = np.nan_to_num(np.asarray(values, dtype=float))  # COALESCE(x, 0) como el procedimiento
+    level = compiled.level(values)
+    has_next = level < len(compiled)
+    following = np.minimum(level, len(compiled) - 1)
+    target = np.where(has_next, compiled.thresholds[following], np.nan)
+    next_value = np.where(has_next, compiled.values[following] + compiled.rates[following] * target, np.nan)
+    strict = has_next & compiled.strict[following]
+    return level, target, next_value, strict
+
+
+def _gaps(results, mask, component, metric, current, target, needed, strict, current_bonus, next_bonus):
+    keep = mask & ~np.isnan(target)
+    frame = pd.DataFrame({
+        "consultant_id": results["consultant_id"].to_numpy()[keep],
+        "consultant_name": results["consultant_name"].to_numpy()[keep],
+        "plan_type": results["plan_type"].to_numpy()[keep],
+        "component": component,
+        "metric": metric,
+        "current": np.asarray(current, dtype=float)[keep],
+        "target": target[keep],
+        "needed": needed[keep],
+        "strict": strict[keep],
+        "current_bonus": np.asarray(current_bonus, dtype=float)[keep],
+        "next_bonus": next_bonus[keep],
+    })
+    frame["bonus_delta"] = frame["next_bonus"] - frame["current_bonus"]
+    return frame
+
+
+def commission_gaps(results, tiers=None):
+    """TCV que le falta a cada Sales para subir de tasa de comisión (la comisión se recalcula sobre el umbral)"""
+    tiers = tiers or DEFAULT_TIERS
+    tcv = np.nan_to_num(results["individual_tcv"].to_numpy(dtype=float))
+    level, target, next_bonus, strict = next_tier(tcv, tiers.commission)
+    current_bonus = compile_tiers(tuple(tiers.commission)).value_at(level, tcv)
+    return _gaps(results, (results["plan_type"] == "Sales").to_numpy(), "individual_commission", "individual_tcv",
+                 tcv, target, target - tcv, strict, current_bonus, next_bonus)
+
+
+def utilization_gaps(results, tiers=None):
+    """Horas de proyecto que faltan para el siguiente tier de utilization"""
+    tiers = tiers or DEFAULT_TIERS
+    frames = []
+    hours = np.nan_to_num(results["project_hours"].to_numpy(dtype=float))
+    for plan, plan_tiers in tiers.utilization.items():
+        level, target, next_value, strict = next_tier(hours, plan_tiers)
+        current_bonus = compile_tiers(tuple(plan_tiers)).value_at(level, hours)
+        frames.append(_gaps(results, (results["plan_type"] == plan).to_numpy(), "utilization_bonus", "project_hours",
+                            hours, target, target - hours, strict, current_bonus, next_value))
+    return pd.concat(frames, ignore_index=True)
+
+
+def efficiency_gaps(results, tiers=None):
+    """Horas de proyecto adicionales para llegar al porcentaje mínimo de efficiency.
+
+    Cada hora de proyecto suma también al total del quarter: (p + x) / (t + x) >= mínimo.
+    """
+    tiers = tiers or DEFAULT_TIERS
+    plans = results["plan_type"]
+    project_hours = np.nan_to_num(results["project_hours"].to_numpy(dtype=float))
+    total_hours = np.nan_to_num(results["total_quarter_hours"].to_numpy(dtype=float))
+    minimum_pct = plans.map(tiers.efficiency_min_pct).to_numpy(dtype=float)
+    strict = plans.map(tiers.efficiency_strict).fillna(False).to_numpy(dtype=bool)
+    minimum = minimum_pct / 100
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(total_hours > 0, project_hours / total_hours * 100, np.nan)
+        # Sin horas registradas cualquier hora de proyecto da 100%: falta la mínima fracción registrable
+        needed = np.maximum(_ceil_cents((minimum * total_hours - project_hours) / (1 - minimum)), 0.01)
+    achieved = tier_reached(pct, minimum_pct, strict)
+    bonus = plans.map(tiers.efficiency_bonus).to_numpy(dtype=float)
+    return _gaps(results, ~np.isnan(bonus), "efficiency_bonus", "project_hours_percentage",
+                 np.nan_to_num(pct), np.where(achieved, np.nan, minimum_pct), needed,
+                 strict, np.where(achieved, bonus, 0.0), bonus)
+
+
+def timeline_counts(consultant_projects_master, quarter, year):
+    """Proyectos completados y entregados a tiempo por consultor (mismo filtro que timeline_metrics)"""
+    projects = consultant_projects_master[
+        (consultant_projects_master["quarter"] == quarter) & (consultant_projects_master["year"] == year)
+        & consultant_projects_master["actual_end_date"].notna()
+    ]
+    on_time = (projects["actual_end_date"] <= projects["planned_end_date"]).astype(int)
+    grouped = on_time.groupby(projects["consultant_id"])
+    return pd.DataFrame({"completed_projects": grouped.count(), "on_time_projects": grouped.sum()})
+
+
+def timeline_gaps(results, counts, tiers=None):
+    """Proyectos a tiempo adicionales para llegar a la adherencia mínima.
+
+    counts: DataFrame indexado por consultant_id con completed_projects y on_time_projects.
+    Cada proyecto nuevo entregado a tiempo suma también a los completados: (o + x) / (c + x) >= mínimo.
+    """
+    tiers = tiers or DEFAULT_TIERS
+    plans = results["plan_type"]
+    aligned = counts.reindex(results["consultant_id"]).fillna(0)
+    completed = aligned["completed_projects"].to_numpy(dtype=float)
+    on_time = aligned["on_time_projects"].to_numpy(dtype=float)
+    minimum_pct = plans.map(tiers.timeline_min_pct).to_numpy(dtype=float)
+    strict = plans.map(tiers.timeline_strict).fillna(False).to_numpy(dtype=bool)
+    bonus = plans.map(tiers.timeline_bonus).to_numpy(dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pct = np.where(completed > 0, on_time / completed * 100, 0.0)
+        minimum = minimum_pct / 100
+        exact = np.round((minimum * completed - on_time) / (1 - minimum), 9)
+        # Con umbral estricto llegar justo al mínimo no alcanza: un proyecto más
+        needed = np.maximum(np.where(strict, np.floor(exact) + 1, np.ceil(exact)), 1.0)
+    achieved = tier_reached(pct, minimum_pct, strict)
+    return _gaps(results, ~np.isnan(bonus), "timeline_bonus", "on_time_projects",
+                 on_time, np.where(achieved, np.nan, on_time + needed), needed,
+                 np.zeros(len(results), dtype=bool), np.where(achieved, bonus, 0.0), bonus)
+
+
+def company_gaps(results, tiers=None):
+    """Booking de compañía que falta para los bonos compartidos (igual para todos los consultores)"""
+    tiers = tiers or DEFAULT_TIERS
+    if results.empty:
+        return []
+    row = results.iloc[0]
+    booking = float(np.nan_to_num(row["company_booking_total"]))
+    gaps = []
+    level, target, next_value, strict = next_tier([booking], tiers.company_booking)
+    if not np.isnan(target[0]):
+        current_bonus = float(compile_tiers(tuple(tiers.company_booking)).value_at(level, [booking])[0])
+        gaps.append({
+            "component": "company_booking_bonus", "metric": "company_booking_total",
+            "current": booking, "target": float(target[0]), "needed": float(target[0] - booking),
+            "strict": bool(strict[0]), "current_bonus": current_bonus, "next_bonus": float(next_value[0]),
+            "bonus_delta": float(next_value[0]) - current_bonus,
+        })
+    # recurring_business_pct viene redondeado a 2 decimales: el booking recurrente es aproximado
+    recurring = float(np.nan_to_num(row["recurring_business_pct"])) / 100 * booking
+    if booking <= 0 or not tier_reached(recurring / booking, tiers.recurring_min_ratio, tiers.recurring_strict):
+        needed = (tiers.recurring_min_ratio * booking - recurring) / (1 - tiers.recurring_min_ratio)
+        needed = float(_ceil_cents(max(needed, 0.01)))
+        gaps.append({
+            "component": "recurring_business_bonus", "metric": "recurring_booking",
+            "current": recurring, "target": recurring + needed, "needed": needed,
+            "strict": bool(tiers.recurring_strict),
+            "current_bonus": 0.0, "next_bonus": tiers.recurring_bonus, "bonus_delta": tiers.recurring_bonus,
+        })
+    return gaps
+
+
+def next_tier_gaps(results, counts=None, tiers=None):
+    """Una fila por (consultor, componente) con lo que falta para el siguiente tier y el bono que suma.
+
+    results: filas de quarterly_bonus_results de un solo quarter. Sin counts no se evalúa timeline
+    (quarterly_bonus_results solo guarda el porcentaje, no la cantidad de proyectos).
+    """
+    if results.empty:
+        return pd.DataFrame(columns=GAP_COLUMNS)
+    frames = [commission_gaps(results, tiers), utilization_gaps(results, tiers), efficiency_gaps(results, tiers)]
+    if counts is not None:
+        frames.append(timeline_gaps(results, counts, tiers))
+    gaps = pd.concat([frame for frame in frames if not frame.empty], ignore_index=True)
+    if gaps.empty:
+        return pd.DataFrame(columns=GAP_COLUMNS)
+    gaps["needed"] = _ceil_cents(gaps["needed"])
+    return gaps.sort_values(["consultant_id", "bonus_delta"], ascending=[True, False], kind="stable") \
+        .reset_index(drop=True)[GAP_COLUMNS]
+
+
+def describe_gap(gap):
+    """Recomendación en texto para una fila de next_tier_gaps()"""
+    needed, target, delta = gap["needed"], gap["target"], gap["bonus_delta"]
+    reward = f"+${delta:,.2f} de bono"
+    component = gap["component"]
+    if component == "individual_commission":
+        return f"Te faltan ${needed:,.2f} de TCV para llegar a ${target:,.0f} y subir tu tasa de comisión: {reward}."
+    if component == "utilization_bonus":
+        more = "más de " if gap["strict"] else ""
+        return f"Suma {more}{needed:,.2f} horas de proyecto para pasar al siguiente tier de utilization ({more}{target:,.0f} horas): {reward}."
+    if component == "efficiency_bonus":
+        goal = "superar el" if gap["strict"] else "llegar al"
+        return f"Registra {needed:,.2f} horas más en proyectos para {goal} {target:.0f}% de efficiency: {reward}."
+    if component == "timeline_bonus":
+        return f"Entrega {needed:.0f} proyecto(s) más a tiempo para alcanzar la adherencia mínima de timeline: {reward}."
+    return f"Faltan {needed:,.2f} en {gap['metric']} para el siguiente tier de {component}: {reward}."
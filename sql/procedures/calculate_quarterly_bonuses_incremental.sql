@@ -0,0 +1,391 @@
+-- =====================================================
+-- RECÁLCULO INCREMENTAL DE BONOS (MERGE)
+-- =====================================================
+-- Recalcula solo a los consultores cuyas filas fuente cambiaron (updated_at) desde el último
+-- calculation_date del quarter, y las métricas de compañía solo si cambiaron deals o encuestas.
+-- Las syncs también borran filas (MERGE ... WHEN NOT MATCHED BY SOURCE) y un borrado no deja
+-- updated_at: TCV, horas, booking y NPS actuales se comparan con los guardados en
+-- quarterly_bonus_results, y una diferencia cuenta como cambio.
+-- Requiere sql/schema/03_add_change_tracking.sql y los tiers de 04_bonus_tier_config.sql.
+-- Sin resultados previos del quarter delega en calculate_quarterly_bonuses (cálculo completo).
+-- Al final refresca consultant_latest_bonus (sql/schema/06_consultant_latest_bonus.sql).
+
+CREATE OR REPLACE PROCEDURE `jrodriguez-sandbox.hackathon_bonus_update.calculate_quarterly_bonuses_incremental`(
+  IN target_quarter INT64,
+  IN target_year INT64
+)
+BEGIN
+  DECLARE last_calculation TIMESTAMP;
+  DECLARE run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP();
+  DECLARE deals_changed BOOL;
+  DECLARE satisfaction_changed BOOL;
+  DECLARE changed_ids ARRAY<STRING>;
+  DECLARE removed_ids ARRAY<STRING>;
+
+  SET last_calculation = (
+    SELECT MAX(calculation_date)
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`
+    WHERE quarter = target_quarter AND year = target_year
+  );
+
+  IF last_calculation IS NULL THEN
+    CALL `jrodriguez-sandbox.hackathon_bonus_update.calculate_quarterly_bonuses`(target_quarter, target_year);
+    RETURN;
+  END IF;
+
+  -- 1. DETECCIÓN DE CAMBIOS (solo lee consultant_id, quarter, year y updated_at)
+  SET deals_changed = EXISTS (
+    SELECT 1 FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+    WHERE quarter = target_quarter AND year = target_year AND updated_at > last_calculation
+  );
+  SET satisfaction_changed = EXISTS (
+    SELECT 1 FROM `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+    WHERE quarter = target_quarter AND year = target_year AND updated_at > last_calculation
+  );
+
+  -- Filas borradas: agregados actuales contra los guardados (la tolerancia absorbe el orden de las sumas)
+  CREATE OR REPLACE TEMP TABLE source_totals AS
+  WITH
+  tcv AS (
+    SELECT consultant_id, SUM(deal_amount) as tcv_total
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+    WHERE quarter = target_quarter AND year = target_year
+    GROUP BY consultant_id
+  ),
+  hours AS (
+    -- Mismo total_quarter_hours que project_utilization: solo si alguna fila une con el master
+    SELECT
+      cr.consultant_id,
+      IF(COUNT(pm.consultant_id) > 0, SUM(cr.logged_hours), NULL) as total_quarter_hours
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_report` cr
+    LEFT JOIN (
+      SELECT DISTINCT project_id, consultant_id
+      FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+    ) pm
+      ON cr.project_id = pm.project_id AND cr.consultant_id = pm.consultant_id
+    WHERE cr.quarter = target_quarter AND cr.year = target_year
+    GROUP BY cr.consultant_id
+  )
+  SELECT
+    r.consultant_id,
+    ABS(COALESCE(r.individual_tcv, 0) - COALESCE(tcv.tcv_total, 0)) > 0.005
+      OR (r.total_quarter_hours IS NOT NULL
+          AND ABS(r.total_quarter_hours - COALESCE(hours.total_quarter_hours, 0)) > 0.005) as removed,
+    r.company_booking_total,
+    r.customer_satisfaction_score
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results` r
+  LEFT JOIN tcv ON r.consultant_id = tcv.consultant_id
+  LEFT JOIN hours ON r.consultant_id = hours.consultant_id
+  WHERE r.quarter = target_quarter AND r.year = target_year;
+
+  SET removed_ids = ARRAY(SELECT consultant_id FROM source_totals WHERE removed);
+  SET deals_changed = deals_changed OR (
+    SELECT ABS(COALESCE(ANY_VALUE(s.company_booking_total), 0) - COALESCE((
+      SELECT SUM(deal_amount) FROM (
+        SELECT DISTINCT deal_id, deal_amount, is_recurring_business
+        FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+        WHERE quarter = target_quarter AND year = target_year
+      )
+    ), 0)) > 0.005
+    FROM source_totals s
+  );
+  SET satisfaction_changed = satisfaction_changed OR (
+    SELECT ABS(COALESCE(ANY_VALUE(s.customer_satisfaction_score), 0) - COALESCE((
+      SELECT AVG(satisfaction_stars)
+      FROM `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+      WHERE quarter = target_quarter AND year = target_year
+    ), 0)) > 0.005
+    FROM source_totals s
+  );
+
+  SET changed_ids = ARRAY(
+    SELECT DISTINCT consultant_id
+    FROM (
+      SELECT consultant_id FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+      WHERE quarter = target_quarter AND year = target_year AND updated_at > last_calculation
+      UNION ALL
+      SELECT consultant_id FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`
+      WHERE quarter = target_quarter AND year = target_year AND updated_at > last_calculation
+      UNION ALL
+      -- project_utilization une consultant_projects_master sin filtrar por quarter
+      SELECT consultant_id FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+      WHERE updated_at > last_calculation
+      UNION ALL
+      SELECT consultant_id FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`
+      WHERE updated_at > last_calculation
+      UNION ALL
+      -- Deals o semanas borrados por las syncs
+      SELECT consultant_id FROM UNNEST(removed_ids) consultant_id
+    )
+    WHERE consultant_id IS NOT NULL
+  );
+
+  IF ARRAY_LENGTH(changed_ids) = 0 AND NOT deals_changed AND NOT satisfaction_changed THEN
+    RETURN;  -- Nada que recalcular: calculation_date no avanza y los caches siguen válidos
+  END IF;
+
+  -- 2. COMPANY PERFORMANCE: se recalcula solo si cambiaron deals o encuestas
+  IF deals_changed OR satisfaction_changed THEN
+    CREATE OR REPLACE TEMP TABLE company_metrics AS
+    WITH
+    totals AS (
+      SELECT
+        SUM(deal_amount) as company_booking_total,
+        SAFE_DIVIDE(SUM(IF(is_recurring_business, deal_amount, 0)), SUM(deal_amount)) as recurring_ratio,
+        (SELECT AVG(satisfaction_stars)
+         FROM `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+         WHERE quarter = target_quarter AND year = target_year) as company_nps
+      FROM (
+        SELECT DISTINCT deal_id, deal_amount, is_recurring_business
+        FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+        WHERE quarter = target_quarter AND year = target_year
+      ) unique_deals
+    ),
+    company_bonus AS (
+      SELECT
+        COALESCE(SUM(IF(t.component = 'company_booking_bonus', t.payout + t.rate * c.metric, NULL)), 0) as company_booking_bonus,
+        COALESCE(SUM(IF(t.component = 'recurring_business_bonus', t.payout + t.rate * c.metric, NULL)), 0) as recurring_business_bonus
+      FROM totals
+      CROSS JOIN UNNEST([
+        STRUCT('company_booking_bonus' as component, totals.company_booking_total as metric),
+        ('recurring_business_bonus', totals.recurring_ratio)
+      ]) c
+      LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_ranges` t
+        ON t.plan_type IS NULL AND t.component = c.component
+        AND `jrodriguez-sandbox.hackathon_bonus_update.in_tier`(
+          c.metric, t.lower_bound, t.lower_inclusive, t.upper_bound, t.upper_inclusive)
+    )
+    SELECT
+      totals.company_booking_total,
+      ROUND(SAFE_DIVIDE(totals.company_booking_total, 600000.00) * 100, 2) as company_target_achievement_pct,
+      cb.company_booking_bonus,
+      ROUND(totals.recurring_ratio * 100, 2) as recurring_business_pct,
+      cb.recurring_business_bonus,
+      totals.company_nps
+    FROM totals CROSS JOIN company_bonus cb;
+  ELSE
+    -- Sin cambios de compañía: se reutilizan los valores ya calculados del quarter
+    CREATE OR REPLACE TEMP TABLE company_metrics AS
+    SELECT
+      ANY_VALUE(company_booking_total) as company_booking_total,
+      ANY_VALUE(company_target_achievement_pct) as company_target_achievement_pct,
+      ANY_VALUE(company_booking_bonus) as company_booking_bonus,
+      ANY_VALUE(recurring_business_pct) as recurring_business_pct,
+      ANY_VALUE(recurring_business_bonus) as recurring_business_bonus,
+      ANY_VALUE(customer_satisfaction_score) as company_nps
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`
+    WHERE quarter = target_quarter AND year = target_year;
+  END IF;
+
+  -- 3. MÉTRICAS INDIVIDUALES de los consultores con cambios (mismas reglas que calculate_quarterly_bonuses)
+  CREATE OR REPLACE TEMP TABLE consultant_metrics AS
+  WITH
+  individual_tcv AS (
+    SELECT
+      consultant_id,
+      SUM(deal_amount) as tcv_total
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+    WHERE quarter = target_quarter AND year = target_year
+      AND consultant_id IN UNNEST(changed_ids)
+    GROUP BY consultant_id
+  ),
+
+  -- Llaves del join de horas: todas las particiones, pero solo dos columnas y los consultores con cambios
+  project_keys AS (
+    SELECT
+      project_id,
+      consultant_id,
+      COUNT(*) as master_rows
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+    WHERE consultant_id IN UNNEST(changed_ids)
+    GROUP BY project_id, consultant_id
+  ),
+
+  project_utilization AS (
+    SELECT
+      cr.consultant_id,
+      SUM(cr.logged_hours * pm.master_rows) as project_hours,
+      IF(COUNT(pm.master_rows) > 0, SUM(cr.logged_hours), NULL) as total_quarter_hours
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_report` cr
+    LEFT JOIN project_keys pm
+      ON cr.project_id = pm.project_id AND cr.consultant_id = pm.consultant_id
+    WHERE cr.quarter = target_quarter AND cr.year = target_year
+      AND cr.consultant_id IN UNNEST(changed_ids)
+    GROUP BY cr.consultant_id
+  ),
+
+  timeline_metrics AS (
+    SELECT
+      consultant_id,
+      SAFE_DIVIDE(COUNTIF(actual_end_date <= planned_end_date), COUNTIF(actual_end_date IS NOT NULL)) * 100
+        as timeline_adherence_pct
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+    WHERE quarter = target_quarter AND year = target_year
+      AND consultant_id IN UNNEST(changed_ids)
+    GROUP BY consultant_id
+  )
+
+  SELECT
+    ec.consultant_id,
+    ec.consultant_name,
+    ec.plan_type,
+    ec.plan_type IN ('Hybrid', 'Delivery') as hours_plan,
+    COALESCE(itcv.tcv_total, 0) as individual_tcv,
+    COALESCE(pu.project_hours, 0) as project_hours,
+    COALESCE(pu.total_quarter_hours, 0) as total_quarter_hours,
+    SAFE_DIVIDE(COALESCE(pu.project_hours, 0), COALESCE(pu.total_quarter_hours, 0)) * 100 as project_hours_pct,
+    COALESCE(tm.timeline_adherence_pct, 0) as timeline_adherence_pct
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_master` ec
+  LEFT JOIN individual_tcv itcv ON ec.consultant_id = itcv.consultant_id
+  LEFT JOIN project_utilization pu ON ec.consultant_id = pu.consultant_id
+  LEFT JOIN timeline_metrics tm ON ec.consultant_id = tm.consultant_id
+  WHERE ec.eligible_for_comp = TRUE AND ec.active = TRUE
+    AND ec.consultant_id IN UNNEST(changed_ids);
+
+  BEGIN TRANSACTION;
+
+  -- 4. MERGE: filas recalculadas de los consultores con cambios y, si cambió la compañía,
+  --    columnas de compañía actualizadas para el resto
+  MERGE `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results` T
+  USING (
+    WITH
+    consultant_bonus AS (
+      SELECT
+        m.consultant_id,
+        COALESCE(SUM(IF(c.component = 'individual_commission', t.payout + t.rate * c.metric, NULL)), 0) as individual_commission,
+        COALESCE(SUM(IF(c.component = 'utilization_bonus', t.payout + t.rate * c.metric, NULL)), 0) as utilization_bonus,
+        COALESCE(SUM(IF(c.component = 'efficiency_bonus', t.payout + t.rate * c.metric, NULL)), 0) as efficiency_bonus,
+        COALESCE(SUM(IF(c.component = 'timeline_bonus', t.payout + t.rate * c.metric, NULL)), 0) as timeline_bonus,
+        COALESCE(SUM(IF(c.component = 'customer_satisfaction_bonus', t.payout + t.rate * c.metric, NULL)), 0) as customer_satisfaction_bonus,
+        SUM(IF(c.component = 'mbo_bonus', t.payout + t.rate * c.metric, NULL)) as mbo_bonus
+      FROM consultant_metrics m
+      CROSS JOIN company_metrics cm
+      CROSS JOIN UNNEST([
+        STRUCT('individual_commission' as component, m.individual_tcv as metric),
+        ('utilization_bonus', m.project_hours),
+        ('efficiency_bonus', m.project_hours_pct),
+        ('timeline_bonus', m.timeline_adherence_pct),
+        ('customer_satisfaction_bonus', cm.company_nps),
+        ('mbo_bonus', 1.0)
+      ]) c
+      LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_ranges` t
+        ON t.plan_type = m.plan_type AND t.component = c.component
+        AND `jrodriguez-sandbox.hackathon_bonus_update.in_tier`(
+          c.metric, t.lower_bound, t.lower_inclusive, t.upper_bound, t.upper_inclusive)
+      GROUP BY m.consultant_id
+    ),
+
+    recalculated AS (
+      SELECT
+        m.consultant_id,
+        m.consultant_name,
+        m.plan_type,
+        target_quarter as quarter,
+        target_year as year,
+        cm.company_booking_total,
+        cm.company_target_achievement_pct,
+        cm.company_booking_bonus,
+        cm.recurring_business_pct,
+        cm.recurring_business_bonus,
+        m.individual_tcv,
+        b.individual_commission,
+        IF(m.hours_plan, m.project_hours, NULL) as project_hours,
+        IF(m.hours_plan, m.total_quarter_hours, NULL) as total_quarter_hours,
+        IF(m.hours_plan, ROUND(m.project_hours_pct, 2), NULL) as project_hours_percentage,
+        b.utilization_bonus,
+        b.efficiency_bonus,
+        IF(m.hours_plan, m.timeline_adherence_pct, NULL) as timeline_adherence_percentage,
+        b.timeline_bonus,
+        COALESCE(cm.company_nps, 0) as customer_satisfaction_score,
+        b.customer_satisfaction_bonus,
+        TRUE as mbo_completed,
+        b.mbo_bonus,
+        cm.company_booking_bonus + cm.recurring_business_bonus + b.individual_commission +
+        b.utilization_bonus + b.efficiency_bonus + b.timeline_bonus +
+        b.customer_satisfaction_bonus + b.mbo_bonus as total_bonus,
+        run_at as calculation_date
+      FROM consultant_metrics m
+      JOIN consultant_bonus b ON m.consultant_id = b.consultant_id
+      CROSS JOIN company_metrics cm
+    ),
+
+    -- Consultores sin cambios propios: solo se reemplazan las columnas de compañía
+    satisfaction_refresh AS (
+      SELECT
+        r.consultant_id,
+        COALESCE(SUM(t.payout + t.rate * cm.company_nps), 0) as customer_satisfaction_bonus
+      FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results` r
+      CROSS JOIN company_metrics cm
+      LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_ranges` t
+        ON t.plan_type = r.plan_type AND t.component = 'customer_satisfaction_bonus'
+        AND `jrodriguez-sandbox.hackathon_bonus_update.in_tier`(
+          cm.company_nps, t.lower_bound, t.lower_inclusive, t.upper_bound, t.upper_inclusive)
+      WHERE (deals_changed OR satisfaction_changed)
+        AND r.quarter = target_quarter AND r.year = target_year
+        AND r.consultant_id NOT IN UNNEST(changed_ids)
+      GROUP BY r.consultant_id
+    ),
+
+    company_refresh AS (
+      SELECT
+        r.* REPLACE (
+          cm.company_booking_total as company_booking_total,
+          cm.company_target_achievement_pct as company_target_achievement_pct,
+          cm.company_booking_bonus as company_booking_bonus,
+          cm.recurring_business_pct as recurring_business_pct,
+          cm.recurring_business_bonus as recurring_business_bonus,
+          COALESCE(cm.company_nps, 0) as customer_satisfaction_score,
+          s.customer_satisfaction_bonus as customer_satisfaction_bonus,
+          cm.company_booking_bonus + cm.recurring_business_bonus + r.individual_commission +
+          r.utilization_bonus + r.efficiency_bonus + r.timeline_bonus +
+          s.customer_satisfaction_bonus + r.mbo_bonus as total_bonus,
+          run_at as calculation_date
+        )
+      FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results` r
+      JOIN satisfaction_refresh s ON r.consultant_id = s.consultant_id
+      CROSS JOIN company_metrics cm
+      WHERE r.quarter = target_quarter AND r.year = target_year
+    )
+
+    SELECT * FROM recalculated
+    UNION ALL
+    SELECT * FROM company_refresh
+  ) S
+  ON T.consultant_id = S.consultant_id AND T.quarter = S.quarter AND T.year = S.year
+  WHEN MATCHED THEN UPDATE SET
+    consultant_name = S.consultant_name,
+    plan_type = S.plan_type,
+    company_booking_total = S.company_booking_total,
+    company_target_achievement_pct = S.company_target_achievement_pct,
+    company_booking_bonus = S.company_booking_bonus,
+    recurring_business_pct = S.recurring_business_pct,
+    recurring_business_bonus = S.recurring_business_bonus,
+    individual_tcv = S.individual_tcv,
+    individual_commission = S.individual_commission,
+    project_hours = S.project_hours,
+    total_quarter_hours = S.total_quarter_hours,
+    project_hours_percentage = S.project_hours_percentage,
+    utilization_bonus = S.utilization_bonus,
+    efficiency_bonus = S.efficiency_bonus,
+    timeline_adherence_percentage = S.timeline_adherence_percentage,
+    timeline_bonus = S.timeline_bonus,
+    customer_satisfaction_score = S.customer_satisfaction_score,
+    customer_satisfaction_bonus = S.customer_satisfaction_bonus,
+    mbo_completed = S.mbo_completed,
+    mbo_bonus = S.mbo_bonus,
+    total_bonus = S.total_bonus,
+    calculation_date = S.calculation_date
+  WHEN NOT MATCHED BY TARGET THEN
+    INSERT ROW
+  -- Consultores con cambios que dejaron de ser elegibles o activos
+  WHEN NOT MATCHED BY SOURCE
+    AND T.quarter = target_quarter AND T.year = target_year
+    AND T.consultant_id IN UNNEST(changed_ids) THEN
+    DELETE;
+
+  -- 5. Último resultado por consultor, en la misma transacción que el MERGE
+  CALL `jrodriguez-sandbox.hackathon_bonus_update.refresh_consultant_latest_bonus`();
+
+  COMMIT TRANSACTION;
+
+END;
@@ -0,0 +1,260 @@
+-- =====================================================
+-- CÁLCULO DE BONOS POR RANGO DE QUARTERS (BACKFILL)
+-- =====================================================
+-- Mismas reglas que calculate_quarterly_bonuses, pero todos los quarters del rango en una sola
+-- pasada agrupada por (year, quarter): cada tabla fuente se lee una vez para todo el rango.
+-- Los resultados se arman en una tabla temporal y se reemplazan en una transacción: quien lea
+-- quarterly_bonus_results ve el rango anterior completo o el nuevo completo, nunca una mezcla.
+-- Tiers en bonus_tier_config (sql/schema/04_bonus_tier_config.sql), unidos por rango.
+-- También refresca consultant_latest_bonus (refresh_consultant_latest_bonus.sql).
+
+CREATE OR REPLACE PROCEDURE `jrodriguez-sandbox.hackathon_bonus_update.calculate_quarterly_bonuses_range`(
+  IN start_quarter INT64,
+  IN start_year INT64,
+  IN end_quarter INT64,
+  IN end_year INT64
+)
+BEGIN
+  DECLARE run_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP();
+  -- Periodo comparable como entero: 2025 Q2 -> 20252
+  DECLARE start_period INT64 DEFAULT start_year * 10 + start_quarter;
+  DECLARE end_period INT64 DEFAULT end_year * 10 + end_quarter;
+
+  IF start_quarter NOT BETWEEN 1 AND 4 OR end_quarter NOT BETWEEN 1 AND 4 THEN
+    RAISE USING MESSAGE = FORMAT('Quarter inválido: %d..%d', start_quarter, end_quarter);
+  END IF;
+  IF start_period > end_period THEN
+    RAISE USING MESSAGE = FORMAT('Rango vacío: Q%d %d > Q%d %d', start_quarter, start_year, end_quarter, end_year);
+  END IF;
+
+  -- 0. QUARTERS DEL RANGO (también los que no tienen datos, como una llamada por quarter)
+  CREATE OR REPLACE TEMP TABLE periods AS
+  SELECT year, quarter
+  FROM UNNEST(GENERATE_ARRAY(start_year, end_year)) as year, UNNEST([1, 2, 3, 4]) as quarter
+  WHERE year * 10 + quarter BETWEEN start_period AND end_period;
+
+  -- 1. DEALS DEL RANGO: un registro por deal único y quarter con una entrada por fila de consultor
+  --    (year BETWEEN poda particiones; el periodo recorta el primer y el último año)
+  CREATE OR REPLACE TEMP TABLE quarter_deals AS
+  SELECT
+    year,
+    quarter,
+    deal_id,
+    deal_amount,
+    is_recurring_business,
+    ARRAY_AGG(consultant_id IGNORE NULLS) as consultant_ids
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+  WHERE year BETWEEN start_year AND end_year
+    AND year * 10 + quarter BETWEEN start_period AND end_period
+  GROUP BY year, quarter, deal_id, deal_amount, is_recurring_business;
+
+  -- 2. PROYECTOS: el join de horas no filtra el maestro por quarter (filas duplicadas multiplican
+  --    horas); las llaves no dependen del quarter, así que se leen una sola vez para todo el rango
+  CREATE OR REPLACE TEMP TABLE project_keys AS
+  SELECT
+    project_id,
+    consultant_id,
+    COUNT(*) as master_rows
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+  GROUP BY project_id, consultant_id;
+
+  --    Timeline por quarter: solo las particiones del rango
+  CREATE OR REPLACE TEMP TABLE project_timeline AS
+  SELECT
+    year,
+    quarter,
+    consultant_id,
+    COUNTIF(actual_end_date IS NOT NULL) as completed_projects,
+    COUNTIF(actual_end_date <= planned_end_date) as on_time_projects
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+  WHERE year BETWEEN start_year AND end_year
+    AND year * 10 + quarter BETWEEN start_period AND end_period
+  GROUP BY year, quarter, consultant_id;
+
+  -- 3. COMPANY PERFORMANCE + NPS GLOBAL por quarter
+  CREATE OR REPLACE TEMP TABLE company_metrics AS
+  SELECT
+    p.year,
+    p.quarter,
+    d.company_booking_total,
+    d.recurring_ratio,
+    s.company_nps
+  FROM periods p
+  LEFT JOIN (
+    SELECT
+      year,
+      quarter,
+      SUM(deal_amount) as company_booking_total,
+      SAFE_DIVIDE(SUM(IF(is_recurring_business, deal_amount, 0)), SUM(deal_amount)) as recurring_ratio
+    FROM quarter_deals
+    GROUP BY year, quarter
+  ) d USING (year, quarter)
+  LEFT JOIN (
+    SELECT year, quarter, AVG(satisfaction_stars) as company_nps
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+    WHERE year BETWEEN start_year AND end_year
+      AND year * 10 + quarter BETWEEN start_period AND end_period
+    GROUP BY year, quarter
+  ) s USING (year, quarter);
+
+  -- 4. MÉTRICAS INDIVIDUALES: una fila por consultor elegible y quarter
+  CREATE OR REPLACE TEMP TABLE consultant_metrics AS
+  WITH
+  individual_tcv AS (
+    SELECT
+      d.year,
+      d.quarter,
+      consultant_id,
+      SUM(d.deal_amount) as tcv_total
+    FROM quarter_deals d, UNNEST(d.consultant_ids) as consultant_id
+    GROUP BY d.year, d.quarter, consultant_id
+  ),
+
+  project_utilization AS (
+    SELECT
+      cr.year,
+      cr.quarter,
+      cr.consultant_id,
+      SUM(cr.logged_hours * pm.master_rows) as project_hours,
+      IF(COUNT(pm.master_rows) > 0, SUM(cr.logged_hours), NULL) as total_quarter_hours
+    FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_report` cr
+    LEFT JOIN project_keys pm
+      ON cr.project_id = pm.project_id AND cr.consultant_id = pm.consultant_id
+    WHERE cr.year BETWEEN start_year AND end_year
+      AND cr.year * 10 + cr.quarter BETWEEN start_period AND end_period
+    GROUP BY cr.year, cr.quarter, cr.consultant_id
+  )
+
+  SELECT
+    p.year,
+    p.quarter,
+    ec.consultant_id,
+    ec.consultant_name,
+    ec.plan_type,
+    ec.plan_type IN ('Hybrid', 'Delivery') as hours_plan,
+    COALESCE(itcv.tcv_total, 0) as individual_tcv,
+    COALESCE(pu.project_hours, 0) as project_hours,
+    COALESCE(pu.total_quarter_hours, 0) as total_quarter_hours,
+    SAFE_DIVIDE(COALESCE(pu.project_hours, 0), COALESCE(pu.total_quarter_hours, 0)) * 100 as project_hours_pct,
+    COALESCE(SAFE_DIVIDE(pt.on_time_projects, pt.completed_projects) * 100, 0) as timeline_adherence_pct
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_master` ec
+  CROSS JOIN periods p
+  LEFT JOIN individual_tcv itcv
+    ON ec.consultant_id = itcv.consultant_id AND p.year = itcv.year AND p.quarter = itcv.quarter
+  LEFT JOIN project_utilization pu
+    ON ec.consultant_id = pu.consultant_id AND p.year = pu.year AND p.quarter = pu.quarter
+  LEFT JOIN project_timeline pt
+    ON ec.consultant_id = pt.consultant_id AND p.year = pt.year AND p.quarter = pt.quarter
+  WHERE ec.eligible_for_comp = TRUE AND ec.active = TRUE;
+
+  -- 5. RESULTADOS DEL RANGO (mismo orden de columnas que quarterly_bonus_results)
+  CREATE OR REPLACE TEMP TABLE range_results AS
+  WITH
+  company_bonus AS (
+    SELECT
+      cm.year,
+      cm.quarter,
+      COALESCE(SUM(IF(t.component = 'company_booking_bonus', t.payout + t.rate * c.metric, NULL)), 0) as company_booking_bonus,
+      COALESCE(SUM(IF(t.component = 'recurring_business_bonus', t.payout + t.rate * c.metric, NULL)), 0) as recurring_business_bonus
+    FROM company_metrics cm
+    CROSS JOIN UNNEST([
+      STRUCT('company_booking_bonus' as component, cm.company_booking_total as metric),
+      ('recurring_business_bonus', cm.recurring_ratio)
+    ]) c
+    LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_ranges` t
+      ON t.plan_type IS NULL AND t.component = c.component
+      AND `jrodriguez-sandbox.hackathon_bonus_update.in_tier`(
+        c.metric, t.lower_bound, t.lower_inclusive, t.upper_bound, t.upper_inclusive)
+    GROUP BY cm.year, cm.quarter
+  ),
+
+  consultant_bonus AS (
+    SELECT
+      m.year,
+      m.quarter,
+      m.consultant_id,
+      COALESCE(SUM(IF(c.component = 'individual_commission', t.payout + t.rate * c.metric, NULL)), 0) as individual_commission,
+      COALESCE(SUM(IF(c.component = 'utilization_bonus', t.payout + t.rate * c.metric, NULL)), 0) as utilization_bonus,
+      COALESCE(SUM(IF(c.component = 'efficiency_bonus', t.payout + t.rate * c.metric, NULL)), 0) as efficiency_bonus,
+      COALESCE(SUM(IF(c.component = 'timeline_bonus', t.payout + t.rate * c.metric, NULL)), 0) as timeline_bonus,
+      COALESCE(SUM(IF(c.component = 'customer_satisfaction_bonus', t.payout + t.rate * c.metric, NULL)), 0) as customer_satisfaction_bonus,
+      SUM(IF(c.component = 'mbo_bonus', t.payout + t.rate * c.metric, NULL)) as mbo_bonus
+    FROM consultant_metrics m
+    JOIN company_metrics cm ON m.year = cm.year AND m.quarter = cm.quarter
+    CROSS JOIN UNNEST([
+      STRUCT('individual_commission' as component, m.individual_tcv as metric),
+      ('utilization_bonus', m.project_hours),
+      ('efficiency_bonus', m.project_hours_pct),
+      ('timeline_bonus', m.timeline_adherence_pct),
+      ('customer_satisfaction_bonus', cm.company_nps),
+      ('mbo_bonus', 1.0)  -- MBOs: para POC = TRUE siempre
+    ]) c
+    LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_ranges` t
+      ON t.plan_type = m.plan_type AND t.component = c.component
+      AND `jrodriguez-sandbox.hackathon_bonus_update.in_tier`(
+        c.metric, t.lower_bound, t.lower_inclusive, t.upper_bound, t.upper_inclusive)
+    GROUP BY m.year, m.quarter, m.consultant_id
+  )
+
+  SELECT
+    m.consultant_id,
+    m.consultant_name,
+    m.plan_type,
+    m.quarter,
+    m.year,
+
+    cm.company_booking_total,
+    ROUND(SAFE_DIVIDE(cm.company_booking_total, 600000.00) * 100, 2) as company_target_achievement_pct,
+    cb.company_booking_bonus,
+    ROUND(cm.recurring_ratio * 100, 2) as recurring_business_pct,
+    cb.recurring_business_bonus,
+
+    m.individual_tcv,
+    b.individual_commission,
+    IF(m.hours_plan, m.project_hours, NULL) as project_hours,
+    IF(m.hours_plan, m.total_quarter_hours, NULL) as total_quarter_hours,
+    IF(m.hours_plan, ROUND(m.project_hours_pct, 2), NULL) as project_hours_percentage,
+    b.utilization_bonus,
+    b.efficiency_bonus,
+    IF(m.hours_plan, m.timeline_adherence_pct, NULL) as timeline_adherence_percentage,
+    b.timeline_bonus,
+
+    COALESCE(cm.company_nps, 0) as customer_satisfaction_score,
+    b.customer_satisfaction_bonus,
+    TRUE as mbo_completed,
+    b.mbo_bonus,
+
+    cb.company_booking_bonus + cb.recurring_business_bonus + b.individual_commission +
+    b.utilization_bonus + b.efficiency_bonus + b.timeline_bonus +
+    b.customer_satisfaction_bonus + b.mbo_bonus as total_bonus,
+
+    run_at as calculation_date
+
+  FROM consultant_metrics m
+  JOIN consultant_bonus b
+    ON m.consultant_id = b.consultant_id AND m.year = b.year AND m.quarter = b.quarter
+  JOIN company_metrics cm ON m.year = cm.year AND m.quarter = cm.quarter
+  JOIN company_bonus cb ON m.year = cb.year AND m.quarter = cb.quarter;
+
+  -- 6. SWAP ATÓMICO del rango
+  BEGIN
+    BEGIN TRANSACTION;
+
+    DELETE FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`
+    WHERE year BETWEEN start_year AND end_year
+      AND year * 10 + quarter BETWEEN start_period AND end_period;
+
+    INSERT INTO `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`
+    SELECT * FROM range_results
+    ORDER BY year, quarter, plan_type, consultant_name;
+
+    -- Último resultado por consultor, en la misma transacción
+    CALL `jrodriguez-sandbox.hackathon_bonus_update.refresh_consultant_latest_bonus`();
+
+    COMMIT TRANSACTION;
+  EXCEPTION WHEN ERROR THEN
+    ROLLBACK TRANSACTION;
+    RAISE USING MESSAGE = @@error.message;
+  END;
+
+END;
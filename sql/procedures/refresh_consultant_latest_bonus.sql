@@ -0,0 +1,17 @@
+-- =====================================================
+-- REFRESH DE consultant_latest_bonus
+-- =====================================================
+-- Reconstruye el último resultado de cada consultor (sql/schema/06_consultant_latest_bonus.sql).
+-- Solo DML: se puede llamar dentro de la transacción que reemplaza los resultados, así la tabla
+-- nunca queda desfasada de quarterly_bonus_results. Lee year, quarter y consultant_id de toda la
+-- historia una vez por cálculo, no una vez por lookup.
+
+CREATE OR REPLACE PROCEDURE `jrodriguez-sandbox.hackathon_bonus_update.refresh_consultant_latest_bonus`()
+BEGIN
+  DELETE FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_latest_bonus` WHERE TRUE;
+
+  INSERT INTO `jrodriguez-sandbox.hackathon_bonus_update.consultant_latest_bonus`
+  SELECT *
+  FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`
+  QUALIFY ROW_NUMBER() OVER (PARTITION BY consultant_id ORDER BY year DESC, quarter DESC) = 1;
+END;
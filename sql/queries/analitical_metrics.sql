@@ -33,6 +33,8 @@ SELECT
   SUM(cr.logged_hours) as hours_logged,
   LEAST(SUM(cr.logged_hours), p.assigned_sow_hours) as effective_hours
 FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master` p
+-- Horas de toda la vida del proyecto contra el SOW: consultant_report se lee en todas sus
+-- particiones a propósito (el clustering por consultant_id/project_id acota los bloques)
 LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.consultant_report` cr 
   ON p.project_id = cr.project_id AND p.consultant_id = cr.consultant_id
 WHERE p.quarter = 2 AND p.year = 2025
@@ -192,6 +194,8 @@ SELECT
   END as sow_status
 FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master` p
 JOIN `jrodriguez-sandbox.hackathon_bonus_update.consultant_master` cm ON p.consultant_id = cm.consultant_id
+-- Horas de toda la vida del proyecto contra el SOW: consultant_report se lee en todas sus
+-- particiones a propósito (el clustering por consultant_id/project_id acota los bloques)
 LEFT JOIN `jrodriguez-sandbox.hackathon_bonus_update.consultant_report` cr 
   ON p.project_id = cr.project_id AND p.consultant_id = cr.consultant_id
 WHERE p.quarter = 2 AND p.year = 2025
@@ -262,7 +266,7 @@ LEFT JOIN (
 WHERE cm.eligible_for_comp = TRUE AND cm.active = TRUE
 ORDER BY cm.plan_type, tcv_individual DESC, hours.total_hours DESC;
 
--- 8. VALIDACIÓN DE DATOS POR TABLA
+-- 8. VALIDACIÓN DE DATOS POR TABLA (COUNT(*) sin filtro sale de metadata, no factura bytes)
 SELECT 'deals_report' as table_name, COUNT(*) as total_rows FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
 UNION ALL
 SELECT 'consultant_master' as table_name, COUNT(*) as total_rows FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`
@@ -1,3 +1,12 @@
+-- =====================================================
+-- ESQUEMA DE TABLAS
+-- =====================================================
+-- Tablas con quarter/year: una partición por año (integer range sobre year) y clustering con
+-- quarter primero, así los filtros quarter = ... AND year = ... leen solo los bloques del quarter
+-- y el costo por consulta no crece con los años de historia.
+-- quarterly_bonus_results agrupa primero por consultant_id: el lookup por consultor es el camino caliente.
+-- Para migrar un dataset existente: 05_partition_and_cluster.sql.
+
 -- 1. TABLA CONSULTANT MASTER
 CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master` (
   consultant_id STRING,
@@ -5,7 +14,8 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_ma
   plan_type STRING,                -- 'Sales', 'Hybrid', 'Delivery'
   eligible_for_comp BOOLEAN,
   active BOOLEAN
-);
+)
+CLUSTER BY consultant_id;
 
 -- 2. TABLA DEALS REPORT (HUBSPOT DATA)
 CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report` (
@@ -21,7 +31,9 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
   client_name STRING,
   channel STRING,                  -- 'Google', etc.
   deal_type STRING                 -- 'PS', 'Cloud Consumption'
-);
+)
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, consultant_id, deal_id;
 
 -- 3. TABLA CONSULTANT PROJECTS MASTER
 CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master` (
@@ -38,7 +50,9 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_pr
   deal_id STRING,                  -- Link al deal
   quarter INTEGER,
   year INTEGER
-);
+)
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, consultant_id, project_id;
 
 
 -- 4. TABLA CONSULTANT REPORT (CLICKUP DATA - SEMANAL)
@@ -52,7 +66,9 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_re
   quarter INTEGER,
   year INTEGER,
   week_number INTEGER              -- Semana del año (1-52)
-);
+)
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, consultant_id, project_id;
 
 -- 5. TABLA TIME MASTER
 CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.time_master` (
@@ -64,7 +80,9 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.time_master`
   company_booking_target FLOAT64, -- $600,000
   recurring_target_pct FLOAT64,   -- 0.20 (20%)
   active BOOLEAN
-);
+)
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter;
 
 -- 6. TABLA CUSTOMER SATISFACTION (SIMPLIFICADA)
 CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction` (
@@ -76,7 +94,9 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_sati
   survey_date DATE,
   quarter INTEGER,
   year INTEGER
-);
+)
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, project_id;
 
 -- =====================================================
 -- TABLA UNIFICADA DE RESULTADOS DE BONOS
@@ -122,4 +142,6 @@ CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bon
   -- Total
   total_bonus FLOAT64,
   calculation_date TIMESTAMP
-);
+)
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY consultant_id, quarter;
@@ -0,0 +1,42 @@
+-- =====================================================
+-- CHANGE TRACKING PARA EL RECÁLCULO INCREMENTAL
+-- =====================================================
+-- updated_at marca cuándo se insertó o modificó cada fila de las tablas fuente.
+-- calculate_quarterly_bonuses_incremental compara contra el último calculation_date
+-- del quarter para recalcular solo a los consultores afectados.
+-- Las cargas (ClickUp, HubSpot, Google Forms) escriben updated_at explícitamente;
+-- el DEFAULT cubre los INSERT manuales. Los UPDATE manuales deben setearlo también.
+
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP;
+
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+
+-- Filas existentes: se marcan como modificadas, así el primer incremental equivale a un recálculo completo
+UPDATE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`
+SET updated_at = CURRENT_TIMESTAMP() WHERE updated_at IS NULL;
+UPDATE `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+SET updated_at = CURRENT_TIMESTAMP() WHERE updated_at IS NULL;
+UPDATE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+SET updated_at = CURRENT_TIMESTAMP() WHERE updated_at IS NULL;
+UPDATE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`
+SET updated_at = CURRENT_TIMESTAMP() WHERE updated_at IS NULL;
+UPDATE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+SET updated_at = CURRENT_TIMESTAMP() WHERE updated_at IS NULL;
@@ -0,0 +1,74 @@
+-- =====================================================
+-- CONFIGURACIÓN DE TIERS DE BONOS
+-- =====================================================
+-- calculate_quarterly_bonuses une cada métrica con su tier por rango: un cambio de tiers
+-- es un INSERT/UPDATE en esta tabla, sin redeploy del procedimiento.
+--   monto = payout + rate * métrica, del tier con el mayor lower_bound alcanzado
+--   lower_inclusive = FALSE exige métrica > lower_bound (p.ej. > 225 horas)
+--   plan_type NULL = componente de compañía (igual para todos los planes)
+
+CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_config` (
+  plan_type STRING,                -- 'Sales', 'Hybrid', 'Delivery' o NULL (compañía)
+  component STRING,                -- Columna de quarterly_bonus_results que paga el tier
+  lower_bound FLOAT64,             -- Umbral de la métrica del componente
+  lower_inclusive BOOLEAN,         -- TRUE: >= lower_bound; FALSE: > lower_bound
+  payout FLOAT64,                  -- Monto fijo del tier
+  rate FLOAT64                     -- Tasa sobre la métrica (comisión)
+);
+
+INSERT INTO `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_config` VALUES
+-- Company booking (métrica: booking total del quarter, meta $600,000)
+(NULL, 'company_booking_bonus', 300000.00, TRUE, 250.0, 0.0),
+(NULL, 'company_booking_bonus', 450000.00, TRUE, 375.0, 0.0),
+(NULL, 'company_booking_bonus', 600000.00, TRUE, 500.0, 0.0),
+(NULL, 'company_booking_bonus', 750000.00, TRUE, 625.0, 0.0),
+(NULL, 'company_booking_bonus', 900000.00, TRUE, 750.0, 0.0),
+-- Recurring business (métrica: booking recurrente / booking total)
+(NULL, 'recurring_business_bonus', 0.20, TRUE, 250.0, 0.0),
+-- Comisión individual (métrica: TCV individual)
+('Sales', 'individual_commission', 50000.00, TRUE, 0.0, 0.01),
+('Sales', 'individual_commission', 500000.00, TRUE, 0.0, 0.015),
+('Sales', 'individual_commission', 1000000.00, TRUE, 0.0, 0.02),
+-- Utilization (métrica: horas de proyecto)
+('Hybrid', 'utilization_bonus', 100.0, TRUE, 150.0, 0.0),
+('Hybrid', 'utilization_bonus', 175.0, TRUE, 300.0, 0.0),
+('Hybrid', 'utilization_bonus', 225.0, FALSE, 400.0, 0.0),
+('Delivery', 'utilization_bonus', 200.0, TRUE, 250.0, 0.0),
+('Delivery', 'utilization_bonus', 350.0, TRUE, 500.0, 0.0),
+('Delivery', 'utilization_bonus', 450.0, FALSE, 600.0, 0.0),
+-- Efficiency (métrica: % de horas en proyectos)
+('Hybrid', 'efficiency_bonus', 80.0, TRUE, 150.0, 0.0),
+('Delivery', 'efficiency_bonus', 80.0, TRUE, 250.0, 0.0),
+-- Timeline (métrica: % de proyectos completados a tiempo)
+('Hybrid', 'timeline_bonus', 40.0, TRUE, 150.0, 0.0),
+('Delivery', 'timeline_bonus', 50.0, TRUE, 250.0, 0.0),
+-- Customer satisfaction (métrica: NPS global de la compañía)
+('Sales', 'customer_satisfaction_bonus', 4.5, FALSE, 500.0, 0.0),
+('Hybrid', 'customer_satisfaction_bonus', 4.5, FALSE, 250.0, 0.0),
+('Delivery', 'customer_satisfaction_bonus', 4.5, FALSE, 250.0, 0.0),
+-- MBOs (métrica: 1 si el MBO está completo)
+('Sales', 'mbo_bonus', 1.0, TRUE, 500.0, 0.0),
+('Hybrid', 'mbo_bonus', 1.0, TRUE, 250.0, 0.0),
+('Delivery', 'mbo_bonus', 1.0, TRUE, 250.0, 0.0);
+
+-- Cada tier con el umbral del siguiente: el join por rango encuentra un solo tier por métrica
+CREATE OR REPLACE VIEW `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_ranges` AS
+SELECT
+  plan_type,
+  component,
+  lower_bound,
+  lower_inclusive,
+  LEAD(lower_bound) OVER tiers as upper_bound,
+  LEAD(lower_inclusive) OVER tiers as upper_inclusive,
+  COALESCE(payout, 0.0) as payout,
+  COALESCE(rate, 0.0) as rate
+FROM `jrodriguez-sandbox.hackathon_bonus_update.bonus_tier_config`
+WINDOW tiers AS (PARTITION BY plan_type, component ORDER BY lower_bound);
+
+-- ¿La métrica cae en el tier [lower, upper)? (con los umbrales estrictos de cada extremo)
+CREATE OR REPLACE FUNCTION `jrodriguez-sandbox.hackathon_bonus_update.in_tier`(
+  metric FLOAT64, lower_bound FLOAT64, lower_inclusive BOOL, upper_bound FLOAT64, upper_inclusive BOOL
+) AS (
+  (metric > lower_bound OR (lower_inclusive AND metric = lower_bound))
+  AND (upper_bound IS NULL OR metric < upper_bound OR (NOT upper_inclusive AND metric = upper_bound))
+);
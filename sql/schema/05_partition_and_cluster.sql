@@ -0,0 +1,88 @@
+-- =====================================================
+-- MIGRACIÓN A TABLAS PARTICIONADAS Y CLUSTERIZADAS
+-- =====================================================
+-- Lleva un dataset creado con el 01_create_tables.sql original al layout actual: partición
+-- integer range por year y clustering por quarter + llaves (ver 01_create_tables.sql).
+-- CREATE OR REPLACE no puede cambiar la partición de una tabla existente, así que cada tabla
+-- se copia a <tabla>_new con el layout nuevo, se borra la original y la copia se renombra.
+-- El esquema (incluido updated_at de 03_add_change_tracking.sql) se conserva, los DEFAULT no,
+-- por eso se vuelven a aplicar al final.
+-- Respaldo: la tabla original borrada se puede recuperar durante la ventana de time travel del
+-- dataset (7 días por defecto) con
+--   CREATE TABLE `<dataset>.<tabla>_backup` CLONE `<dataset>.<tabla>` FOR SYSTEM_TIME AS OF <antes del DROP>;
+-- Se puede correr de nuevo: vuelve a copiar los datos.
+-- Correr sin cargas en curso (ClickUp, HubSpot, Google Forms) ni recálculos de bonos: lo que se
+-- escriba entre la copia y el DROP se pierde.
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.consultant_master_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master_new`
+CLUSTER BY consultant_id
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master_new` RENAME TO consultant_master;
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.deals_report_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report_new`
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, consultant_id, deal_id
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.deals_report`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report_new` RENAME TO deals_report;
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master_new`
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, consultant_id, project_id
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master_new` RENAME TO consultant_projects_master;
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.consultant_report_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report_new`
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, consultant_id, project_id
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report_new` RENAME TO consultant_report;
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.time_master_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.time_master_new`
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.time_master`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.time_master`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.time_master_new` RENAME TO time_master;
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction_new`
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY quarter, project_id
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction_new` RENAME TO customer_satisfaction;
+
+DROP TABLE IF EXISTS `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results_new`;
+CREATE TABLE `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results_new`
+PARTITION BY RANGE_BUCKET(year, GENERATE_ARRAY(2020, 2100, 1))
+CLUSTER BY consultant_id, quarter
+AS SELECT * FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`;
+DROP TABLE `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`;
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results_new` RENAME TO quarterly_bonus_results;
+
+-- DEFAULT de change tracking (03_add_change_tracking.sql)
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_master`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.deals_report`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_projects_master`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_report`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+ALTER TABLE `jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction`
+  ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP();
+
+-- Verificación: columnas de partición y clustering de cada tabla
+SELECT table_name, column_name, is_partitioning_column, clustering_ordinal_position
+FROM `jrodriguez-sandbox.hackathon_bonus_update.INFORMATION_SCHEMA.COLUMNS`
+WHERE is_partitioning_column = 'YES' OR clustering_ordinal_position IS NOT NULL
+ORDER BY table_name, clustering_ordinal_position;
@@ -0,0 +1,14 @@
+-- =====================================================
+-- ÚLTIMO RESULTADO POR CONSULTOR
+-- =====================================================
+-- Una fila por consultor con su quarter más reciente de quarterly_bonus_results (mismas columnas).
+-- El lookup sin periodo del agente (/api/bonus, recomendaciones) lee aquí: clustering por
+-- consultant_id, así que es una lectura puntual en lugar de ordenar toda la historia.
+-- La mantiene refresh_consultant_latest_bonus, que llaman los procedimientos de cálculo.
+
+CREATE OR REPLACE TABLE `jrodriguez-sandbox.hackathon_bonus_update.consultant_latest_bonus`
+CLUSTER BY consultant_id
+AS
+SELECT *
+FROM `jrodriguez-sandbox.hackathon_bonus_update.quarterly_bonus_results`
+QUALIFY ROW_NUMBER() OVER (PARTITION BY consultant_id ORDER BY year DESC, quarter DESC) = 1;
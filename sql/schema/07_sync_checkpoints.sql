@@ -0,0 +1,14 @@
+-- =====================================================
+-- CHECKPOINTS DE SINCRONIZACIÓN INCREMENTAL
+-- =====================================================
+-- Una fila por fuente (hubspot, clickup, google_forms) con el punto hasta el que ya se cargó:
+-- última fecha de modificación, semana o cursor, según la fuente (src/integrations/incremental_sync.py).
+-- Se actualiza en la misma transacción que el MERGE de los datos: si la carga falla, el checkpoint
+-- no avanza y la siguiente corrida vuelve a pedir el mismo delta.
+
+CREATE TABLE IF NOT EXISTS `jrodriguez-sandbox.hackathon_bonus_update.sync_checkpoints` (
+  source STRING NOT NULL,
+  checkpoint STRING,               -- Timestamp ISO, fecha de semana o cursor de la fuente
+  rows_merged INTEGER,             -- Filas del último delta
+  updated_at TIMESTAMP
+);
@@ -1,22 +1,58 @@
-import requests
-import pandas as pd
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from google.cloud import bigquery
 
+# bigquery_guard (tope de bytes y costo por call site) vive junto al agente y lo comparten las integraciones
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'bonus-advisor-agent'))
+import bigquery_guard  # noqa: E402
+
+# Cliente HTTP compartido (pool, rate limit por vendor y reintentos)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import http_client  # noqa: E402
+import incremental_sync  # noqa: E402
+
+# Ventanas concurrentes: el token bucket del cliente HTTP mantiene la cuota de ClickUp
+FETCH_WORKERS = int(os.getenv("CLICKUP_FETCH_WORKERS", "4"))
+WINDOW_DAYS = 7
+# Semanas ya sincronizadas que se vuelven a pedir (horas cargadas o editadas tarde)
+LOOKBACK_WEEKS = int(os.getenv("CLICKUP_LOOKBACK_WEEKS", "1"))
+
+TABLE_ID = "jrodriguez-sandbox.hackathon_bonus_update.consultant_report"
+KEYS = ['report_id']
+
+
+def week_start(moment):
+    """Lunes 00:00 de la semana de moment"""
+    return datetime.combine((moment - timedelta(days=moment.weekday())).date(), datetime.min.time())
+
+
+def time_windows(start_date, end_date, days=WINDOW_DAYS):
+    """Divide [start_date, end_date) en ventanas de days días (la última puede ser más corta)"""
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + timedelta(days=days), end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+    return windows
+
+
 class ClickUpIntegration:
-    def __init__(self, api_token, team_id):
+    def __init__(self, api_token, team_id, max_workers=FETCH_WORKERS):
         self.api_token = api_token
         self.team_id = team_id
+        self.max_workers = max_workers
         self.base_url = "https://api.clickup.com/api/v2"
         self.headers = {
             'Authorization': api_token,
             'Content-Type': 'application/json'
         }
+        self.http = http_client.VendorClient('clickup', self.base_url, self.headers)
     
     def get_time_entries(self, start_date, end_date, assignee=None):
         """Obtener time entries de ClickUp"""
-        url = f"{self.base_url}/team/{self.team_id}/time_entries"
-        
         params = {
             'start_date': int(start_date.timestamp() * 1000),
             'end_date': int(end_date.timestamp() * 1000),
@@ -27,36 +63,87 @@ class ClickUpIntegration:
         if assignee:
             params['assignee'] = assignee
             
-        response = requests.get(url, headers=self.headers, params=params)
-        return response.json()
+        return self.http.get(f"team/{self.team_id}/time_entries", params, endpoint='time_entries')
+
+    def _fetch_window(self, window, assignee):
+        start_date, end_date = window
+        # end_date de ClickUp es inclusivo: se corta 1 ms antes para no repetir el borde
+        response = self.get_time_entries(start_date, end_date - timedelta(milliseconds=1), assignee)
+        return response.get('data', [])
+
+    def iter_time_entries(self, start_date, end_date, assignees=None, window_days=WINDOW_DAYS):
+        """Time entries del rango en ventanas de window_days (y por assignee), en paralelo.
+
+        Las ventanas se piden con un pool de max_workers hilos y sus entries se entregan a medida que
+        llegan. Las ventanas que fallan se reintentan una por una al final; si vuelven a fallar se
+        propaga el error. Un entry que aparezca en dos ventanas se entrega una sola vez.
+        """
+        tasks = [(window, assignee) for window in time_windows(start_date, end_date, window_days)
+                 for assignee in (assignees or [None])]
+        seen = set()
+        failed = []
+
+        def fresh(entries):
+            for entry in entries:
+                if entry['id'] not in seen:
+                    seen.add(entry['id'])
+                    yield entry
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(self._fetch_window, *task): task for task in tasks}
+            for future in as_completed(futures):
+                try:
+                    entries = future.result()
+                except Exception as e:
+                    window = futures[future][0]
+                    print(f"Ventana {window[0]:%Y-%m-%d} - {window[1]:%Y-%m-%d} falló ({e}), se reintenta al final")
+                    failed.append(futures[future])
+                    continue
+                yield from fresh(entries)
+
+        for task in sorted(failed, key=lambda task: task[0]):
+            yield from fresh(self._fetch_window(*task))
     
     def process_time_entries(self, time_entries):
-        """Procesar entries para formato BigQuery"""
-        processed_data = []
+        """Procesar entries para formato BigQuery.
+
+        Acepta la respuesta de get_time_entries o un iterable de entries (p.ej. iter_time_entries).
+        Los entries se acumulan en una pasada al grano de consultant_report: una fila por consultor,
+        proyecto y semana (y quarter, si la semana cruza el cambio de quarter) con las horas sumadas.
+        """
+        buckets = {}
+        if isinstance(time_entries, dict):
+            time_entries = time_entries['data']
         
-        for entry in time_entries['data']:
+        for entry in time_entries:
             # Convertir milliseconds a horas
             hours = int(entry['time']) / (1000 * 60 * 60)
             
             # Obtener fechas de la semana
             start_date = datetime.fromtimestamp(int(entry['start']) / 1000)
-            week_start = start_date - timedelta(days=start_date.weekday())
-            week_end = week_start + timedelta(days=4)  # Viernes
+            monday = week_start(start_date).date()
+            consultant_id = self.map_user_to_consultant(entry['user']['email'])
+            project_id = self.map_task_to_project(entry['task'])
+            quarter = self.get_quarter(start_date)
             
-            processed_entry = {
-                'report_id': f"CLK_{entry['id']}",
-                'consultant_id': self.map_user_to_consultant(entry['user']['email']),
-                'project_id': self.map_task_to_project(entry['task']),
-                'week_start_date': week_start.date(),
-                'week_end_date': week_end.date(),
-                'logged_hours': hours,
-                'quarter': self.get_quarter(start_date),
-                'year': start_date.year,
-                'week_number': start_date.isocalendar()[1]
-            }
-            processed_data.append(processed_entry)
+            key = (consultant_id, project_id, monday, start_date.year, quarter)
+            bucket = buckets.get(key)
+            if bucket is None:
+                bucket = buckets[key] = {
+                    # Determinístico: recargar la misma semana produce el mismo report_id
+                    'report_id': f"CLK_{consultant_id}_{project_id}_{monday:%Y%m%d}_{start_date.year}Q{quarter}",
+                    'consultant_id': consultant_id,
+                    'project_id': project_id,
+                    'week_start_date': monday,
+                    'week_end_date': monday + timedelta(days=4),  # Viernes
+                    'logged_hours': 0.0,
+                    'quarter': quarter,
+                    'year': start_date.year,
+                    'week_number': monday.isocalendar()[1]
+                }
+            bucket['logged_hours'] += hours
         
-        return processed_data
+        return list(buckets.values())
     
     def map_user_to_consultant(self, email):
         """Mapear email de ClickUp a consultant_id"""
@@ -89,31 +176,61 @@ class ClickUpIntegration:
         return (date.month - 1) // 3 + 1
     
     def upload_to_bigquery(self, processed_data):
-        """Subir datos a BigQuery"""
+        """Subir datos a BigQuery (MERGE por report_id: recargar una semana no duplica horas)"""
         client = bigquery.Client()
-        table_id = "jrodriguez-sandbox.hackathon_bonus_update.consultant_report"
-        
-        df = pd.DataFrame(processed_data)
-        
-        job_config = bigquery.LoadJobConfig(
-            write_disposition="WRITE_APPEND",  # Agregar datos
-            schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
-        )
-        
-        job = client.load_table_from_dataframe(df, table_id, job_config=job_config)
-        job.result()
+        incremental_sync.merge_rows(client, "clickup", processed_data, TABLE_ID, KEYS)
         
         print(f"Loaded {len(processed_data)} time entries to BigQuery")
 
+    def fetch_delta(self, checkpoint, now=None):
+        """Delta desde el checkpoint (lunes de la última semana sincronizada), en semanas completas.
+
+        Se piden de nuevo LOOKBACK_WEEKS semanas previas al checkpoint y la semana en curso llega
+        hasta su domingo. Las semanas pedidas se reemplazan completas en consultant_report: las filas
+        CLK_ de esas semanas que ya no salen de ClickUp se borran.
+        """
+        now = now or datetime.now()
+        current_week = week_start(now)
+        if checkpoint:
+            start_date = datetime.fromisoformat(checkpoint) - timedelta(weeks=LOOKBACK_WEEKS)
+        else:
+            start_date = current_week - timedelta(weeks=1)
+        end_date = current_week + timedelta(weeks=1)
+
+        processed_data = self.process_time_entries(self.iter_time_entries(start_date, end_date, window_days=1))
+        return incremental_sync.SyncBatch(
+            processed_data,
+            # La semana en curso sigue abierta: la próxima corrida la vuelve a pedir
+            checkpoint=current_week.date().isoformat(),
+            delete_scope="STARTS_WITH(T.report_id, 'CLK_') AND T.week_start_date >= @scope_start AND T.week_start_date < @scope_end",
+            scope_parameters=[
+                bigquery.ScalarQueryParameter("scope_start", "DATE", start_date.date()),
+                bigquery.ScalarQueryParameter("scope_end", "DATE", end_date.date()),
+            ],
+            years=range(start_date.year, end_date.year + 1),
+        )
+    
+    def recalculate_bonuses(self, processed_data):
+        """Recalcula incrementalmente los bonos de los quarters con horas cargadas"""
+        client = bigquery.Client()
+        periods = sorted({(entry['year'], entry['quarter']) for entry in processed_data})
+        for year, quarter in periods:
+            bigquery_guard.run_query(
+                client, "clickup_recalculate",
+                "CALL `jrodriguez-sandbox.hackathon_bonus_update.calculate_quarterly_bonuses_incremental`(@quarter, @year)",
+                bigquery.QueryJobConfig(query_parameters=[
+                    bigquery.ScalarQueryParameter("quarter", "INT64", quarter),
+                    bigquery.ScalarQueryParameter("year", "INT64", year)
+                ])
+            )
+            print(f"Recalculated bonuses for Q{quarter} {year}")
+
 # Uso del integrador
 def sync_clickup_weekly():
-    """Función para ejecutar semanalmente"""
+    """Función para ejecutar semanalmente (o más seguido: solo se piden las semanas desde el checkpoint)"""
     integrator = ClickUpIntegration('pk_YOUR_TOKEN', 'your_team_id')
+    client = bigquery.Client()
     
-    # Obtener datos de la semana pasada
-    end_date = datetime.now()
-    start_date = end_date - timedelta(days=7)
-    
-    time_entries = integrator.get_time_entries(start_date, end_date)
-    processed_data = integrator.process_time_entries(time_entries)
-    integrator.upload_to_bigquery(processed_data)
\ No newline at end of file
+    batch = incremental_sync.run_sync(client, "clickup", TABLE_ID, KEYS, integrator.fetch_delta)
+    integrator.recalculate_bonuses(batch.rows)
+    print(http_client.format_summary('clickup'))
\ No newline at end of file
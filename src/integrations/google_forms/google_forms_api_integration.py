@@ -1,7 +1,17 @@
+import os
+import sys
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-import pandas as pd
 from datetime import datetime
+from google.cloud import bigquery
+
+# Política de reintentos del cliente HTTP compartido y sincronización incremental (staging + MERGE)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import http_client  # noqa: E402
+import incremental_sync  # noqa: E402
+
+TABLE_ID = "jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction"
+KEYS = ['satisfaction_id']
 
 class GoogleFormsIntegration:
     def __init__(self, service_account_path, form_id):
@@ -12,17 +22,30 @@ class GoogleFormsIntegration:
         )
         self.service = build('forms', 'v1', credentials=self.credentials)
     
-    def get_form_responses(self):
-        """Obtener todas las respuestas del formulario"""
+    def get_form_responses(self, since=None):
+        """Obtener las respuestas del formulario (solo las enviadas desde since, RFC3339, si se indica)"""
         try:
             # Obtener form metadata para mapear questions
-            form = self.service.forms().get(formId=self.form_id).execute()
+            form = self.service.forms().get(formId=self.form_id).execute(num_retries=http_client.MAX_RETRIES)
             question_mapping = self.create_question_mapping(form)
             
-            # Obtener responses
-            responses = self.service.forms().responses().list(formId=self.form_id).execute()
+            # Obtener responses (paginadas); el filtro de timestamp lo resuelve la API
+            responses = []
+            page_token = None
+            while True:
+                request = {'formId': self.form_id, 'pageToken': page_token}
+                if since:
+                    request['filter'] = f"timestamp >= {since}"
+                # googleapiclient reintenta 429/5xx con backoff exponencial propio
+                page = self.service.forms().responses().list(**request).execute(
+                    num_retries=http_client.MAX_RETRIES
+                )
+                responses.extend(page.get('responses', []))
+                page_token = page.get('nextPageToken')
+                if not page_token:
+                    break
             
-            return responses.get('responses', []), question_mapping
+            return responses, question_mapping
         
         except Exception as e:
             print(f"Error obteniendo respuestas: {e}")
@@ -119,31 +142,35 @@ class GoogleFormsIntegration:
         """Obtener quarter de una fecha"""
         return (date.month - 1) // 3 + 1
     
+    def fetch_delta(self, checkpoint):
+        """Delta desde el checkpoint (lastSubmittedTime máximo ya cargado).
+
+        Si la API falla, get_form_responses devuelve [] y el checkpoint no avanza.
+        """
+        responses, question_mapping = self.get_form_responses(since=checkpoint)
+        processed_data = self.process_responses(responses, question_mapping)
+        return incremental_sync.SyncBatch(
+            processed_data,
+            # RFC3339 en UTC ('Z'): el orden de texto coincide con el temporal
+            checkpoint=max([checkpoint or ''] + [response['lastSubmittedTime'] for response in responses]) or None,
+            # Sin poda por year: una respuesta editada puede cambiar de año (year sale de
+            # lastSubmittedTime) y el MERGE tiene que encontrar la fila en su partición anterior
+        )
+
     def upload_to_bigquery(self, processed_data):
-        """Subir satisfaction data a BigQuery"""
+        """Subir satisfaction data a BigQuery (MERGE por satisfaction_id, sin reemplazar la tabla)"""
         client = bigquery.Client()
-        table_id = "jrodriguez-sandbox.hackathon_bonus_update.customer_satisfaction"
-        
-        df = pd.DataFrame(processed_data)
-        
-        job_config = bigquery.LoadJobConfig(
-            write_disposition="WRITE_TRUNCATE",  # Reemplazar datos
-            schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
-        )
-        
-        job = client.load_table_from_dataframe(df, table_id, job_config=job_config)
-        job.result()
+        incremental_sync.merge_rows(client, "google_forms", processed_data, TABLE_ID, KEYS)
         
         print(f"Loaded {len(processed_data)} satisfaction responses to BigQuery")
 
 # Uso del integrador
 def sync_google_forms_monthly():
-    """Función para ejecutar mensualmente"""
+    """Función para ejecutar mensualmente (solo se cargan las respuestas nuevas o editadas)"""
     integrator = GoogleFormsIntegration(
         'path/to/service-account.json',
         'your_form_id'
     )
+    client = bigquery.Client()
     
-    responses, question_mapping = integrator.get_form_responses()
-    processed_data = integrator.process_responses(responses, question_mapping)
-    integrator.upload_to_bigquery(processed_data)
\ No newline at end of file
+    incremental_sync.run_sync(client, "google_forms", TABLE_ID, KEYS, integrator.fetch_delta)
\ No newline at end of file
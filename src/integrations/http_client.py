@@ -0,0 +1,220 @@
+"""Cliente HTTP compartido por las integraciones (ClickUp, HubSpot).
+
+- Una requests.Session por vendor: keep-alive y pool de conexiones, sin handshake TCP/TLS por llamada.
+- Token bucket por vendor con la cuota por minuto que publica cada API. El bucket es compartido por
+  todos los hilos del proceso; un 429 pausa el bucket completo durante el Retry-After.
+- Timeout en todas las llamadas y reintentos con backoff exponencial con jitter ante 429, 5xx y
+  errores de conexión. Retry-After (segundos o fecha HTTP) tiene prioridad sobre el backoff.
+- Tiempo por request y reintentos en métricas (módulo metrics del agente), resumidos con format_summary().
+
+Cuotas por defecto (sobrescribibles con <VENDOR>_RATE_PER_MINUTE):
+- ClickUp: 100 requests/minuto por token.
+- HubSpot: 100 requests cada 10 segundos para private apps (600/minuto).
+- HubSpot search (/crm/v3/objects/*/search): 5 requests/segundo; se usa 4 para dejar margen.
+"""
+import email.utils
+import os
+import random
+import sys
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# metrics vive junto al agente, igual que bigquery_guard
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'bonus-advisor-agent'))
+import metrics  # noqa: E402
+
+DEFAULT_TIMEOUT = (5, 30)  # (conexión, lectura) en segundos
+MAX_RETRIES = int(os.getenv("INTEGRATION_HTTP_MAX_RETRIES", "5"))
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 30.0
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+VENDOR_LIMITS = {
+    # vendor: (requests por minuto, ráfaga)
+    "clickup": (100, 10),
+    "hubspot": (600, 100),
+    "hubspot_search": (240, 4),
+}
+
+REGISTRY = metrics.Registry()
+REQUEST_SECONDS = REGISTRY.histogram(
+    "integration_http_request_seconds", "Tiempo por request a APIs externas", ["vendor", "endpoint", "status"]
+)
+RETRIES = REGISTRY.counter(
+    "integration_http_retries", "Reintentos por vendor y motivo (429, 5xx, conexión)", ["vendor", "reason"]
+)
+THROTTLE_SECONDS = REGISTRY.counter(
+    "integration_http_throttle_seconds", "Segundos de espera por el rate limit local", ["vendor"]
+)
+
+
+class TokenBucket:
+    """Rate limit local: rate_per_minute tokens por minuto con ráfaga de hasta burst"""
+
+    def __init__(self, rate_per_minute, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self._tokens = float(burst)
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """Toma un token, esperando si hace falta. Devuelve los segundos esperados"""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = self._clock()
+                if now < self._paused_until:
+                    delay = self._paused_until - now
+                else:
+                    self._refill(now)
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return waited
+                    delay = (1 - self._tokens) / self.rate
+            self._sleep(delay)
+            waited += delay
+
+    def pause(self, seconds):
+        """Detiene el bucket (todos los hilos) por seconds, p.ej. tras un 429 con Retry-After"""
+        with self._lock:
+            now = self._clock()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0.0
+            self._updated = now
+
+
+class HTTPError(Exception):
+    """Respuesta de error definitiva (no reintentable o reintentos agotados)"""
+
+    def __init__(self, vendor, response):
+        super().__init__(f"{vendor}: HTTP {response.status_code} en {response.request.method} {response.url}")
+        self.vendor = vendor
+        self.response = response
+        self.status_code = response.status_code
+
+
+def retry_after_seconds(response, now=None):
+    """Segundos indicados por Retry-After (entero o fecha HTTP), o None si no viene"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+
+def backoff_seconds(attempt):
+    """Full jitter: uniforme entre 0 y min(tope, base * 2^intento)"""
+    return random.uniform(0, min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+class VendorClient:
+    """Session con pool, rate limit y reintentos para una API externa"""
+
+    def __init__(self, vendor, base_url, headers=None, rate_per_minute=None, burst=None,
+                 timeout=DEFAULT_TIMEOUT, max_retries=MAX_RETRIES, pool_size=10, sleep=time.sleep):
+        default_rate, default_burst = VENDOR_LIMITS.get(vendor, (60, 5))
+        env_rate = os.getenv(f"{vendor.upper()}_RATE_PER_MINUTE")
+        self.vendor = vendor
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(
+            rate_per_minute or (int(env_rate) if env_rate else default_rate),
+            burst or default_burst,
+            sleep=sleep,
+        )
+        self._sleep = sleep
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _url(self, path):
+        return path if path.startswith("http") else f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method, path, endpoint=None, **kwargs):
+        """Ejecuta el request con rate limit y reintentos; devuelve la Response exitosa.
+
+        endpoint es el nombre lógico para las métricas (por defecto el path, que puede llevar IDs).
+        """
+        endpoint = endpoint or path
+        kwargs.setdefault("timeout", self.timeout)
+        url = self._url(path)
+
+        for attempt in range(self.max_retries + 1):
+            THROTTLE_SECONDS.inc(self.bucket.acquire(), vendor=self.vendor)
+            started = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout):
+                REQUEST_SECONDS.observe(time.perf_counter() - started, vendor=self.vendor, endpoint=endpoint, status="error")
+                if attempt == self.max_retries:
+                    raise
+                RETRIES.inc(vendor=self.vendor, reason="connection")
+                self._sleep(backoff_seconds(attempt))
+                continue
+
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - started, vendor=self.vendor, endpoint=endpoint, status=response.status_code
+            )
+            if response.status_code < 400:
+                return response
+            if response.status_code not in RETRY_STATUSES or attempt == self.max_retries:
+                raise HTTPError(self.vendor, response)
+
+            RETRIES.inc(vendor=self.vendor, reason=str(response.status_code))
+            wait = retry_after_seconds(response)
+            if wait is None:
+                wait = backoff_seconds(attempt)
+            if response.status_code == 429:
+                # La cuota es del token, no del hilo: pausar el bucket frena a todos
+                self.bucket.pause(wait)
+            else:
+                self._sleep(wait)
+
+    def get(self, path, params=None, endpoint=None):
+        """GET que devuelve el JSON de la respuesta"""
+        return self.request("GET", path, endpoint=endpoint, params=params).json()
+
+    def post(self, path, json=None, endpoint=None):
+        """POST con cuerpo JSON que devuelve el JSON de la respuesta"""
+        return self.request("POST", path, endpoint=endpoint, json=json).json()
+
+    def close(self):
+        self.session.close()
+
+
+def format_summary(vendor=None):
+    """Resumen por vendor y endpoint: requests, tiempo promedio y reintentos"""
+    totals = {}
+    for (name, endpoint, _status), series in sorted(REQUEST_SECONDS._series.items()):
+        if vendor and name != vendor:
+            continue
+        count, seconds = totals.get((name, endpoint), (0, 0.0))
+        totals[(name, endpoint)] = (count + sum(series[:-1]), seconds + series[-1])
+
+    lines = [f"{'Vendor':<10}{'Endpoint':<28}{'Requests':>10}{'Promedio':>12}"]
+    for (name, endpoint), (count, seconds) in totals.items():
+        lines.append(f"{name:<10}{endpoint:<28}{count:>10}{seconds / count * 1000:>9,.0f} ms")
+    retries = {key: value for key, value in sorted(RETRIES._series.items()) if not vendor or key[0] == vendor}
+    for (name, reason), value in retries.items():
+        lines.append(f"{name:<10}reintentos {reason:<17}{value:>10}")
+    return "\n".join(lines)
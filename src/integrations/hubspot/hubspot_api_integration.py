@@ -1,75 +1,146 @@
-import requests
+import os
+import sys
 from datetime import datetime, timedelta
-import pandas as pd
+from google.cloud import bigquery
+
+# Cliente HTTP compartido y sincronización incremental (staging + MERGE, vía bigquery_guard)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import http_client  # noqa: E402
+import incremental_sync  # noqa: E402
+
+TABLE_ID = "jrodriguez-sandbox.hackathon_bonus_update.deals_report"
+KEYS = ['deal_id', 'consultant_id']
+
+DEAL_PROPERTIES = [
+    'dealname', 'amount', 'closedate', 'dealstage',
+    'hubspot_owner_id', 'deal_currency_code', 'createdate',
+    'hs_deal_stage_probability', 'hs_analytics_source', 'hs_lastmodifieddate'
+]
+SEARCH_PAGE_SIZE = 200
+# La búsqueda de HubSpot no pagina más allá de 10.000 resultados por consulta
+SEARCH_MAX_RESULTS = 10000
+
+
+def to_millis(value):
+    """datetime o fecha ISO de HubSpot a milisegundos epoch (formato de los filtros de búsqueda)"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return str(int(value.timestamp() * 1000))
 
 class HubSpotIntegration:
-    def __init__(self, access_token):
+    def __init__(self, access_token, base_url="https://api.hubapi.com/crm/v3"):
         self.access_token = access_token
-        self.base_url = "https://api.hubapi.com/crm/v3"
+        self.base_url = base_url
         self.headers = {
             'Authorization': f'Bearer {access_token}',
             'Content-Type': 'application/json'
         }
+        self.http = http_client.VendorClient('hubspot', self.base_url, self.headers)
+        # Los endpoints de búsqueda tienen su propia cuota por segundo
+        self.search_http = http_client.VendorClient('hubspot_search', self.base_url, self.headers)
     
-    def get_closed_deals(self, start_date=None, end_date=None):
-        """Obtener deals cerrados ganados"""
-        url = f"{self.base_url}/objects/deals"
-        
-        params = {
-            'properties': [
-                'dealname', 'amount', 'closedate', 'dealstage',
-                'hubspot_owner_id', 'deal_currency_code', 'createdate',
-                'hs_deal_stage_probability', 'hs_analytics_source'
-            ],
-            'limit': 100
-        }
-        
-        all_deals = []
-        after_cursor = None
+    def search_deals(self, filters, sort_property, max_results=SEARCH_MAX_RESULTS):
+        """Deals que cumplen filters vía la búsqueda del CRM, ordenados por sort_property ascendente.
+
+        La búsqueda corta en max_results por consulta: al acercarse al límite se abre una nueva
+        consulta con sort_property >= el último valor visto. Los deals del borde que ya se
+        entregaron se descartan, así cada deal sale una sola vez.
+        """
+        seen = set()
+        lower_bound = None
         
         while True:
-            if after_cursor:
-                params['after'] = after_cursor
-                
-            response = requests.get(url, headers=self.headers, params=params)
-            data = response.json()
+            window_filters = list(filters)
+            if lower_bound is not None:
+                window_filters.append({'propertyName': sort_property, 'operator': 'GTE', 'value': lower_bound})
+            body = {
+                'filterGroups': [{'filters': window_filters}] if window_filters else [],
+                'sorts': [{'propertyName': sort_property, 'direction': 'ASCENDING'}],
+                'properties': DEAL_PROPERTIES,
+                'limit': SEARCH_PAGE_SIZE,
+            }
+            new_in_window = 0
+            last_value = None
             
-            # Filtrar solo deals cerrados ganados
-            for deal in data['results']:
-                if deal['properties']['dealstage'] == 'closedwon':
-                    close_date = datetime.fromisoformat(
-                        deal['properties']['closedate'].replace('Z', '+00:00')
-                    )
-                    
-                    # Filtrar por fecha si se especifica
-                    if start_date and close_date < start_date:
-                        continue
-                    if end_date and close_date > end_date:
+            while True:
+                data = self.search_http.post('objects/deals/search', body, endpoint='deals_search')
+                
+                for deal in data['results']:
+                    last_value = deal['properties'][sort_property]
+                    if deal['id'] in seen:
                         continue
-                        
-                    all_deals.append(deal)
+                    seen.add(deal['id'])
+                    new_in_window += 1
+                    yield deal
+                
+                after = data.get('paging', {}).get('next', {}).get('after')
+                if not after:
+                    return
+                if int(after) + SEARCH_PAGE_SIZE > max_results:
+                    break  # Siguiente página fuera del límite: nueva ventana
+                body['after'] = after
             
-            # Pagination
-            if 'paging' in data and 'next' in data['paging']:
-                after_cursor = data['paging']['next']['after']
-            else:
-                break
+            if new_in_window == 0:
+                raise RuntimeError(
+                    f"Más de {max_results} deals con {sort_property} = {last_value}: no se puede seguir paginando"
+                )
+            lower_bound = to_millis(last_value)
+
+    def get_closed_deals(self, start_date=None, end_date=None):
+        """Obtener deals cerrados ganados (filtrados por HubSpot: etapa y rango de closedate)"""
+        filters = [{'propertyName': 'dealstage', 'operator': 'EQ', 'value': 'closedwon'}]
+        if start_date:
+            filters.append({'propertyName': 'closedate', 'operator': 'GTE', 'value': to_millis(start_date)})
+        if end_date:
+            filters.append({'propertyName': 'closedate', 'operator': 'LTE', 'value': to_millis(end_date)})
+        
+        return list(self.search_deals(filters, 'closedate'))
+    
+    def get_deals_modified_since(self, since=None):
+        """Deals (de cualquier etapa) con hs_lastmodifieddate >= since; todos si since es None"""
+        filters = []
+        if since:
+            filters.append({'propertyName': 'hs_lastmodifieddate', 'operator': 'GTE', 'value': to_millis(since)})
+        
+        return list(self.search_deals(filters, 'hs_lastmodifieddate'))
+
+    def last_modified(self, deal):
+        """hs_lastmodifieddate del deal como datetime con zona horaria"""
+        return datetime.fromisoformat(deal['properties']['hs_lastmodifieddate'].replace('Z', '+00:00'))
+
+    def fetch_delta(self, checkpoint):
+        """Delta desde el checkpoint (hs_lastmodifieddate máximo ya cargado).
+
+        Los deals modificados se reemplazan completos en deals_report: sus filas (owner y
+        colaboradores) se vuelven a armar y las que ya no correspondan, p.ej. porque el deal dejó de
+        estar closedwon o cambió un colaborador, se borran.
+        """
+        since = datetime.fromisoformat(checkpoint) if checkpoint else None
+        deals = self.get_deals_modified_since(since)
+        if not deals:
+            return incremental_sync.SyncBatch([], checkpoint)
         
-        return all_deals
+        won = [deal for deal in deals if deal['properties']['dealstage'] == 'closedwon']
+        return incremental_sync.SyncBatch(
+            self.process_deals(won),
+            # >= en la siguiente corrida: los deals del mismo instante se vuelven a pedir, el MERGE los absorbe
+            checkpoint=max(self.last_modified(deal) for deal in deals).isoformat(),
+            delete_scope="T.deal_id IN UNNEST(@changed_deal_ids)",
+            scope_parameters=[
+                bigquery.ArrayQueryParameter("changed_deal_ids", "STRING", [deal['id'] for deal in deals])
+            ],
+        )
     
     def get_deal_collaborators(self, deal_id):
         """Obtener colaboradores de un deal específico"""
         # Esta información puede venir de custom properties o associations
         # Implementar según estructura específica de HubSpot
-        url = f"{self.base_url}/objects/deals/{deal_id}"
-        
         params = {
             'properties': ['hubspot_owner_id', 'deal_collaborators'],  # Custom property
             'associations': ['contacts']
         }
         
-        response = requests.get(url, headers=self.headers, params=params)
-        return response.json()
+        return self.http.get(f'objects/deals/{deal_id}', params, endpoint='deal_collaborators')
     
     def process_deals(self, deals):
         """Procesar deals para formato BigQuery"""
@@ -134,31 +205,17 @@ class HubSpotIntegration:
         return "Client Name"  # Placeholder
     
     def upload_to_bigquery(self, processed_data):
-        """Subir deals a BigQuery"""
+        """Subir deals a BigQuery (MERGE por deal_id + consultant_id, sin reemplazar la tabla)"""
         client = bigquery.Client()
-        table_id = "jrodriguez-sandbox.hackathon_bonus_update.deals_report"
-        
-        df = pd.DataFrame(processed_data)
-        
-        job_config = bigquery.LoadJobConfig(
-            write_disposition="WRITE_TRUNCATE",  # Reemplazar datos
-            schema_update_options=[bigquery.SchemaUpdateOption.ALLOW_FIELD_ADDITION]
-        )
-        
-        job = client.load_table_from_dataframe(df, table_id, job_config=job_config)
-        job.result()
+        incremental_sync.merge_rows(client, "hubspot", processed_data, TABLE_ID, KEYS)
         
         print(f"Loaded {len(processed_data)} deals to BigQuery")
 
 # Uso del integrador
 def sync_hubspot_quarterly():
-    """Función para ejecutar trimestralmente"""
+    """Función para ejecutar trimestralmente (o más seguido: solo se cargan los deals modificados)"""
     integrator = HubSpotIntegration('your_access_token')
+    client = bigquery.Client()
     
-    # Obtener deals del quarter actual
-    now = datetime.now()
-    quarter_start = datetime(now.year, ((now.month - 1) // 3) * 3 + 1, 1)
-    
-    deals = integrator.get_closed_deals(start_date=quarter_start)
-    processed_data = integrator.process_deals(deals)
-    integrator.upload_to_bigquery(processed_data)
\ No newline at end of file
+    incremental_sync.run_sync(client, "hubspot", TABLE_ID, KEYS, integrator.fetch_delta)
+    print(http_client.format_summary())  # hubspot y hubspot_search
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Servidor local que imita los endpoints de deals del CRM de HubSpot usados por la integración.
+
+Permite probar HubSpotIntegration sin red ni token:
+- GET  /crm/v3/objects/deals            listado paginado (limit, after)
+- POST /crm/v3/objects/deals/search     filtros EQ/NEQ/GT/GTE/LT/LTE, un sort, cursor after y el
+                                        límite de resultados por consulta de HubSpot (10.000)
+- GET  /crm/v3/objects/deals/<id>       detalle de un deal
+
+Cuenta requests y bytes enviados por endpoint para comparar estrategias de descarga.
+
+    python hubspot_stub_server.py --port 8765 --deals 20000
+    HubSpotIntegration('token', base_url='http://127.0.0.1:8765/crm/v3')
+"""
+import argparse
+import json
+import random
+import re
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+DATE_PROPERTIES = {'closedate', 'createdate', 'hs_lastmodifieddate'}
+STAGES = ['appointmentscheduled', 'qualifiedtobuy', 'presentationscheduled', 'contractsent', 'closedwon', 'closedlost']
+
+
+def _iso(moment):
+    return moment.strftime('%Y-%m-%dT%H:%M:%S.') + f"{moment.microsecond // 1000:03d}Z"
+
+
+def generate_deals(count, start=datetime(2018, 1, 1, tzinfo=timezone.utc), days=365 * 7, seed=7):
+    """count deals repartidos en days días desde start, con etapas y montos aleatorios reproducibles"""
+    rng = random.Random(seed)
+    deals = []
+    for number in range(1, count + 1):
+        created = start + timedelta(seconds=rng.randrange(days * 86400))
+        closed = created + timedelta(days=rng.randrange(1, 120))
+        deals.append({
+            'id': str(number),
+            'properties': {
+                'dealname': f"Deal {number}",
+                'amount': str(rng.randrange(1000, 250000)),
+                'closedate': _iso(closed),
+                'createdate': _iso(created),
+                'dealstage': rng.choice(STAGES),
+                'hubspot_owner_id': rng.choice(['rod_solar_id', 'jesus_id', 'anthony_id']),
+                'deal_currency_code': 'USD',
+                'hs_deal_stage_probability': '1',
+                'hs_analytics_source': rng.choice(['ORGANIC_SEARCH', 'PAID_SEARCH', 'REFERRALS']),
+                'hs_lastmodifieddate': _iso(closed + timedelta(minutes=rng.randrange(60 * 24 * 30))),
+                'deal_collaborators': '',
+            },
+        })
+    return deals
+
+
+def _comparable(name, value):
+    if name in DATE_PROPERTIES:
+        if isinstance(value, str) and not value.isdigit():
+            return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+        return int(value)
+    return value
+
+
+def _matches(deal, group):
+    for condition in group.get('filters', []):
+        name = condition['propertyName']
+        actual = deal['properties'].get(name)
+        if actual is None:
+            return False
+        left, right = _comparable(name, actual), _comparable(name, condition['value'])
+        operator = condition['operator']
+        if ((operator == 'EQ' and left != right) or (operator == 'NEQ' and left == right)
+                or (operator == 'GT' and not left > right) or (operator == 'GTE' and not left >= right)
+                or (operator == 'LT' and not left < right) or (operator == 'LTE' and not left <= right)):
+            return False
+    return True
+
+
+def _select(deal, properties):
+    if not properties:
+        return deal
+    return {'id': deal['id'], 'properties': {name: deal['properties'].get(name) for name in properties}}
+
+
+class HubSpotStub:
+    """Servidor en un hilo; start() devuelve la base_url para HubSpotIntegration"""
+
+    def __init__(self, deals, max_results=10000, port=0):
+        self.deals = deals
+        self.max_results = max_results
+        self.requests = {}
+        self.bytes_sent = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), self._handler())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/crm/v3"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _record(self, endpoint, size):
+        with self._lock:
+            self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+            self.bytes_sent[endpoint] = self.bytes_sent.get(endpoint, 0) + size
+
+    def list_page(self, query):
+        limit = min(int(query.get('limit', ['10'])[0]), 100)
+        after = int(query.get('after', ['0'])[0])
+        page = self.deals[after:after + limit]
+        body = {'results': page}
+        if after + limit < len(self.deals):
+            body['paging'] = {'next': {'after': str(after + limit)}}
+        return 200, body
+
+    def search(self, request):
+        limit = min(int(request.get('limit', 10)), 200)
+        after = int(request.get('after', 0))
+        if after + limit > self.max_results:
+            return 400, {'status': 'error', 'message': f"Solo se pueden paginar {self.max_results} resultados"}
+
+        groups = request.get('filterGroups') or [{}]
+        found = [deal for deal in self.deals if any(_matches(deal, group) for group in groups)]
+        for sort in reversed(request.get('sorts', [])):
+            name = sort['propertyName']
+            found.sort(key=lambda deal: (_comparable(name, deal['properties'][name]), int(deal['id'])),
+                       reverse=sort.get('direction') == 'DESCENDING')
+        page = [_select(deal, request.get('properties')) for deal in found[after:after + limit]]
+        body = {'total': len(found), 'results': page}
+        if after + limit < len(found):
+            body['paging'] = {'next': {'after': str(after + limit)}}
+        return 200, body
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _send(self, endpoint, status, body):
+                payload = json.dumps(body).encode()
+                stub._record(endpoint, len(payload))
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                match = re.fullmatch(r'/crm/v3/objects/deals(?:/(\w+))?', url.path)
+                if not match:
+                    return self._send('unknown', 404, {'message': 'not found'})
+                if match.group(1):
+                    deal = next((d for d in stub.deals if d['id'] == match.group(1)), None)
+                    return self._send('deal', 200 if deal else 404, deal or {'message': 'not found'})
+                self._send('deals', *stub.list_page(parse_qs(url.query)))
+
+            def do_POST(self):
+                if urlparse(self.path).path != '/crm/v3/objects/deals/search':
+                    return self._send('unknown', 404, {'message': 'not found'})
+                request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                self._send('deals_search', *stub.search(request))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--deals', type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    stub = HubSpotStub(generate_deals(args.deals), port=args.port)
+    print(f"HubSpot stub con {args.deals} deals en {stub.base_url}")
+    try:
+        stub._server.serve_forever()
+    except KeyboardInterrupt:
+        stub.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,175 @@
+"""Sincronización incremental con checkpoint por fuente, tabla de staging y MERGE idempotente.
+
+Cada corrida:
+1. lee el checkpoint de la fuente en sync_checkpoints (None en la primera corrida);
+2. pide a la fuente solo el delta desde ese checkpoint (fetch devuelve un SyncBatch);
+3. carga el delta en una tabla de staging propia de la corrida y hace MERGE sobre la tabla destino por la clave natural.
+   Las filas iguales no se tocan (conservan updated_at, así el recálculo incremental de bonos no las
+   ve como cambios); opcionalmente se borran las filas del destino dentro del alcance del delta que
+   ya no vienen de la fuente (p.ej. un deal que dejó de estar closedwon);
+4. el MERGE y el nuevo checkpoint se confirman en la misma transacción.
+
+Repetir una corrida (o solapar dos) no duplica filas: el MERGE por clave es idempotente y el
+checkpoint solo avanza si la carga terminó. Cada corrida usa un staging con sufijo único, así una
+corrida que se solapa no trunca ni borra el staging de la otra; el staging expira solo
+(STAGING_TTL) si la corrida muere antes del DROP.
+"""
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from google.cloud import bigquery
+
+# bigquery_guard (tope de bytes y costo por call site) vive junto al agente
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'bonus-advisor-agent'))
+import bigquery_guard  # noqa: E402
+
+DATASET = "jrodriguez-sandbox.hackathon_bonus_update"
+CHECKPOINT_TABLE = f"{DATASET}.sync_checkpoints"
+STAGING_TTL = timedelta(hours=6)
+
+
+class SyncBatch:
+    """Delta de una fuente listo para cargar.
+
+    rows: filas al formato de la tabla destino.
+    checkpoint: valor a persistir si la carga termina bien.
+    delete_scope: condición SQL sobre el destino (alias T) que delimita lo que el delta reemplaza
+        por completo; las filas en ese alcance que no están en rows se borran.
+    scope_parameters: parámetros de BigQuery usados en delete_scope.
+    years: años que puede tocar el MERGE; restringe el destino a esas particiones.
+    """
+
+    def __init__(self, rows, checkpoint, delete_scope=None, scope_parameters=(), years=None):
+        self.rows = list(rows)
+        self.checkpoint = checkpoint
+        self.delete_scope = delete_scope
+        self.scope_parameters = list(scope_parameters)
+        self.years = sorted(set(years)) if years is not None else None
+
+
+def load_checkpoint(client, source):
+    """Último checkpoint confirmado de la fuente, o None si nunca se sincronizó"""
+    job = bigquery_guard.run_query(
+        client, "sync_checkpoint",
+        f"SELECT checkpoint FROM `{CHECKPOINT_TABLE}` WHERE source = @source",
+        bigquery.QueryJobConfig(query_parameters=[
+            bigquery.ScalarQueryParameter("source", "STRING", source)
+        ])
+    )
+    rows = list(job.result())
+    return rows[0]["checkpoint"] if rows else None
+
+
+def _checkpoint_statement():
+    return f"""
+    MERGE `{CHECKPOINT_TABLE}` C
+    USING (SELECT @source AS source, @checkpoint AS checkpoint, @rows_merged AS rows_merged) N
+    ON C.source = N.source
+    WHEN MATCHED THEN
+      UPDATE SET checkpoint = N.checkpoint, rows_merged = N.rows_merged, updated_at = CURRENT_TIMESTAMP()
+    WHEN NOT MATCHED THEN
+      INSERT (source, checkpoint, rows_merged, updated_at)
+      VALUES (N.source, N.checkpoint, N.rows_merged, CURRENT_TIMESTAMP());
+    """
+
+
+def build_merge(table_id, staging_id, columns, keys, delete_scope=None, prune_years=False):
+    """MERGE del staging sobre el destino por clave natural.
+
+    Solo actualiza filas con algún valor distinto (sin contar updated_at) e inserta las nuevas.
+    """
+    values = [column for column in columns if column not in keys and column != "updated_at"]
+    on = " AND ".join(f"T.{key} = S.{key}" for key in keys)
+    if prune_years:
+        on += " AND T.year IN UNNEST(@years)"
+    changed = " OR ".join(f"T.{column} IS DISTINCT FROM S.{column}" for column in values) or "FALSE"
+    assignments = ", ".join(f"{column} = S.{column}" for column in columns if column not in keys)
+    column_list = ", ".join(columns)
+
+    statement = f"""
+    MERGE `{table_id}` T
+    USING `{staging_id}` S
+    ON {on}
+    WHEN MATCHED AND ({changed}) THEN
+      UPDATE SET {assignments}
+    WHEN NOT MATCHED THEN
+      INSERT ({column_list}) VALUES ({", ".join(f"S.{column}" for column in columns)})
+    """
+    if delete_scope:
+        scope = f"({delete_scope})"
+        if prune_years:
+            scope += " AND T.year IN UNNEST(@years)"
+        statement += f"""WHEN NOT MATCHED BY SOURCE AND {scope} THEN
+      DELETE
+    """
+    return statement.rstrip() + ";"
+
+
+def merge_rows(client, source, rows, table_id, keys, batch=None):
+    """Carga rows en staging y hace MERGE sobre table_id; con batch también avanza el checkpoint.
+
+    Devuelve el número de filas del delta.
+    """
+    batch = batch or SyncBatch(rows, None)
+    parameters = list(batch.scope_parameters)
+    if batch.years is not None:
+        parameters.append(bigquery.ArrayQueryParameter("years", "INT64", batch.years))
+
+    statements = []
+    staging_id = None
+    if rows:
+        df = pd.DataFrame(rows)
+        df['updated_at'] = pd.Timestamp.now(tz='UTC')  # Change tracking para el recálculo incremental
+        # Una fila por clave: la última gana (p.ej. colaborador que también es owner)
+        df = df.drop_duplicates(subset=keys, keep='last')
+        staging_id = f"{table_id}__staging_{source}_{uuid.uuid4().hex}"
+        bigquery_guard.load_dataframe(
+            client, f"{source}_staging", df, staging_id,
+            bigquery.LoadJobConfig(write_disposition="WRITE_TRUNCATE")
+        )
+        # Si la corrida falla antes del DROP, el staging no queda huérfano
+        staging = bigquery.Table(staging_id)
+        staging.expires = datetime.now(timezone.utc) + STAGING_TTL
+        client.update_table(staging, ["expires"])
+        statements.append(build_merge(
+            table_id, staging_id, list(df.columns), keys, batch.delete_scope, batch.years is not None
+        ))
+    elif batch.delete_scope:
+        # Delta vacío con alcance: todo lo que había en el alcance dejó de existir en la fuente
+        prune = " AND T.year IN UNNEST(@years)" if batch.years is not None else ""
+        statements.append(f"DELETE FROM `{table_id}` T WHERE ({batch.delete_scope}){prune};")
+
+    if batch.checkpoint is not None:
+        statements.append(_checkpoint_statement())
+        parameters += [
+            bigquery.ScalarQueryParameter("source", "STRING", source),
+            bigquery.ScalarQueryParameter("checkpoint", "STRING", batch.checkpoint),
+            bigquery.ScalarQueryParameter("rows_merged", "INT64", len(rows)),
+        ]
+    if not statements:
+        return 0
+
+    script = "BEGIN TRANSACTION;\n" + "\n".join(statements) + "\nCOMMIT TRANSACTION;"
+    if staging_id:
+        # DDL fuera de la transacción
+        script += f"\nDROP TABLE IF EXISTS `{staging_id}`;"
+    bigquery_guard.run_query(
+        client, f"{source}_merge", script, bigquery.QueryJobConfig(query_parameters=parameters)
+    )
+    return len(rows)
+
+
+def run_sync(client, source, table_id, keys, fetch):
+    """Corrida incremental: checkpoint → fetch(checkpoint) → staging + MERGE + nuevo checkpoint.
+
+    fetch recibe el checkpoint confirmado (o None) y devuelve un SyncBatch. Devuelve el SyncBatch
+    cargado, para que el llamador pueda seguir con sus filas (p.ej. recalcular bonos).
+    """
+    checkpoint = load_checkpoint(client, source)
+    batch = fetch(checkpoint)
+    merged = merge_rows(client, source, batch.rows, table_id, keys, batch)
+    print(f"{source}: {merged} filas en el delta desde {checkpoint or 'el inicio'} (checkpoint {batch.checkpoint})")
+    return batch